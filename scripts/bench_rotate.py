@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the rotation methods on a directory of frames.
+
+Each method rotates the same frames on one core so the times are per frame
+rather than per machine. With OpenCV installed the output of each method is
+decoded and compared with the decoded source rotated in memory, which shows
+the loss from re-encoding.
+
+Without `--path` it generates `--frames` 3840x2160 test frames first, which
+needs OpenCV.
+"""
+
+import glob
+import os
+import tempfile
+import time
+
+from absl import app, flags
+
+from ccline import rotation
+
+flags.DEFINE_string("path", None, "Directory of frames. Generated if not given.")
+flags.DEFINE_integer("frames", 20, "Frames to generate or use.")
+flags.DEFINE_enum("angle", "90", enum_values=rotation.ANGLES, help="Clockwise angle.")
+
+FLAGS = flags.FLAGS
+
+
+def generate_frames(directory: str, count: int) -> list[str]:
+    """Writes smooth-ish 3840x2160 frames, which compress like real ones."""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        small = rng.integers(0, 256, (68, 120, 3), dtype=np.uint8)
+        frame = cv2.resize(small, (3840, 2160), interpolation=cv2.INTER_CUBIC)
+        path = os.path.join(directory, f"frame-{i:06d}.jpg")
+        cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        paths.append(path)
+    return paths
+
+
+def max_difference(source: str, rotated: str, angle: str):
+    """Largest pixel difference from a perfect rotation, or None without OpenCV."""
+    try:
+        import cv2
+    except ImportError:
+        return None
+    cv2_rotations = {
+        "90": cv2.ROTATE_90_CLOCKWISE,
+        "180": cv2.ROTATE_180,
+        "270": cv2.ROTATE_90_COUNTERCLOCKWISE,
+    }
+    # Ignore the orientation tag in the source, apply it in the output.
+    expected = cv2.rotate(
+        cv2.imread(source, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION),
+        cv2_rotations[angle],
+    )
+    actual = cv2.imread(rotated)
+    if actual.shape != expected.shape:
+        return float("inf")
+    return int(cv2.absdiff(actual, expected).max())
+
+
+def main(argv) -> None:
+    del argv  # Unused.
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if FLAGS.path is None:
+            sources = generate_frames(tmp_dir, FLAGS.frames)
+        else:
+            sources = sorted(glob.glob(os.path.join(FLAGS.path, "*.jpg")))
+            sources = sources[: FLAGS.frames]
+        if not sources:
+            print("No frames")
+            return
+        source_bytes = sum(os.path.getsize(p) for p in sources)
+        print(f"{len(sources)} frames, {source_bytes / len(sources) / 1e6:.2f} MB each")
+        print(f"{'method':<10} {'ms/frame':>9} {'MB/frame':>9} {'max diff':>9}")
+        for method, rotate in rotation.METHODS.items():
+            out_dir = os.path.join(tmp_dir, method)
+            os.makedirs(out_dir)
+            outputs = [os.path.join(out_dir, os.path.basename(p)) for p in sources]
+            try:
+                start = time.perf_counter()
+                for source, output in zip(sources, outputs):
+                    rotate(source, output, FLAGS.angle)
+                elapsed_s = time.perf_counter() - start
+            except (ImportError, RuntimeError, ValueError) as e:
+                print(f"{method:<10} skipped: {e}")
+                continue
+            output_bytes = sum(os.path.getsize(p) for p in outputs)
+            difference = max_difference(sources[0], outputs[0], FLAGS.angle)
+            print(
+                f"{method:<10} {elapsed_s / len(sources) * 1000:>9.1f}"
+                f" {output_bytes / len(sources) / 1e6:>9.2f}"
+                f" {'-' if difference is None else difference:>9}"
+            )
+
+
+if __name__ == "__main__":
+    app.run(main)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the idle CPU use of the UI loops.
+
+`busy` is the loop the UI used to run: one thread reading the buttons as fast
+as it can and another polling for input and the refresh deadline. `events` is
+ccline.ui_events, which sleeps between button samples and refreshes. Both run
+with buttons that are never pressed and a refresh that does nothing, so the
+numbers are the cost of the loop alone. CPU time covers all threads of the
+process, as a fraction of one core.
+"""
+
+import threading
+import time
+
+from absl import app, flags
+
+from ccline import ui_events
+
+flags.DEFINE_float("seconds", 5.0, "How long to run each loop.")
+flags.DEFINE_integer("buttons", 7, "Buttons to poll, 7 on the OLED bonnet.")
+
+FLAGS = flags.FLAGS
+
+
+class IdleSwitch:
+    """A button that's never pressed."""
+
+    rose = False
+
+    def update(self) -> None:
+        pass
+
+
+def run_busy(switches: dict, refresh, refresh_s: float, seconds: float) -> None:
+    inputs: list[str] = []
+    done = threading.Event()
+
+    def poll():
+        while not done.is_set():
+            for name, switch in switches.items():
+                switch.update()
+                if switch.rose:
+                    inputs.append(name)
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    end_s = time.monotonic() + seconds
+    next_refresh_s = time.monotonic()
+    while time.monotonic() < end_s:
+        if inputs:
+            inputs.pop(0)
+        if next_refresh_s < time.monotonic():
+            next_refresh_s += refresh_s
+            refresh()
+    done.set()
+    poller.join()
+
+
+def run_events(switches: dict, refresh, refresh_s: float, seconds: float) -> None:
+    loop = ui_events.UiLoop(lambda name: None, refresh, refresh_s)
+    poller = threading.Thread(
+        target=ui_events.poll_buttons, args=[switches, loop.put, loop.stopped]
+    )
+    poller.start()
+    threading.Timer(seconds, loop.stop).start()
+    loop.run()
+    poller.join()
+
+
+def main(argv) -> None:
+    del argv  # Unused.
+    switches = {str(i): IdleSwitch() for i in range(FLAGS.buttons)}
+    budget = ui_events.IDLE_CPU_BUDGET
+    print(f"Budget {budget:.1%} of a core")
+    print(f"{'loop':<8} {'CPU':>7} {'refreshes':>10}")
+    for name, run in [("busy", run_busy), ("events", run_events)]:
+        refreshes = []
+        start_cpu_s = time.process_time()
+        start_s = time.monotonic()
+        run(switches, lambda: refreshes.append(1), 0.2, FLAGS.seconds)
+        cpu = (time.process_time() - start_cpu_s) / (time.monotonic() - start_s)
+        print(
+            f"{name:<8} {cpu:>7.1%} {len(refreshes):>10}"
+            f"{'' if cpu <= budget else '  over budget'}"
+        )
+
+
+if __name__ == "__main__":
+    app.run(main)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Matches the frames of a fetched recording across nodes by capture time.
+
+Reads the `frames.csv` sidecar of each node in `jot/<recording_id>/<node>/`
+and writes `framesets.csv` with one row per frame of the reference node and
+the nearest frame of every other node, blank where a node has no frame within
+the tolerance.
+"""
+
+import csv
+import glob
+import os
+
+from absl import app, flags
+
+from ccline.frame_times import SIDECAR_NAME, match_frames, read_frame_times
+
+flags.DEFINE_string("path", None, "Recording directory, jot/<recording_id>.")
+flags.DEFINE_string("reference", None, "Node to match to. Defaults to the first.")
+flags.DEFINE_float("tolerance_ms", 100.0, "Furthest apart frames can be to match.")
+flags.DEFINE_string("output", None, "Defaults to <path>/framesets.csv.")
+flags.mark_flag_as_required("path")
+
+FLAGS = flags.FLAGS
+
+
+def main(argv) -> None:
+    del argv  # Unused.
+    sidecars = sorted(glob.glob(os.path.join(FLAGS.path, "*", SIDECAR_NAME)))
+    nodes = [os.path.basename(os.path.dirname(p)) for p in sidecars]
+    if not nodes:
+        print(f"No {SIDECAR_NAME} found under {FLAGS.path}")
+        return
+    reference = FLAGS.reference or nodes[0]
+    if reference not in nodes:
+        print(f"No {SIDECAR_NAME} for {reference}")
+        return
+    output = FLAGS.output or os.path.join(FLAGS.path, "framesets.csv")
+    node_times = {n: read_frame_times(p) for n, p in zip(nodes, sidecars)}
+    rows = complete = 0
+    with open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time_ns"] + nodes)
+        for time_ns, frame_set in match_frames(
+            node_times, reference, int(FLAGS.tolerance_ms * 1e6)
+        ):
+            writer.writerow([time_ns] + [frame_set[n] or "" for n in nodes])
+            rows += 1
+            complete += all(frame_set.values())
+    print(f"{rows} frame sets, {complete} with every node, written to {output}")
+
+
+if __name__ == "__main__":
+    app.run(main)
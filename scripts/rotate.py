@@ -13,64 +13,67 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""Rotates every frame under a directory.
+
+Give it a node directory, a whole recording (`jot/<recording_id>`) or all of
+`jot`. The rotated frames are written under `--destination` with the same
+layout. Frames that were already rotated are skipped.
+
+`--method jpegtran` and `--method exif` rotate without decoding the frames,
+see `ccline.rotation`. `scripts/bench_rotate.py` compares the methods.
+"""
+
+import functools
+
 from absl import app, flags
-import cv2
-import glob
-import os
-import multiprocessing
 
-flags.DEFINE_string("path", "", "Directory to process.")
+from ccline import pipeline, rotation
+
+flags.DEFINE_string("path", ".", "Directory to process, including subdirectories.")
 flags.DEFINE_string("destination", "rotated", "Directory to write new files.")
-flags.DEFINE_enum("angle", "90", enum_values=["90", "180", "270"], 
-                  help="Angle to rotate the images in degrees counterclockwise.")
+flags.DEFINE_enum(
+    "angle",
+    "90",
+    enum_values=rotation.ANGLES,
+    help="Angle to rotate the images in degrees clockwise.",
+)
+flags.DEFINE_enum(
+    "method",
+    "opencv",
+    enum_values=list(rotation.METHODS),
+    help=(
+        "opencv decodes and re-encodes. jpegtran rotates losslessly. exif sets"
+        " the orientation tag and leaves the image data alone."
+    ),
+)
+flags.DEFINE_integer("processes", None, "Worker processes. Defaults to one per core.")
 
 FLAGS = flags.FLAGS
 
-def process_helper(files, angle, flagAngleVal, flagDestVal):
-    for file in files:
-        print(file, flagAngleVal)
-        rotate(file, os.path.join(flagDestVal, os.path.split(file)[1]), angle)
 
-def rotate(image, destination, angle):
-    image = cv2.imread(image)
-    rotated = cv2.rotate(image, angle)
-    print(f"Writing {destination}")
-    cv2.imwrite(destination, rotated)
+def rotate(job: pipeline.Job, method: str, angle: str) -> None:
+    rotation.METHODS[method](
+        job.source, pipeline.temporary_path(job.destination), angle
+    )
+
 
-# Rotates a directory of images by the given amount.
-# Assumes all images are the same size.
 def main(argv) -> None:
     del argv  # Unused.
-    g = os.path.join(FLAGS.path, '*.jpg')
-    files = glob.glob(g)
-
-    if len(files) == 0:
-        print(f"No files found in {g}")
-        return  
-    if FLAGS.angle == "90":
-        angle = cv2.ROTATE_90_CLOCKWISE
-    elif FLAGS.angle == "180":
-        angle = cv2.ROTATE_180_CLOCKWISE
-    elif FLAGS.angle == "270":
-        angle = cv2.ROTATE_90_COUNTERCLOCKWISE
-    else:
+    jobs = list(pipeline.find_jobs(FLAGS.path, FLAGS.destination))
+    if not jobs:
+        print(f"No files found in {FLAGS.path}")
         return
-    
-    numProcesses = multiprocessing.cpu_count()
-    fileSlices = [[] for i in range(0, numProcesses)]
-    for i in range(0, len(files), numProcesses):
-        for j in range(0, numProcesses):
-            if i + j < len(files):
-                fileSlices[j].append(files[i + j])
-            else:
-                break
-    processes = []
-    for i in range(0, numProcesses):
-        p = multiprocessing.Process(target=process_helper, args=(fileSlices[i], angle, FLAGS.angle, FLAGS.destination))
-        processes.append(p)
-        p.start()
-    for p in processes:
-        p.join()
+    done = sum(1 for job in jobs if pipeline.is_done(job))
+    processed = pipeline.run(
+        jobs,
+        functools.partial(rotate, method=FLAGS.method, angle=FLAGS.angle),
+        FLAGS.processes,
+    )
+    print(
+        f"Rotated {processed} frames, {done} already done,"
+        f" {len(jobs) - done - processed} failed, to {FLAGS.destination}"
+    )
+
 
 if __name__ == "__main__":
     app.run(main)
@@ -15,17 +15,21 @@
 
 from absl import app, flags
 
-from ccline import client, server
+from ccline import client, server, sink
 
 flags.DEFINE_bool("server", False, "Start a server.")
 flags.DEFINE_bool("client", False, "Send a client command.")
-flags.mark_bool_flags_as_mutual_exclusive(["server", "client"])
+flags.DEFINE_bool("sink", False, "Receive offloaded frames on a workstation.")
+flags.mark_bool_flags_as_mutual_exclusive(["server", "client", "sink"])
 
 FLAGS = flags.FLAGS
 
 
 def main(argv) -> None:
     del argv  # Unused.
+    if FLAGS.sink:
+        sink.run()
+        return
     # Default to client if neither flag is given.
     if not FLAGS.server:
         client.run()
@@ -0,0 +1,199 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The coordinator's catalogue of recordings.
+
+Without it, finding a recording means listing the data directory on a node
+and reading timestamps out of `r_<timestamp>` names, and the tags given when
+it started are lost. The coordinator records each recording as it starts and
+stops in a small SQLite database: its tags, start and stop times, the nodes
+that took part and how many frames and bytes each of them saved. Queries are
+answered from indexes without touching the nodes or their disks.
+"""
+
+import os
+import sqlite3
+from typing import Iterable, Optional
+
+from ccline import ccline_pb2
+
+# Recordings looked up per query, under SQLite's limit on query parameters.
+QUERY_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+  recording_id TEXT PRIMARY KEY,
+  start_time_ns INTEGER NOT NULL,
+  stop_time_ns INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS recordings_start ON recordings (start_time_ns);
+CREATE TABLE IF NOT EXISTS recording_tags (
+  recording_id TEXT NOT NULL REFERENCES recordings,
+  tag TEXT NOT NULL,
+  PRIMARY KEY (recording_id, tag)
+);
+CREATE INDEX IF NOT EXISTS recording_tags_tag ON recording_tags (tag);
+CREATE TABLE IF NOT EXISTS recording_nodes (
+  recording_id TEXT NOT NULL REFERENCES recordings,
+  node_id TEXT NOT NULL,
+  frame_count INTEGER NOT NULL DEFAULT 0,
+  bytes_written INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (recording_id, node_id)
+);
+CREATE INDEX IF NOT EXISTS recording_nodes_node ON recording_nodes (node_id);
+"""
+
+
+class Catalogue:
+    """Recordings made by the array, kept in a SQLite database."""
+
+    def __init__(self, path: Optional[str] = None):
+        """Opens the catalogue, creating it if needed.
+
+        Args:
+          path: Database file. None keeps the catalogue in memory only.
+        """
+        self.path = path
+        if path is not None and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db_ = sqlite3.connect(path or ":memory:")
+        # Writes go to a log rather than rewriting pages, which is much
+        # cheaper on an SD card.
+        self.db_.execute("PRAGMA journal_mode=WAL")
+        self.db_.execute("PRAGMA synchronous=NORMAL")
+        self.db_.executescript(SCHEMA)
+
+    def start(
+        self,
+        recording_id: str,
+        tags: Iterable[str],
+        start_time_ns: int,
+        nodes: Iterable[str],
+    ) -> None:
+        """Adds a recording as it starts.
+
+        Starting a recording again with the same ID, which carries on saving
+        to the same directory, keeps the original start time and adds to the
+        tags and nodes.
+        """
+        with self.db_:
+            self.db_.execute(
+                "INSERT INTO recordings (recording_id, start_time_ns)"
+                " VALUES (?, ?) ON CONFLICT (recording_id)"
+                " DO UPDATE SET stop_time_ns = 0",
+                (recording_id, start_time_ns),
+            )
+            self.db_.executemany(
+                "INSERT OR IGNORE INTO recording_tags VALUES (?, ?)",
+                [(recording_id, tag) for tag in tags],
+            )
+            self.db_.executemany(
+                "INSERT OR IGNORE INTO recording_nodes (recording_id, node_id)"
+                " VALUES (?, ?)",
+                [(recording_id, node) for node in nodes],
+            )
+
+    def update_nodes(self, counts: Iterable[tuple[str, str, int, int]]) -> None:
+        """Sets how much each node has saved, in one transaction.
+
+        Args:
+          counts: (recording_id, node_id, frame_count, bytes_written) of each
+            node. Nodes and recordings not in the catalogue are ignored.
+        """
+        with self.db_:
+            self.db_.executemany(
+                "UPDATE recording_nodes SET frame_count = ?, bytes_written = ?"
+                " WHERE recording_id = ? AND node_id = ?",
+                [(f, b, r, n) for r, n, f, b in counts],
+            )
+
+    def stop(self, recording_id: str, stop_time_ns: int) -> None:
+        with self.db_:
+            self.db_.execute(
+                "UPDATE recordings SET stop_time_ns = ?"
+                " WHERE recording_id = ? AND stop_time_ns = 0",
+                (stop_time_ns, recording_id),
+            )
+
+    def find(
+        self, request: ccline_pb2.ListRecordingsRequest
+    ) -> list[ccline_pb2.Recording]:
+        """Recordings matching the filters in `request`, newest first."""
+        query = "SELECT recording_id, start_time_ns, stop_time_ns FROM recordings"
+        conditions = []
+        params: list = []
+        for tag in request.tags:
+            conditions.append(
+                "recording_id IN"
+                " (SELECT recording_id FROM recording_tags WHERE tag = ?)"
+            )
+            params.append(tag)
+        if request.node_id:
+            conditions.append(
+                "recording_id IN"
+                " (SELECT recording_id FROM recording_nodes WHERE node_id = ?)"
+            )
+            params.append(request.node_id)
+        if request.since_ns:
+            conditions.append("start_time_ns >= ?")
+            params.append(request.since_ns)
+        if request.until_ns:
+            conditions.append("start_time_ns < ?")
+            params.append(request.until_ns)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY start_time_ns DESC"
+        if request.limit:
+            query += " LIMIT ?"
+            params.append(request.limit)
+        recordings = {}
+        for recording_id, start_time_ns, stop_time_ns in self.db_.execute(
+            query, params
+        ):
+            recordings[recording_id] = ccline_pb2.Recording(
+                recording_id=recording_id,
+                start_time_ns=start_time_ns,
+                stop_time_ns=stop_time_ns,
+            )
+        ids = list(recordings)
+        for start in range(0, len(ids), QUERY_BATCH):
+            self._add_details(recordings, ids[start : start + QUERY_BATCH])
+        return list(recordings.values())
+
+    def _add_details(
+        self, recordings: dict[str, ccline_pb2.Recording], ids: list[str]
+    ) -> None:
+        """Fills in the tags and nodes of recordings `ids`, a query for each."""
+        placeholders = ",".join("?" * len(ids))
+        for recording_id, tag in self.db_.execute(
+            "SELECT recording_id, tag FROM recording_tags"
+            f" WHERE recording_id IN ({placeholders}) ORDER BY tag",
+            ids,
+        ):
+            recordings[recording_id].tags.append(tag)
+        for recording_id, node_id, frame_count, bytes_written in self.db_.execute(
+            "SELECT recording_id, node_id, frame_count, bytes_written"
+            f" FROM recording_nodes WHERE recording_id IN ({placeholders})"
+            " ORDER BY node_id",
+            ids,
+        ):
+            recording = recordings[recording_id]
+            recording.nodes.add(
+                node_id=node_id, frame_count=frame_count, bytes_written=bytes_written
+            )
+            recording.frame_count += frame_count
+            recording.bytes_written += bytes_written
+
+    def close(self) -> None:
+        self.db_.close()
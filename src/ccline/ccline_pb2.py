@@ -29,7 +29,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13\x63\x63line/ccline.proto\x12\x06\x63\x63line\"\x0e\n\x0cGooseRequest\")\n\nGooseReply\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"y\n\rRecordRequest\x12*\n\x10start_sensor_ids\x18\x01 \x03(\x0e\x32\x10.ccline.SensorId\x12)\n\x0fstop_sensor_ids\x18\x02 \x03(\x0e\x32\x10.ccline.SensorId\x12\x11\n\tdata_path\x18\x03 \x01(\t\"\r\n\x0bRecordReply\"9\n\x11LiveSampleRequest\x12$\n\nsensor_ids\x18\x01 \x03(\x0e\x32\x10.ccline.SensorId\" \n\x0fLiveSampleReply\x12\r\n\x05image\x18\x01 \x01(\x0c\"\x11\n\x0fShutdownRequest\"\x0f\n\rShutdownReply\"E\n\x16StartCollectingRequest\x12\x14\n\x0crecording_id\x18\x01 \x01(\t\x12\x15\n\rrecording_tag\x18\x02 \x03(\t\"\xa4\x01\n\x14StartCollectingReply\x12\x42\n\x06result\x18\x01 \x01(\x0e\x32\x32.ccline.StartCollectingReply.StartCollectingResult\x12\x0f\n\x07message\x18\x02 \x01(\t\"7\n\x15StartCollectingResult\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x06\n\x02OK\x10\x01\x12\t\n\x05\x45RROR\x10\x02\"\x18\n\x16StopAllCollectsRequest\"\x16\n\x14StopAllCollectsReply\"\x18\n\x16ShutdownClusterRequest\"\x96\x01\n\x14ShutdownClusterReply\x12;\n\x06result\x18\x01 \x01(\x0e\x32+.ccline.ShutdownClusterReply.ShutdownResult\x12\x0f\n\x07message\x18\x02 \x01(\t\"0\n\x0eShutdownResult\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x06\n\x02OK\x10\x01\x12\t\n\x05\x45RROR\x10\x02*|\n\x08SensorId\x12\x14\n\x10UNKNOWN_SensorId\x10\x00\x12\x0b\n\x07\x43\x61mera1\x10\x01\x12\x0b\n\x07\x43\x61mera2\x10\x02\x12\x0b\n\x07\x43\x61mera3\x10\x03\x12\x0b\n\x07\x43\x61mera4\x10\x04\x12\x08\n\x04Imu1\x10\x05\x12\x08\n\x04Imu2\x10\x06\x12\x08\n\x04Imu3\x10\x07\x12\x08\n\x04Imu4\x10\x08\x32\xf5\x01\n\x04Node\x12\x33\n\x05Goose\x12\x14.ccline.GooseRequest\x1a\x12.ccline.GooseReply\"\x00\x12\x36\n\x06Record\x12\x15.ccline.RecordRequest\x1a\x13.ccline.RecordReply\"\x00\x12\x42\n\nLiveSample\x12\x19.ccline.LiveSampleRequest\x1a\x17.ccline.LiveSampleReply\"\x00\x12<\n\x08Shutdown\x12\x17.ccline.ShutdownRequest\x1a\x15.ccline.ShutdownReply\"\x00\x32\x86\x02\n\x0b\x43oordinator\x12Q\n\x0fStartCollecting\x12\x1e.ccline.StartCollectingRequest\x1a\x1c.ccline.StartCollectingReply\"\x00\x12Q\n\x0fStopAllCollects\x12\x1e.ccline.StopAllCollectsRequest\x1a\x1c.ccline.StopAllCollectsReply\"\x00\x12Q\n\x0fShutdownCluster\x12\x1e.ccline.ShutdownClusterRequest\x1a\x1c.ccline.ShutdownClusterReply\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13\x63\x63line/ccline.proto\x12\x06\x63\x63line\"\x0e\n\x0cGooseRequest\")\n\nGooseReply\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x90\x01\n\rRecordRequest\x12*\n\x10start_sensor_ids\x18\x01 \x03(\x0e\x32\x10.ccline.SensorId\x12)\n\x0fstop_sensor_ids\x18\x02 \x03(\x0e\x32\x10.ccline.SensorId\x12\x11\n\tdata_path\x18\x03 \x01(\t\x12\x15\n\rstart_time_ns\x18\x04 \x01(\x03\"\x89\x01\n\x0bRecordReply\x12\x14\n\x0cnode_time_ns\x18\x01 \x01(\x03\x12\x14\n\x0crecording_id\x18\x02 \x01(\t\x12\x13\n\x0b\x66rame_count\x18\x03 \x01(\x03\x12\x15\n\rbytes_written\x18\x04 \x01(\x03\x12\x12\n\nlast_frame\x18\x05 \x01(\t\x12\x0e\n\x06killed\x18\x06 \x01(\x08\"9\n\x11LiveSampleRequest\x12$\n\nsensor_ids\x18\x01 \x03(\x0e\x32\x10.ccline.SensorId\" \n\x0fLiveSampleReply\x12\r\n\x05image\x18\x01 \x01(\x0c\"U\n\tFileChunk\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0e\n\x06offset\x18\x02 \x01(\x03\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\x0c\x12\x0c\n\x04size\x18\x04 \x01(\x03\x12\x0e\n\x06sha256\x18\x05 \x01(\t\"\xa1\x01\n\x15\x46\x65tchRecordingRequest\x12\x14\n\x0crecording_id\x18\x01 \x01(\t\x12@\n\nhave_bytes\x18\x02 \x03(\x0b\x32,.ccline.FetchRecordingRequest.HaveBytesEntry\x1a\x30\n\x0eHaveBytesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x03:\x02\x38\x01\"\x0f\n\rStatusRequest\"\xdf\x03\n\nNodeStatus\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12\x14\n\x0crecording_id\x18\x02 \x01(\t\x12\x13\n\x0b\x66rame_count\x18\x03 \x01(\x03\x12\x1a\n\x12last_frame_time_ns\x18\x04 \x01(\x03\x12\x15\n\rbytes_written\x18\x05 \x01(\x03\x12\x30\n\x05state\x18\x06 \x01(\x0e\x32!.ccline.NodeStatus.RecordingState\x12\x13\n\x0b\x63\x61pture_pid\x18\x07 \x01(\x05\x12\x15\n\rcapture_alive\x18\x08 \x01(\x08\x12\x14\n\x0c\x66rames_per_s\x18\t \x01(\x01\x12\x19\n\x11write_bytes_per_s\x18\n \x01(\x01\x12\x17\n\x0f\x64isk_free_bytes\x18\x0b \x01(\x03\x12\x0f\n\x07stalled\x18\x0c \x01(\x08\x12\x13\n\x0bremaining_s\x18\r \x01(\x01\x12\x10\n\x08low_disk\x18\x0e \x01(\x08\x12\x19\n\x11\x65victs_recordings\x18\x0f \x01(\x08\x12%\n\x07sensors\x18\x10 \x03(\x0b\x32\x14.ccline.SensorStatus\"@\n\x0eRecordingState\x12\x08\n\x04IDLE\x10\x00\x12\t\n\x05\x41RMED\x10\x01\x12\r\n\tRECORDING\x10\x02\x12\n\n\x06\x45XITED\x10\x03\"L\n\x0cSensorStatus\x12\x0e\n\x06sensor\x18\x01 \x01(\t\x12\x0b\n\x03pid\x18\x02 \x01(\x05\x12\r\n\x05\x61live\x18\x03 \x01(\x08\x12\x10\n\x08restarts\x18\x04 \x01(\x05\"\"\n\x0fShutdownRequest\x12\x0f\n\x07\x64\x65lay_s\x18\x01 \x01(\x01\"f\n\rShutdownReply\x12\x14\n\x0crecording_id\x18\x01 \x01(\t\x12\x13\n\x0b\x66rame_count\x18\x02 \x01(\x03\x12\x15\n\rbytes_written\x18\x03 \x01(\x03\x12\x13\n\x0bpower_off_s\x18\x04 \x01(\x01\"\xc5\x01\n\nNodeResult\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12-\n\x06status\x18\x02 \x01(\x0e\x32\x1d.ccline.NodeResult.NodeStatus\x12\x0f\n\x07message\x18\x03 \x01(\t\x12\x12\n\nlatency_ms\x18\x04 \x01(\x01\x12\x17\n\x0f\x63lock_offset_ms\x18\x05 \x01(\x01\"9\n\nNodeStatus\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x06\n\x02OK\x10\x01\x12\t\n\x05\x45RROR\x10\x02\x12\x0b\n\x07TIMEOUT\x10\x03\"k\n\x16StartCollectingRequest\x12\x14\n\x0crecording_id\x18\x01 \x01(\t\x12\x15\n\rrecording_tag\x18\x02 \x03(\t\x12\x15\n\rstart_time_ns\x18\x03 \x01(\x03\x12\r\n\x05\x66orce\x18\x04 \x01(\x08\"\xe5\x01\n\x14StartCollectingReply\x12\x42\n\x06result\x18\x01 \x01(\x0e\x32\x32.ccline.StartCollectingReply.StartCollectingResult\x12\x0f\n\x07message\x18\x02 \x01(\t\x12(\n\x0cnode_results\x18\x03 \x03(\x0b\x32\x12.ccline.NodeResult\x12\x15\n\rstart_time_ns\x18\x04 \x01(\x03\"7\n\x15StartCollectingResult\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x06\n\x02OK\x10\x01\x12\t\n\x05\x45RROR\x10\x02\"\x18\n\x16StopAllCollectsRequest\"Q\n\x14StopAllCollectsReply\x12(\n\x0cnode_results\x18\x01 \x03(\x0b\x32\x12.ccline.NodeResult\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x14\n\x12\x41rrayStatusRequest\"g\n\rChannelStatus\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12\r\n\x05state\x18\x02 \x01(\t\x12\x10\n\x08\x63onnects\x18\x03 \x01(\x05\x12\x12\n\nreconnects\x18\x04 \x01(\x05\x12\x10\n\x08\x66\x61ilures\x18\x05 \x01(\x05\"\x8b\x01\n\x0b\x41rrayStatus\x12)\n\rnode_statuses\x18\x01 \x03(\x0b\x32\x12.ccline.NodeStatus\x12(\n\x0cnode_results\x18\x02 \x03(\x0b\x32\x12.ccline.NodeResult\x12\'\n\x08\x63hannels\x18\x03 \x03(\x0b\x32\x15.ccline.ChannelStatus\"8\n\x10SampleAllRequest\x12$\n\nsensor_ids\x18\x01 \x03(\x0e\x32\x10.ccline.SensorId\"l\n\x0eSampleAllChunk\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12 \n\x05\x63hunk\x18\x02 \x01(\x0b\x32\x11.ccline.FileChunk\x12\'\n\x0bnode_result\x18\x03 \x01(\x0b\x32\x12.ccline.NodeResult\"i\n\x15ListRecordingsRequest\x12\x0c\n\x04tags\x18\x01 \x03(\t\x12\x0f\n\x07node_id\x18\x02 \x01(\t\x12\x10\n\x08since_ns\x18\x03 \x01(\x03\x12\x10\n\x08until_ns\x18\x04 \x01(\x03\x12\r\n\x05limit\x18\x05 \x01(\x05\"L\n\rRecordingNode\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12\x13\n\x0b\x66rame_count\x18\x02 \x01(\x03\x12\x15\n\rbytes_written\x18\x03 \x01(\x03\"\xae\x01\n\tRecording\x12\x14\n\x0crecording_id\x18\x01 \x01(\t\x12\x0c\n\x04tags\x18\x02 \x03(\t\x12\x15\n\rstart_time_ns\x18\x03 \x01(\x03\x12\x14\n\x0cstop_time_ns\x18\x04 \x01(\x03\x12$\n\x05nodes\x18\x05 \x03(\x0b\x32\x15.ccline.RecordingNode\x12\x13\n\x0b\x66rame_count\x18\x06 \x01(\x03\x12\x15\n\rbytes_written\x18\x07 \x01(\x03\"<\n\x13ListRecordingsReply\x12%\n\nrecordings\x18\x01 \x03(\x0b\x32\x11.ccline.Recording\"\'\n\x16ShutdownClusterRequest\x12\r\n\x05\x66orce\x18\x01 \x01(\x08\"\xd5\x01\n\x14ShutdownClusterReply\x12;\n\x06result\x18\x01 \x01(\x0e\x32+.ccline.ShutdownClusterReply.ShutdownResult\x12\x0f\n\x07message\x18\x02 \x01(\t\x12(\n\x0cnode_results\x18\x03 \x03(\x0b\x32\x12.ccline.NodeResult\x12\x13\n\x0bpower_off_s\x18\x04 \x01(\x01\"0\n\x0eShutdownResult\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x06\n\x02OK\x10\x01\x12\t\n\x05\x45RROR\x10\x02\"W\n\x0cOffloadChunk\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12\x14\n\x0crecording_id\x18\x02 \x01(\t\x12 \n\x05\x63hunk\x18\x03 \x01(\x0b\x32\x11.ccline.FileChunk\"&\n\x0cOffloadReply\x12\x16\n\x0e\x62ytes_received\x18\x01 \x01(\x03\"N\n\x16OffloadProgressRequest\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12\x14\n\x0crecording_id\x18\x02 \x01(\t\x12\r\n\x05names\x18\x03 \x03(\t\"\x89\x01\n\x14OffloadProgressReply\x12?\n\nhave_bytes\x18\x01 \x03(\x0b\x32+.ccline.OffloadProgressReply.HaveBytesEntry\x1a\x30\n\x0eHaveBytesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x03:\x02\x38\x01*|\n\x08SensorId\x12\x14\n\x10UNKNOWN_SensorId\x10\x00\x12\x0b\n\x07\x43\x61mera1\x10\x01\x12\x0b\n\x07\x43\x61mera2\x10\x02\x12\x0b\n\x07\x43\x61mera3\x10\x03\x12\x0b\n\x07\x43\x61mera4\x10\x04\x12\x08\n\x04Imu1\x10\x05\x12\x08\n\x04Imu2\x10\x06\x12\x08\n\x04Imu3\x10\x07\x12\x08\n\x04Imu4\x10\x08\x32\xbd\x03\n\x04Node\x12\x33\n\x05Goose\x12\x14.ccline.GooseRequest\x1a\x12.ccline.GooseReply\"\x00\x12\x36\n\x06Record\x12\x15.ccline.RecordRequest\x1a\x13.ccline.RecordReply\"\x00\x12\x42\n\nLiveSample\x12\x19.ccline.LiveSampleRequest\x1a\x17.ccline.LiveSampleReply\"\x00\x12\x44\n\x10StreamLiveSample\x12\x19.ccline.LiveSampleRequest\x1a\x11.ccline.FileChunk\"\x00\x30\x01\x12\x38\n\tGetStatus\x12\x15.ccline.StatusRequest\x1a\x12.ccline.NodeStatus\"\x00\x12\x46\n\x0e\x46\x65tchRecording\x12\x1d.ccline.FetchRecordingRequest\x1a\x11.ccline.FileChunk\"\x00\x30\x01\x12<\n\x08Shutdown\x12\x17.ccline.ShutdownRequest\x1a\x15.ccline.ShutdownReply\"\x00\x32\xde\x03\n\x0b\x43oordinator\x12Q\n\x0fStartCollecting\x12\x1e.ccline.StartCollectingRequest\x1a\x1c.ccline.StartCollectingReply\"\x00\x12Q\n\x0fStopAllCollects\x12\x1e.ccline.StopAllCollectsRequest\x1a\x1c.ccline.StopAllCollectsReply\"\x00\x12\x43\n\x0eGetArrayStatus\x12\x1a.ccline.ArrayStatusRequest\x1a\x13.ccline.ArrayStatus\"\x00\x12\x41\n\tSampleAll\x12\x18.ccline.SampleAllRequest\x1a\x16.ccline.SampleAllChunk\"\x00\x30\x01\x12N\n\x0eListRecordings\x12\x1d.ccline.ListRecordingsRequest\x1a\x1b.ccline.ListRecordingsReply\"\x00\x12Q\n\x0fShutdownCluster\x12\x1e.ccline.ShutdownClusterRequest\x1a\x1c.ccline.ShutdownClusterReply\"\x00\x32\x93\x01\n\x04Sink\x12\x38\n\x06Upload\x12\x14.ccline.OffloadChunk\x1a\x14.ccline.OffloadReply\"\x00(\x01\x12Q\n\x0fOffloadProgress\x12\x1e.ccline.OffloadProgressRequest\x1a\x1c.ccline.OffloadProgressReply\"\x00\x62\x06proto3')
 
 _SENSORID = DESCRIPTOR.enum_types_by_name['SensorId']
 SensorId = enum_type_wrapper.EnumTypeWrapper(_SENSORID)
@@ -50,14 +50,37 @@ _RECORDREQUEST = DESCRIPTOR.message_types_by_name['RecordRequest']
 _RECORDREPLY = DESCRIPTOR.message_types_by_name['RecordReply']
 _LIVESAMPLEREQUEST = DESCRIPTOR.message_types_by_name['LiveSampleRequest']
 _LIVESAMPLEREPLY = DESCRIPTOR.message_types_by_name['LiveSampleReply']
+_FILECHUNK = DESCRIPTOR.message_types_by_name['FileChunk']
+_FETCHRECORDINGREQUEST = DESCRIPTOR.message_types_by_name['FetchRecordingRequest']
+_FETCHRECORDINGREQUEST_HAVEBYTESENTRY = _FETCHRECORDINGREQUEST.nested_types_by_name['HaveBytesEntry']
+_STATUSREQUEST = DESCRIPTOR.message_types_by_name['StatusRequest']
+_NODESTATUS = DESCRIPTOR.message_types_by_name['NodeStatus']
+_SENSORSTATUS = DESCRIPTOR.message_types_by_name['SensorStatus']
 _SHUTDOWNREQUEST = DESCRIPTOR.message_types_by_name['ShutdownRequest']
 _SHUTDOWNREPLY = DESCRIPTOR.message_types_by_name['ShutdownReply']
+_NODERESULT = DESCRIPTOR.message_types_by_name['NodeResult']
 _STARTCOLLECTINGREQUEST = DESCRIPTOR.message_types_by_name['StartCollectingRequest']
 _STARTCOLLECTINGREPLY = DESCRIPTOR.message_types_by_name['StartCollectingReply']
 _STOPALLCOLLECTSREQUEST = DESCRIPTOR.message_types_by_name['StopAllCollectsRequest']
 _STOPALLCOLLECTSREPLY = DESCRIPTOR.message_types_by_name['StopAllCollectsReply']
+_ARRAYSTATUSREQUEST = DESCRIPTOR.message_types_by_name['ArrayStatusRequest']
+_CHANNELSTATUS = DESCRIPTOR.message_types_by_name['ChannelStatus']
+_ARRAYSTATUS = DESCRIPTOR.message_types_by_name['ArrayStatus']
+_SAMPLEALLREQUEST = DESCRIPTOR.message_types_by_name['SampleAllRequest']
+_SAMPLEALLCHUNK = DESCRIPTOR.message_types_by_name['SampleAllChunk']
+_LISTRECORDINGSREQUEST = DESCRIPTOR.message_types_by_name['ListRecordingsRequest']
+_RECORDINGNODE = DESCRIPTOR.message_types_by_name['RecordingNode']
+_RECORDING = DESCRIPTOR.message_types_by_name['Recording']
+_LISTRECORDINGSREPLY = DESCRIPTOR.message_types_by_name['ListRecordingsReply']
 _SHUTDOWNCLUSTERREQUEST = DESCRIPTOR.message_types_by_name['ShutdownClusterRequest']
 _SHUTDOWNCLUSTERREPLY = DESCRIPTOR.message_types_by_name['ShutdownClusterReply']
+_OFFLOADCHUNK = DESCRIPTOR.message_types_by_name['OffloadChunk']
+_OFFLOADREPLY = DESCRIPTOR.message_types_by_name['OffloadReply']
+_OFFLOADPROGRESSREQUEST = DESCRIPTOR.message_types_by_name['OffloadProgressRequest']
+_OFFLOADPROGRESSREPLY = DESCRIPTOR.message_types_by_name['OffloadProgressReply']
+_OFFLOADPROGRESSREPLY_HAVEBYTESENTRY = _OFFLOADPROGRESSREPLY.nested_types_by_name['HaveBytesEntry']
+_NODESTATUS_RECORDINGSTATE = _NODESTATUS.enum_types_by_name['RecordingState']
+_NODERESULT_NODESTATUS = _NODERESULT.enum_types_by_name['NodeStatus']
 _STARTCOLLECTINGREPLY_STARTCOLLECTINGRESULT = _STARTCOLLECTINGREPLY.enum_types_by_name['StartCollectingResult']
 _SHUTDOWNCLUSTERREPLY_SHUTDOWNRESULT = _SHUTDOWNCLUSTERREPLY.enum_types_by_name['ShutdownResult']
 GooseRequest = _reflection.GeneratedProtocolMessageType('GooseRequest', (_message.Message,), {
@@ -102,6 +125,49 @@ LiveSampleReply = _reflection.GeneratedProtocolMessageType('LiveSampleReply', (_
   })
 _sym_db.RegisterMessage(LiveSampleReply)
 
+FileChunk = _reflection.GeneratedProtocolMessageType('FileChunk', (_message.Message,), {
+  'DESCRIPTOR' : _FILECHUNK,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.FileChunk)
+  })
+_sym_db.RegisterMessage(FileChunk)
+
+FetchRecordingRequest = _reflection.GeneratedProtocolMessageType('FetchRecordingRequest', (_message.Message,), {
+
+  'HaveBytesEntry' : _reflection.GeneratedProtocolMessageType('HaveBytesEntry', (_message.Message,), {
+    'DESCRIPTOR' : _FETCHRECORDINGREQUEST_HAVEBYTESENTRY,
+    '__module__' : 'ccline.ccline_pb2'
+    # @@protoc_insertion_point(class_scope:ccline.FetchRecordingRequest.HaveBytesEntry)
+    })
+  ,
+  'DESCRIPTOR' : _FETCHRECORDINGREQUEST,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.FetchRecordingRequest)
+  })
+_sym_db.RegisterMessage(FetchRecordingRequest)
+_sym_db.RegisterMessage(FetchRecordingRequest.HaveBytesEntry)
+
+StatusRequest = _reflection.GeneratedProtocolMessageType('StatusRequest', (_message.Message,), {
+  'DESCRIPTOR' : _STATUSREQUEST,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.StatusRequest)
+  })
+_sym_db.RegisterMessage(StatusRequest)
+
+NodeStatus = _reflection.GeneratedProtocolMessageType('NodeStatus', (_message.Message,), {
+  'DESCRIPTOR' : _NODESTATUS,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.NodeStatus)
+  })
+_sym_db.RegisterMessage(NodeStatus)
+
+SensorStatus = _reflection.GeneratedProtocolMessageType('SensorStatus', (_message.Message,), {
+  'DESCRIPTOR' : _SENSORSTATUS,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.SensorStatus)
+  })
+_sym_db.RegisterMessage(SensorStatus)
+
 ShutdownRequest = _reflection.GeneratedProtocolMessageType('ShutdownRequest', (_message.Message,), {
   'DESCRIPTOR' : _SHUTDOWNREQUEST,
   '__module__' : 'ccline.ccline_pb2'
@@ -116,6 +182,13 @@ ShutdownReply = _reflection.GeneratedProtocolMessageType('ShutdownReply', (_mess
   })
 _sym_db.RegisterMessage(ShutdownReply)
 
+NodeResult = _reflection.GeneratedProtocolMessageType('NodeResult', (_message.Message,), {
+  'DESCRIPTOR' : _NODERESULT,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.NodeResult)
+  })
+_sym_db.RegisterMessage(NodeResult)
+
 StartCollectingRequest = _reflection.GeneratedProtocolMessageType('StartCollectingRequest', (_message.Message,), {
   'DESCRIPTOR' : _STARTCOLLECTINGREQUEST,
   '__module__' : 'ccline.ccline_pb2'
@@ -144,6 +217,69 @@ StopAllCollectsReply = _reflection.GeneratedProtocolMessageType('StopAllCollects
   })
 _sym_db.RegisterMessage(StopAllCollectsReply)
 
+ArrayStatusRequest = _reflection.GeneratedProtocolMessageType('ArrayStatusRequest', (_message.Message,), {
+  'DESCRIPTOR' : _ARRAYSTATUSREQUEST,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.ArrayStatusRequest)
+  })
+_sym_db.RegisterMessage(ArrayStatusRequest)
+
+ChannelStatus = _reflection.GeneratedProtocolMessageType('ChannelStatus', (_message.Message,), {
+  'DESCRIPTOR' : _CHANNELSTATUS,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.ChannelStatus)
+  })
+_sym_db.RegisterMessage(ChannelStatus)
+
+ArrayStatus = _reflection.GeneratedProtocolMessageType('ArrayStatus', (_message.Message,), {
+  'DESCRIPTOR' : _ARRAYSTATUS,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.ArrayStatus)
+  })
+_sym_db.RegisterMessage(ArrayStatus)
+
+SampleAllRequest = _reflection.GeneratedProtocolMessageType('SampleAllRequest', (_message.Message,), {
+  'DESCRIPTOR' : _SAMPLEALLREQUEST,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.SampleAllRequest)
+  })
+_sym_db.RegisterMessage(SampleAllRequest)
+
+SampleAllChunk = _reflection.GeneratedProtocolMessageType('SampleAllChunk', (_message.Message,), {
+  'DESCRIPTOR' : _SAMPLEALLCHUNK,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.SampleAllChunk)
+  })
+_sym_db.RegisterMessage(SampleAllChunk)
+
+ListRecordingsRequest = _reflection.GeneratedProtocolMessageType('ListRecordingsRequest', (_message.Message,), {
+  'DESCRIPTOR' : _LISTRECORDINGSREQUEST,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.ListRecordingsRequest)
+  })
+_sym_db.RegisterMessage(ListRecordingsRequest)
+
+RecordingNode = _reflection.GeneratedProtocolMessageType('RecordingNode', (_message.Message,), {
+  'DESCRIPTOR' : _RECORDINGNODE,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.RecordingNode)
+  })
+_sym_db.RegisterMessage(RecordingNode)
+
+Recording = _reflection.GeneratedProtocolMessageType('Recording', (_message.Message,), {
+  'DESCRIPTOR' : _RECORDING,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.Recording)
+  })
+_sym_db.RegisterMessage(Recording)
+
+ListRecordingsReply = _reflection.GeneratedProtocolMessageType('ListRecordingsReply', (_message.Message,), {
+  'DESCRIPTOR' : _LISTRECORDINGSREPLY,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.ListRecordingsReply)
+  })
+_sym_db.RegisterMessage(ListRecordingsReply)
+
 ShutdownClusterRequest = _reflection.GeneratedProtocolMessageType('ShutdownClusterRequest', (_message.Message,), {
   'DESCRIPTOR' : _SHUTDOWNCLUSTERREQUEST,
   '__module__' : 'ccline.ccline_pb2'
@@ -158,47 +294,136 @@ ShutdownClusterReply = _reflection.GeneratedProtocolMessageType('ShutdownCluster
   })
 _sym_db.RegisterMessage(ShutdownClusterReply)
 
+OffloadChunk = _reflection.GeneratedProtocolMessageType('OffloadChunk', (_message.Message,), {
+  'DESCRIPTOR' : _OFFLOADCHUNK,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.OffloadChunk)
+  })
+_sym_db.RegisterMessage(OffloadChunk)
+
+OffloadReply = _reflection.GeneratedProtocolMessageType('OffloadReply', (_message.Message,), {
+  'DESCRIPTOR' : _OFFLOADREPLY,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.OffloadReply)
+  })
+_sym_db.RegisterMessage(OffloadReply)
+
+OffloadProgressRequest = _reflection.GeneratedProtocolMessageType('OffloadProgressRequest', (_message.Message,), {
+  'DESCRIPTOR' : _OFFLOADPROGRESSREQUEST,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.OffloadProgressRequest)
+  })
+_sym_db.RegisterMessage(OffloadProgressRequest)
+
+OffloadProgressReply = _reflection.GeneratedProtocolMessageType('OffloadProgressReply', (_message.Message,), {
+
+  'HaveBytesEntry' : _reflection.GeneratedProtocolMessageType('HaveBytesEntry', (_message.Message,), {
+    'DESCRIPTOR' : _OFFLOADPROGRESSREPLY_HAVEBYTESENTRY,
+    '__module__' : 'ccline.ccline_pb2'
+    # @@protoc_insertion_point(class_scope:ccline.OffloadProgressReply.HaveBytesEntry)
+    })
+  ,
+  'DESCRIPTOR' : _OFFLOADPROGRESSREPLY,
+  '__module__' : 'ccline.ccline_pb2'
+  # @@protoc_insertion_point(class_scope:ccline.OffloadProgressReply)
+  })
+_sym_db.RegisterMessage(OffloadProgressReply)
+_sym_db.RegisterMessage(OffloadProgressReply.HaveBytesEntry)
+
 _NODE = DESCRIPTOR.services_by_name['Node']
 _COORDINATOR = DESCRIPTOR.services_by_name['Coordinator']
+_SINK = DESCRIPTOR.services_by_name['Sink']
 if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
-  _SENSORID._serialized_start=824
-  _SENSORID._serialized_end=948
+  _FETCHRECORDINGREQUEST_HAVEBYTESENTRY._options = None
+  _FETCHRECORDINGREQUEST_HAVEBYTESENTRY._serialized_options = b'8\001'
+  _OFFLOADPROGRESSREPLY_HAVEBYTESENTRY._options = None
+  _OFFLOADPROGRESSREPLY_HAVEBYTESENTRY._serialized_options = b'8\001'
+  _SENSORID._serialized_start=3555
+  _SENSORID._serialized_end=3679
   _GOOSEREQUEST._serialized_start=31
   _GOOSEREQUEST._serialized_end=45
   _GOOSEREPLY._serialized_start=47
   _GOOSEREPLY._serialized_end=88
-  _RECORDREQUEST._serialized_start=90
-  _RECORDREQUEST._serialized_end=211
-  _RECORDREPLY._serialized_start=213
-  _RECORDREPLY._serialized_end=226
-  _LIVESAMPLEREQUEST._serialized_start=228
-  _LIVESAMPLEREQUEST._serialized_end=285
-  _LIVESAMPLEREPLY._serialized_start=287
-  _LIVESAMPLEREPLY._serialized_end=319
-  _SHUTDOWNREQUEST._serialized_start=321
-  _SHUTDOWNREQUEST._serialized_end=338
-  _SHUTDOWNREPLY._serialized_start=340
-  _SHUTDOWNREPLY._serialized_end=355
-  _STARTCOLLECTINGREQUEST._serialized_start=357
-  _STARTCOLLECTINGREQUEST._serialized_end=426
-  _STARTCOLLECTINGREPLY._serialized_start=429
-  _STARTCOLLECTINGREPLY._serialized_end=593
-  _STARTCOLLECTINGREPLY_STARTCOLLECTINGRESULT._serialized_start=538
-  _STARTCOLLECTINGREPLY_STARTCOLLECTINGRESULT._serialized_end=593
-  _STOPALLCOLLECTSREQUEST._serialized_start=595
-  _STOPALLCOLLECTSREQUEST._serialized_end=619
-  _STOPALLCOLLECTSREPLY._serialized_start=621
-  _STOPALLCOLLECTSREPLY._serialized_end=643
-  _SHUTDOWNCLUSTERREQUEST._serialized_start=645
-  _SHUTDOWNCLUSTERREQUEST._serialized_end=669
-  _SHUTDOWNCLUSTERREPLY._serialized_start=672
-  _SHUTDOWNCLUSTERREPLY._serialized_end=822
-  _SHUTDOWNCLUSTERREPLY_SHUTDOWNRESULT._serialized_start=774
-  _SHUTDOWNCLUSTERREPLY_SHUTDOWNRESULT._serialized_end=822
-  _NODE._serialized_start=951
-  _NODE._serialized_end=1196
-  _COORDINATOR._serialized_start=1199
-  _COORDINATOR._serialized_end=1461
+  _RECORDREQUEST._serialized_start=91
+  _RECORDREQUEST._serialized_end=235
+  _RECORDREPLY._serialized_start=238
+  _RECORDREPLY._serialized_end=375
+  _LIVESAMPLEREQUEST._serialized_start=377
+  _LIVESAMPLEREQUEST._serialized_end=434
+  _LIVESAMPLEREPLY._serialized_start=436
+  _LIVESAMPLEREPLY._serialized_end=468
+  _FILECHUNK._serialized_start=470
+  _FILECHUNK._serialized_end=555
+  _FETCHRECORDINGREQUEST._serialized_start=558
+  _FETCHRECORDINGREQUEST._serialized_end=719
+  _FETCHRECORDINGREQUEST_HAVEBYTESENTRY._serialized_start=671
+  _FETCHRECORDINGREQUEST_HAVEBYTESENTRY._serialized_end=719
+  _STATUSREQUEST._serialized_start=721
+  _STATUSREQUEST._serialized_end=736
+  _NODESTATUS._serialized_start=739
+  _NODESTATUS._serialized_end=1218
+  _NODESTATUS_RECORDINGSTATE._serialized_start=1154
+  _NODESTATUS_RECORDINGSTATE._serialized_end=1218
+  _SENSORSTATUS._serialized_start=1220
+  _SENSORSTATUS._serialized_end=1296
+  _SHUTDOWNREQUEST._serialized_start=1298
+  _SHUTDOWNREQUEST._serialized_end=1332
+  _SHUTDOWNREPLY._serialized_start=1334
+  _SHUTDOWNREPLY._serialized_end=1436
+  _NODERESULT._serialized_start=1439
+  _NODERESULT._serialized_end=1636
+  _NODERESULT_NODESTATUS._serialized_start=1579
+  _NODERESULT_NODESTATUS._serialized_end=1636
+  _STARTCOLLECTINGREQUEST._serialized_start=1638
+  _STARTCOLLECTINGREQUEST._serialized_end=1745
+  _STARTCOLLECTINGREPLY._serialized_start=1748
+  _STARTCOLLECTINGREPLY._serialized_end=1977
+  _STARTCOLLECTINGREPLY_STARTCOLLECTINGRESULT._serialized_start=1922
+  _STARTCOLLECTINGREPLY_STARTCOLLECTINGRESULT._serialized_end=1977
+  _STOPALLCOLLECTSREQUEST._serialized_start=1979
+  _STOPALLCOLLECTSREQUEST._serialized_end=2003
+  _STOPALLCOLLECTSREPLY._serialized_start=2005
+  _STOPALLCOLLECTSREPLY._serialized_end=2086
+  _ARRAYSTATUSREQUEST._serialized_start=2088
+  _ARRAYSTATUSREQUEST._serialized_end=2108
+  _CHANNELSTATUS._serialized_start=2110
+  _CHANNELSTATUS._serialized_end=2213
+  _ARRAYSTATUS._serialized_start=2216
+  _ARRAYSTATUS._serialized_end=2355
+  _SAMPLEALLREQUEST._serialized_start=2357
+  _SAMPLEALLREQUEST._serialized_end=2413
+  _SAMPLEALLCHUNK._serialized_start=2415
+  _SAMPLEALLCHUNK._serialized_end=2523
+  _LISTRECORDINGSREQUEST._serialized_start=2525
+  _LISTRECORDINGSREQUEST._serialized_end=2630
+  _RECORDINGNODE._serialized_start=2632
+  _RECORDINGNODE._serialized_end=2708
+  _RECORDING._serialized_start=2711
+  _RECORDING._serialized_end=2885
+  _LISTRECORDINGSREPLY._serialized_start=2887
+  _LISTRECORDINGSREPLY._serialized_end=2947
+  _SHUTDOWNCLUSTERREQUEST._serialized_start=2949
+  _SHUTDOWNCLUSTERREQUEST._serialized_end=2988
+  _SHUTDOWNCLUSTERREPLY._serialized_start=2991
+  _SHUTDOWNCLUSTERREPLY._serialized_end=3204
+  _SHUTDOWNCLUSTERREPLY_SHUTDOWNRESULT._serialized_start=3156
+  _SHUTDOWNCLUSTERREPLY_SHUTDOWNRESULT._serialized_end=3204
+  _OFFLOADCHUNK._serialized_start=3206
+  _OFFLOADCHUNK._serialized_end=3293
+  _OFFLOADREPLY._serialized_start=3295
+  _OFFLOADREPLY._serialized_end=3333
+  _OFFLOADPROGRESSREQUEST._serialized_start=3335
+  _OFFLOADPROGRESSREQUEST._serialized_end=3413
+  _OFFLOADPROGRESSREPLY._serialized_start=3416
+  _OFFLOADPROGRESSREPLY._serialized_end=3553
+  _OFFLOADPROGRESSREPLY_HAVEBYTESENTRY._serialized_start=671
+  _OFFLOADPROGRESSREPLY_HAVEBYTESENTRY._serialized_end=719
+  _NODE._serialized_start=3682
+  _NODE._serialized_end=4127
+  _COORDINATOR._serialized_start=4130
+  _COORDINATOR._serialized_end=4608
+  _SINK._serialized_start=4611
+  _SINK._serialized_end=4758
 # @@protoc_insertion_point(module_scope)
@@ -45,6 +45,21 @@ class NodeStub(object):
                 request_serializer=ccline_dot_ccline__pb2.LiveSampleRequest.SerializeToString,
                 response_deserializer=ccline_dot_ccline__pb2.LiveSampleReply.FromString,
                 )
+        self.StreamLiveSample = channel.unary_stream(
+                '/ccline.Node/StreamLiveSample',
+                request_serializer=ccline_dot_ccline__pb2.LiveSampleRequest.SerializeToString,
+                response_deserializer=ccline_dot_ccline__pb2.FileChunk.FromString,
+                )
+        self.GetStatus = channel.unary_unary(
+                '/ccline.Node/GetStatus',
+                request_serializer=ccline_dot_ccline__pb2.StatusRequest.SerializeToString,
+                response_deserializer=ccline_dot_ccline__pb2.NodeStatus.FromString,
+                )
+        self.FetchRecording = channel.unary_stream(
+                '/ccline.Node/FetchRecording',
+                request_serializer=ccline_dot_ccline__pb2.FetchRecordingRequest.SerializeToString,
+                response_deserializer=ccline_dot_ccline__pb2.FileChunk.FromString,
+                )
         self.Shutdown = channel.unary_unary(
                 '/ccline.Node/Shutdown',
                 request_serializer=ccline_dot_ccline__pb2.ShutdownRequest.SerializeToString,
@@ -78,10 +93,35 @@ class NodeServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamLiveSample(self, request, context):
+        """Capture on this node and stream the image back in chunks. Prefer this
+        over LiveSample for full resolution images which can approach the GRPC
+        message size limit.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetStatus(self, request, context):
+        """Current state of this node. Answered from memory so it's cheap to poll.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def FetchRecording(self, request, context):
+        """Stream the files of a recording saved on this node. Files the client
+        already has are skipped and partial files resume where they left off.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def Shutdown(self, request, context):
-        """Tries to shut down this node. Use the coordinator ShutdownAll to power off
-        the entire cluster. There may be network or data-related reasons to shut
-        nodes off in a specific sequence.
+        """Stops any collection, flushes it to disk and shuts down this node. Replies
+        once the shutdown command has been started. Use the coordinator
+        ShutdownCluster to power off the entire cluster, which shuts the
+        coordinator down last.
         """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
@@ -105,6 +145,21 @@ def add_NodeServicer_to_server(servicer, server):
                     request_deserializer=ccline_dot_ccline__pb2.LiveSampleRequest.FromString,
                     response_serializer=ccline_dot_ccline__pb2.LiveSampleReply.SerializeToString,
             ),
+            'StreamLiveSample': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamLiveSample,
+                    request_deserializer=ccline_dot_ccline__pb2.LiveSampleRequest.FromString,
+                    response_serializer=ccline_dot_ccline__pb2.FileChunk.SerializeToString,
+            ),
+            'GetStatus': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetStatus,
+                    request_deserializer=ccline_dot_ccline__pb2.StatusRequest.FromString,
+                    response_serializer=ccline_dot_ccline__pb2.NodeStatus.SerializeToString,
+            ),
+            'FetchRecording': grpc.unary_stream_rpc_method_handler(
+                    servicer.FetchRecording,
+                    request_deserializer=ccline_dot_ccline__pb2.FetchRecordingRequest.FromString,
+                    response_serializer=ccline_dot_ccline__pb2.FileChunk.SerializeToString,
+            ),
             'Shutdown': grpc.unary_unary_rpc_method_handler(
                     servicer.Shutdown,
                     request_deserializer=ccline_dot_ccline__pb2.ShutdownRequest.FromString,
@@ -173,6 +228,57 @@ class Node(object):
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
+    @staticmethod
+    def StreamLiveSample(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/ccline.Node/StreamLiveSample',
+            ccline_dot_ccline__pb2.LiveSampleRequest.SerializeToString,
+            ccline_dot_ccline__pb2.FileChunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetStatus(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/ccline.Node/GetStatus',
+            ccline_dot_ccline__pb2.StatusRequest.SerializeToString,
+            ccline_dot_ccline__pb2.NodeStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def FetchRecording(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/ccline.Node/FetchRecording',
+            ccline_dot_ccline__pb2.FetchRecordingRequest.SerializeToString,
+            ccline_dot_ccline__pb2.FileChunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
     @staticmethod
     def Shutdown(request,
             target,
@@ -214,6 +320,21 @@ class CoordinatorStub(object):
                 request_serializer=ccline_dot_ccline__pb2.StopAllCollectsRequest.SerializeToString,
                 response_deserializer=ccline_dot_ccline__pb2.StopAllCollectsReply.FromString,
                 )
+        self.GetArrayStatus = channel.unary_unary(
+                '/ccline.Coordinator/GetArrayStatus',
+                request_serializer=ccline_dot_ccline__pb2.ArrayStatusRequest.SerializeToString,
+                response_deserializer=ccline_dot_ccline__pb2.ArrayStatus.FromString,
+                )
+        self.SampleAll = channel.unary_stream(
+                '/ccline.Coordinator/SampleAll',
+                request_serializer=ccline_dot_ccline__pb2.SampleAllRequest.SerializeToString,
+                response_deserializer=ccline_dot_ccline__pb2.SampleAllChunk.FromString,
+                )
+        self.ListRecordings = channel.unary_unary(
+                '/ccline.Coordinator/ListRecordings',
+                request_serializer=ccline_dot_ccline__pb2.ListRecordingsRequest.SerializeToString,
+                response_deserializer=ccline_dot_ccline__pb2.ListRecordingsReply.FromString,
+                )
         self.ShutdownCluster = channel.unary_unary(
                 '/ccline.Coordinator/ShutdownCluster',
                 request_serializer=ccline_dot_ccline__pb2.ShutdownClusterRequest.SerializeToString,
@@ -241,6 +362,28 @@ class CoordinatorServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetArrayStatus(self, request, context):
+        """Status of every node, gathered concurrently.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SampleAll(self, request, context):
+        """Captures a live sample on every node at once and streams all the images
+        back. Chunks from different nodes are interleaved.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ListRecordings(self, request, context):
+        """Recordings made by the array, from the coordinator's catalogue.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def ShutdownCluster(self, request, context):
         """Sequenced shutdown for all nodes. There is no programmatic way to turn the
         cluster back on.
@@ -262,6 +405,21 @@ def add_CoordinatorServicer_to_server(servicer, server):
                     request_deserializer=ccline_dot_ccline__pb2.StopAllCollectsRequest.FromString,
                     response_serializer=ccline_dot_ccline__pb2.StopAllCollectsReply.SerializeToString,
             ),
+            'GetArrayStatus': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetArrayStatus,
+                    request_deserializer=ccline_dot_ccline__pb2.ArrayStatusRequest.FromString,
+                    response_serializer=ccline_dot_ccline__pb2.ArrayStatus.SerializeToString,
+            ),
+            'SampleAll': grpc.unary_stream_rpc_method_handler(
+                    servicer.SampleAll,
+                    request_deserializer=ccline_dot_ccline__pb2.SampleAllRequest.FromString,
+                    response_serializer=ccline_dot_ccline__pb2.SampleAllChunk.SerializeToString,
+            ),
+            'ListRecordings': grpc.unary_unary_rpc_method_handler(
+                    servicer.ListRecordings,
+                    request_deserializer=ccline_dot_ccline__pb2.ListRecordingsRequest.FromString,
+                    response_serializer=ccline_dot_ccline__pb2.ListRecordingsReply.SerializeToString,
+            ),
             'ShutdownCluster': grpc.unary_unary_rpc_method_handler(
                     servicer.ShutdownCluster,
                     request_deserializer=ccline_dot_ccline__pb2.ShutdownClusterRequest.FromString,
@@ -315,6 +473,57 @@ class Coordinator(object):
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
 
+    @staticmethod
+    def GetArrayStatus(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/ccline.Coordinator/GetArrayStatus',
+            ccline_dot_ccline__pb2.ArrayStatusRequest.SerializeToString,
+            ccline_dot_ccline__pb2.ArrayStatus.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def SampleAll(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/ccline.Coordinator/SampleAll',
+            ccline_dot_ccline__pb2.SampleAllRequest.SerializeToString,
+            ccline_dot_ccline__pb2.SampleAllChunk.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ListRecordings(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/ccline.Coordinator/ListRecordings',
+            ccline_dot_ccline__pb2.ListRecordingsRequest.SerializeToString,
+            ccline_dot_ccline__pb2.ListRecordingsReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
     @staticmethod
     def ShutdownCluster(request,
             target,
@@ -331,3 +540,106 @@ class Coordinator(object):
             ccline_dot_ccline__pb2.ShutdownClusterReply.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+
+class SinkStub(object):
+    """Receives frames copied off the nodes while they're collecting. Runs on a
+    workstation rather than in the array.
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Upload = channel.stream_unary(
+                '/ccline.Sink/Upload',
+                request_serializer=ccline_dot_ccline__pb2.OffloadChunk.SerializeToString,
+                response_deserializer=ccline_dot_ccline__pb2.OffloadReply.FromString,
+                )
+        self.OffloadProgress = channel.unary_unary(
+                '/ccline.Sink/OffloadProgress',
+                request_serializer=ccline_dot_ccline__pb2.OffloadProgressRequest.SerializeToString,
+                response_deserializer=ccline_dot_ccline__pb2.OffloadProgressReply.FromString,
+                )
+
+
+class SinkServicer(object):
+    """Receives frames copied off the nodes while they're collecting. Runs on a
+    workstation rather than in the array.
+    """
+
+    def Upload(self, request_iterator, context):
+        """Receive one file. The first chunk may start part way into the file to
+        resume an interrupted upload.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def OffloadProgress(self, request, context):
+        """Bytes already received of each file of a recording from one node.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_SinkServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Upload': grpc.stream_unary_rpc_method_handler(
+                    servicer.Upload,
+                    request_deserializer=ccline_dot_ccline__pb2.OffloadChunk.FromString,
+                    response_serializer=ccline_dot_ccline__pb2.OffloadReply.SerializeToString,
+            ),
+            'OffloadProgress': grpc.unary_unary_rpc_method_handler(
+                    servicer.OffloadProgress,
+                    request_deserializer=ccline_dot_ccline__pb2.OffloadProgressRequest.FromString,
+                    response_serializer=ccline_dot_ccline__pb2.OffloadProgressReply.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'ccline.Sink', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+ # This class is part of an EXPERIMENTAL API.
+class Sink(object):
+    """Receives frames copied off the nodes while they're collecting. Runs on a
+    workstation rather than in the array.
+    """
+
+    @staticmethod
+    def Upload(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/ccline.Sink/Upload',
+            ccline_dot_ccline__pb2.OffloadChunk.SerializeToString,
+            ccline_dot_ccline__pb2.OffloadReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def OffloadProgress(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/ccline.Sink/OffloadProgress',
+            ccline_dot_ccline__pb2.OffloadProgressRequest.SerializeToString,
+            ccline_dot_ccline__pb2.OffloadProgressReply.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -0,0 +1,147 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Long-lived GRPC channels from the coordinator to each node.
+
+Opening a channel costs a TCP connection and an HTTP/2 handshake. The
+coordinator talks to the same few nodes for the whole time it's running so it
+keeps one channel per node open, with keepalive pings so an idle channel is
+still warm when the next command arrives. A channel that has failed is
+replaced the next time it's needed rather than waiting out GRPC's reconnect
+backoff.
+"""
+
+import asyncio
+import dataclasses
+from typing import Optional
+
+import gin
+import grpc
+
+from ccline import ccline_pb2_grpc
+from ccline.resolver import Resolver
+
+# Servers have to allow the keepalive pings sent by the pool or they will
+# close the connection with "too many pings".
+SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_ping_interval_without_data_ms", 5000),
+]
+
+
+@dataclasses.dataclass
+class ChannelStats:
+    """Counters for the channel to one node."""
+
+    # Number of channels opened, including the first one.
+    connects: int = 0
+    # Number of channels replaced after a failure.
+    reconnects: int = 0
+    # Number of failed requests reported by callers.
+    failures: int = 0
+    # Last observed grpc.ChannelConnectivity name, e.g. "READY".
+    state: str = "CLOSED"
+
+
+@gin.configurable()
+class ChannelPool:
+    """Keeps one open channel per node name."""
+
+    def __init__(
+        self,
+        resolver: Resolver,
+        keepalive_time_ms: int = 10000,
+        keepalive_timeout_ms: int = 5000,
+    ):
+        """Keeps one open channel per node name.
+
+        Args:
+          resolver: Maps names to addresses for the array.
+          keepalive_time_ms: Interval between keepalive pings on each channel.
+          keepalive_timeout_ms: Time to wait for a ping ack before the channel
+            is considered broken.
+        """
+        self.resolver = resolver
+        self.options = [
+            ("grpc.lb_policy_name", "pick_first"),
+            ("grpc.enable_retries", 0),
+            ("grpc.keepalive_time_ms", keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", keepalive_timeout_ms),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+        self.channels_: dict[str, grpc.aio.Channel] = {}
+        self.stats_: dict[str, ChannelStats] = {}
+
+    def open_all(self) -> None:
+        """Opens a channel to every node and starts connecting in the background."""
+        for node in self.resolver.all_nodes():
+            self.channel(node).get_state(try_to_connect=True)
+
+    def channel(self, node: str) -> grpc.aio.Channel:
+        """Returns a usable channel to `node`, opening a new one if needed."""
+        stats = self.stats_.setdefault(node, ChannelStats())
+        channel = self.channels_.get(node)
+        if channel is not None:
+            state = channel.get_state(try_to_connect=False)
+            stats.state = state.name
+            if state not in (
+                grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+                grpc.ChannelConnectivity.SHUTDOWN,
+            ):
+                return channel
+            print(f"Channel to {node} is {state.name}, reconnecting")
+            stats.reconnects += 1
+            self._discard(node)
+        channel = grpc.aio.insecure_channel(
+            target=self.resolver.address_for_name(node), options=self.options
+        )
+        self.channels_[node] = channel
+        stats.connects += 1
+        return channel
+
+    def stub(self, node: str) -> ccline_pb2_grpc.NodeStub:
+        return ccline_pb2_grpc.NodeStub(self.channel(node))
+
+    def report_failure(self, node: str, code: Optional[grpc.StatusCode]) -> None:
+        """Tells the pool a request to `node` failed.
+
+        A channel that can't reach the node is dropped so that the next request
+        reconnects immediately.
+        """
+        stats = self.stats_.setdefault(node, ChannelStats())
+        stats.failures += 1
+        if code == grpc.StatusCode.UNAVAILABLE and node in self.channels_:
+            stats.reconnects += 1
+            self._discard(node)
+
+    def stats(self) -> dict[str, ChannelStats]:
+        """Current counters and channel state for every node."""
+        for node, channel in self.channels_.items():
+            self.stats_[node].state = channel.get_state(try_to_connect=False).name
+        return {n: dataclasses.replace(s) for n, s in self.stats_.items()}
+
+    async def close(self) -> None:
+        for channel in self.channels_.values():
+            await channel.close()
+        self.channels_.clear()
+        for stats in self.stats_.values():
+            stats.state = "CLOSED"
+
+    def _discard(self, node: str) -> None:
+        # The old channel has nothing in flight that we care about so it can
+        # close in the background.
+        channel = self.channels_.pop(node)
+        self.stats_[node].state = "CLOSED"
+        asyncio.ensure_future(channel.close())
@@ -26,13 +26,18 @@ preferred and hopefully over time the CliRunner will eventually shrink in
 favour of Python implementations.
 """
 
+import asyncio
 import dataclasses
 import os
+import signal
 import subprocess
 from shlex import quote
+from typing import Optional
 
 import gin
 
+from ccline.frame_index import DEFAULT_PATTERN, run_pattern, run_stride
+
 
 @gin.configurable()
 @dataclasses.dataclass
@@ -40,14 +45,35 @@ class CliRunner:
     # Command line to start recording images.
     camera_video_cmd: list[str] | object = gin.REQUIRED
 
+    # Extra arguments for camera_video_cmd that start the camera without
+    # saving frames until the process receives SIGUSR1. With libcamera-vid this
+    # is ['--signal', '--initial', 'pause']. Leave empty if the command can't be
+    # started paused, then scheduled starts spawn the command at the start time.
+    camera_video_arm_args: list[str] | object = dataclasses.field(
+        default_factory=list
+    )
+
+    # Collection commands of the other sensors on the node by SensorId name,
+    # e.g. {'Camera2': [...], 'Imu1': [...]}. camera_video_cmd is Camera1's
+    # unless it's given here. Every command runs in the collection directory
+    # so each must save to its own file names. Camera commands are armed
+    # with camera_video_arm_args too.
+    sensor_cmds: dict[str, list[str]] = dataclasses.field(default_factory=dict)
+
     # Command line to save a single image.
     camera_live_sample_cmd: list[str] | object = gin.REQUIRED
 
+    # Command line that keeps the camera running and saving preview images for
+    # the warm sampler. It must keep a link named camera_preview_latest
+    # pointing at the newest complete image.
+    camera_preview_cmd: list[str] | object = dataclasses.field(default_factory=list)
+    camera_preview_latest: str = "latest.jpg"
+
     # Command for dig nameserver lookup or equivalent.
     dig_cmd: str | object = gin.REQUIRED
 
     # Command for shutting down the machine.
-    shutdown_cmd: str | object = gin.REQUIRED
+    shutdown_cmd: list[str] | object = gin.REQUIRED
 
     # Environment variables for most commands.
     # TODO: Add to config.
@@ -58,11 +84,21 @@ class CliRunner:
     # Root directory for all data that will be saved during operation.
     base_collection_path: str | object = gin.REQUIRED
 
+    # Signal asking the collection command to finish the frame it's writing
+    # and exit. libcamera-vid exits cleanly on SIGINT.
+    stop_signal: int = signal.SIGINT
+
+    # Seconds to wait for the collection command to exit after stop_signal
+    # before killing it.
+    stop_timeout_s: float = 5.0
+
     def __post_init__(self) -> None:
         # Path relative to base_collection_ path.
         self.collection_path_: str = "nocollection"
 
     def run_dig_cmd(self, hostname: str) -> str:
+        # Blocking, for looking a name up by hand. Resolver looks names up
+        # itself without starting a process.
         assert isinstance(self.dig_cmd, str)
         # See caveat at https://docs.python.org/3.10/library/shlex.html#shlex.quote
         proc = subprocess.run(
@@ -75,7 +111,7 @@ class CliRunner:
         )
         return proc.stdout.strip()
 
-    def run_live_sample_cmd(self) -> subprocess.Popen:
+    async def run_live_sample_cmd(self) -> asyncio.subprocess.Process:
         """Spawns shell command to capture a single image.
 
         Returns: The started process. It will likely end very soon after returning.
@@ -85,43 +121,121 @@ class CliRunner:
         directory = self.get_full_nocollection_path()
         os.makedirs(directory, exist_ok=True)
         # TODO: For the live sample it would be useful to capture logs from this command.
-        process = subprocess.Popen(
-            self.camera_live_sample_cmd, env=self.default_env, cwd=directory
+        process = await asyncio.create_subprocess_exec(
+            *self.camera_live_sample_cmd, env=self.default_env, cwd=directory
+        )
+        return process
+
+    async def run_preview_cmd(self) -> asyncio.subprocess.Process:
+        """Spawns the long running preview command.
+
+        Returns: The started process. It runs until it's terminated.
+
+        """
+        assert isinstance(self.camera_preview_cmd, list)
+        assert self.camera_preview_cmd, "CliRunner.camera_preview_cmd is not set"
+        directory = self.get_full_preview_path()
+        os.makedirs(directory, exist_ok=True)
+        process = await asyncio.create_subprocess_exec(
+            *self.camera_preview_cmd, env=self.default_env, cwd=directory
         )
         return process
 
-    def run_start_collection_cmd(self) -> subprocess.Popen:
+    async def run_start_collection_cmd(
+        self, armed: bool = False, sensor: str = "Camera1", run: int = 0
+    ) -> asyncio.subprocess.Process:
         """Spawns shell command to start imagery collection.
 
+        Args:
+          armed: True to start the camera paused. Call release_collection() to
+            begin saving frames. Requires camera_video_arm_args.
+          sensor: SensorId name of the sensor to collect from.
+          run: Number of times the command has been restarted during this
+            collection. Restarts number their frames after the earlier runs.
+
         Returns: The started process. Pass the process to stop_collection_cmd() to end it.
 
         """
-        assert isinstance(self.camera_video_cmd, list)
+        command = self.sensor_cmd(sensor)
+        assert command is not None, f"No collection command for {sensor}"
+        if run:
+            command = self.restart_cmd(command, run)
+        if armed:
+            assert self.can_arm(sensor)
+            assert isinstance(self.camera_video_arm_args, list)
+            command = command + self.camera_video_arm_args
         directory = self.get_full_collection_path()
         os.makedirs(directory, exist_ok=True)
-        process = subprocess.Popen(
-            self.camera_video_cmd, env=self.default_env, cwd=directory
+        process = await asyncio.create_subprocess_exec(
+            *command, env=self.default_env, cwd=directory
         )
         return process
 
-    def stop_collection_cmd(self, process: subprocess.Popen):
-        """Kills the given collection process and resets the collection path.
-
-        TODO: Should be able to use a signal other than kill.
+    def sensor_cmd(self, sensor: str = "Camera1") -> Optional[list[str]]:
+        """The collection command for a sensor, or None if it has none."""
+        if sensor in self.sensor_cmds:
+            return self.sensor_cmds[sensor]
+        if sensor == "Camera1":
+            assert isinstance(self.camera_video_cmd, list)
+            return self.camera_video_cmd
+        return None
+
+    def restart_cmd(self, command: list[str], run: int) -> list[str]:
+        """`command` changed to number its frames after `run` earlier runs."""
+        i = self._output_arg(command)
+        if i is None or run_stride(command[i]) is None:
+            print(f"Restarted {command[0]} may overwrite frames of earlier runs")
+            return command
+        return command[:i] + [run_pattern(command[i], run)] + command[i + 1 :]
+
+    def can_arm(self, sensor: str = "Camera1") -> bool:
+        """True if the collection command can be started paused."""
+        return bool(self.camera_video_arm_args) and sensor.startswith("Camera")
+
+    def release_collection(self, process: asyncio.subprocess.Process):
+        """Starts saving frames from a process started with armed=True."""
+        process.send_signal(signal.SIGUSR1)
+
+    async def stop_collection_cmd(
+        self, process: Optional[asyncio.subprocess.Process]
+    ) -> bool:
+        """Stops the given collection process and resets the collection path.
+
+        Sends stop_signal so the command can finish writing, and kills it if it
+        hasn't exited within stop_timeout_s. Waits for the process to exit so
+        every frame is on disk when this returns.
+
+        Returns: False if the process had to be killed, so its last frame may
+        be incomplete.
         """
-        if process:
-            process.kill()
         self.collection_path_ = "nocollection"
-
-    def run_shutdown_cmd(self) -> subprocess.Popen:
+        if not process or process.returncode is not None:
+            return True
+        try:
+            process.send_signal(self.stop_signal)
+            await asyncio.wait_for(process.wait(), self.stop_timeout_s)
+            return True
+        except ProcessLookupError:
+            # Exited just before the signal.
+            await process.wait()
+            return True
+        except asyncio.TimeoutError:
+            print(f"Collection didn't stop within {self.stop_timeout_s}s, killing it")
+        process.kill()
+        await process.wait()
+        return False
+
+    async def run_shutdown_cmd(self) -> asyncio.subprocess.Process:
         """Wrapper for shutdown.
 
         Returns: The started process. If this process ends then it likely means
         that shutdown has failed.
 
         """
-        assert isinstance(self.shutdown_cmd, str)
-        process = subprocess.Popen(self.shutdown_cmd, env=self.default_env)
+        assert isinstance(self.shutdown_cmd, list)
+        process = await asyncio.create_subprocess_exec(
+            *self.shutdown_cmd, env=self.default_env
+        )
         return process
 
     def get_full_nocollection_path(self):
@@ -137,6 +251,14 @@ class CliRunner:
         """
         return os.path.join(f"{self.base_collection_path}", "nocollection/")
 
+    def get_full_preview_path(self):
+        """Returns the absolute path to the preview directory under `nocollection`."""
+        return os.path.join(self.get_full_nocollection_path(), "preview/")
+
+    def get_preview_latest_path(self):
+        """Returns the path to the link to the newest preview image."""
+        return os.path.join(self.get_full_preview_path(), self.camera_preview_latest)
+
     def get_full_collection_path(self):
         """Returns the absolute path to the current collection directory.
 
@@ -152,6 +274,38 @@ class CliRunner:
         """
         return os.path.join(f"{self.base_collection_path}", f"{self.collection_path_}/")
 
+    def get_video_output_pattern(self) -> str:
+        """Returns the printf-style frame file name from camera_video_cmd.
+
+        Falls back to the default pattern if the command doesn't have an `-o`
+        or `--output` argument with a frame number in it.
+        """
+        return self.get_sensor_output_pattern("Camera1") or DEFAULT_PATTERN
+
+    def get_sensor_output_pattern(self, sensor: str) -> Optional[str]:
+        """Returns the printf-style frame file name from a sensor's command.
+
+        Camera1 falls back to the default pattern. Other sensors without an
+        `-o` or `--output` argument with a frame number in it, such as an IMU
+        writing a single log, give None.
+        """
+        command = self.sensor_cmd(sensor)
+        i = None if command is None else self._output_arg(command)
+        if i is not None:
+            assert command is not None
+            return command[i]
+        if sensor == "Camera1":
+            return DEFAULT_PATTERN
+        return None
+
+    @staticmethod
+    def _output_arg(command: list[str]) -> Optional[int]:
+        """Position of the printf-style output file name in `command`."""
+        for i, arg in enumerate(command[:-1]):
+            if arg in ("-o", "--output") and "%" in command[i + 1]:
+                return i + 1
+        return None
+
     def set_collection_path(self, collection_path: str):
         assert isinstance(self.collection_path_, str)
         self.collection_path_ = collection_path
@@ -16,26 +16,59 @@
 """Command line client for interacting with the ccline server."""
 
 import asyncio
-from typing import Optional
+import dataclasses
+import json
+import os
+import time
+from typing import Awaitable, Callable, ClassVar, Optional, Sequence
 
+import gin
 import grpc
 from absl import app, flags, logging
 
 from ccline import ccline_pb2, ccline_pb2_grpc
+from ccline.channel_pool import ChannelPool
 from ccline.config import Config, read_config, timestamp_stub
+from ccline.fetch import FETCH_CONCURRENCY, fetch_recording
 from ccline.resolver import Resolver
+from ccline.transfer import PartialFile, write_chunks
 
 flags.DEFINE_enum(
     "cmd",
     None,
-    ["start", "stop", "sample", "shutdown"],
+    ["start", "stop", "sample", "sample_all", "status", "list", "fetch", "shutdown"],
     "Send commands to all nodes in the array.",
 )
 
 flags.DEFINE_string("recording_id", None, "Text name for the recording.")
 
+flags.DEFINE_multi_string(
+    "recording_tag", [], "Tags for a new recording, or to filter list by."
+)
+
+flags.DEFINE_integer("list_limit", 20, "Most recordings to list. 0 for all.")
+
+flags.DEFINE_bool(
+    "force",
+    False,
+    "Start even if a node is short of disk space. With shutdown, shut the"
+    " coordinator down even if other nodes didn't acknowledge.",
+)
+
 flags.DEFINE_string("target_node_id", None, "Name of the node for this request.")
 
+flags.DEFINE_string(
+    "sample_dir", None, "Directory for sample_all images. Defaults to jot/s_<time>."
+)
+
+flags.DEFINE_string(
+    "fetch_dir", "jot", "Recordings are fetched to <fetch_dir>/<recording_id>/<node>/."
+)
+
+flags.DEFINE_integer(
+    "fetch_concurrency", FETCH_CONCURRENCY, "Nodes to fetch from at the same time."
+)
+
 FLAGS = flags.FLAGS
 
 CHANNEL_OPTIONS = [
@@ -45,23 +78,255 @@ CHANNEL_OPTIONS = [
 ]
 
 
-async def find_coordinator(resolver: Resolver):
-    coordinator = None
-    for candidate in resolver.all_nodes():
-        print(f"Candidate {candidate} {resolver.address_for_name(candidate)}")
+# Deadline for each node to answer while looking for the coordinator.
+GOOSE_TIMEOUT_S = 2
+
+# Errors from a cached coordinator that mean it should be discovered again.
+# UNIMPLEMENTED means the node is up but no longer runs the Coordinator service.
+STALE_COORDINATOR_CODES = [
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.UNIMPLEMENTED,
+]
+
+# Deadline for the coordinator to gather samples from every node.
+SAMPLE_ALL_TIMEOUT_S = 40
+
+# Deadline for requests to the coordinator. Longer than the time the
+# coordinator waits for each node so the per-node results make it back.
+COORDINATOR_TIMEOUT_S = 15
+
+# Deadline for shutting down the array. The coordinator waits for the other
+# nodes to acknowledge, then for its own node.
+SHUTDOWN_CLUSTER_TIMEOUT_S = 45
+
+
+def print_node_results(node_results) -> None:
+    for result in node_results:
+        status = ccline_pb2.NodeResult.NodeStatus.Name(result.status)
+        print(
+            f"  {result.node_id}: {status} {result.latency_ms:.1f} ms"
+            f" clock offset {result.clock_offset_ms:.1f} ms {result.message}"
+        )
+
+
+@gin.configurable()
+@dataclasses.dataclass
+class CoordinatorCache:
+    """Remembers which node is the coordinator so it isn't rediscovered.
+
+    The cache is kept in memory for the life of the process and in a file so
+    separate client runs can share it.
+    """
+
+    # File holding the cache. None to only cache in memory.
+    path: Optional[str] = os.path.join(
+        os.path.expanduser("~"), ".cache", "gammacam", "coordinator.json"
+    )
+    # Seconds before a cached coordinator is discovered again.
+    ttl_s: float = 600.0
+
+    # In-process cache shared by all instances, keyed like the file.
+    memory_: ClassVar[dict[str, dict]] = {}
+
+    @staticmethod
+    def key(resolver: Resolver) -> str:
+        # Different configs (e.g. dev.gin and prod.gin) have different
+        # coordinators so the cache is keyed by the candidate addresses.
+        addresses = [resolver.address_for_name(n) for n in resolver.all_nodes()]
+        return ",".join(sorted(addresses))
+
+    def get(self, resolver: Resolver) -> Optional[str]:
+        key = self.key(resolver)
+        entry = self.memory_.get(key)
+        if entry is None:
+            entry = self._read_file().get(key)
+        if entry is None or entry["expires"] < time.time():
+            return None
+        if entry["coordinator"] not in resolver.all_nodes():
+            return None
+        self.memory_[key] = entry
+        return entry["coordinator"]
+
+    def put(self, resolver: Resolver, coordinator: str) -> None:
+        entry = {"coordinator": coordinator, "expires": time.time() + self.ttl_s}
+        self._update(self.key(resolver), entry)
+
+    def forget(self, resolver: Resolver) -> None:
+        self._update(self.key(resolver), None)
+
+    def _update(self, key: str, entry: Optional[dict]) -> None:
+        if entry is None:
+            self.memory_.pop(key, None)
+        else:
+            self.memory_[key] = entry
+        if self.path is None:
+            return
+        entries = self._read_file()
+        if entry is None:
+            entries.pop(key, None)
+        else:
+            entries[key] = entry
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(entries, f)
+        except OSError as e:
+            print(f"Unable to save coordinator cache {self.path}: {e}")
+
+    def _read_file(self) -> dict[str, dict]:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+async def ask_goose(candidate: str, resolver: Resolver) -> Optional[str]:
+    """Sends Goose to one node. Returns the reply message or None on failure."""
+    try:
         async with grpc.aio.insecure_channel(
             target=resolver.address_for_name(candidate), options=CHANNEL_OPTIONS
         ) as channel:
             node = ccline_pb2_grpc.NodeStub(channel)
-            request = ccline_pb2.GooseRequest()
-            print(f"Sending {candidate} request {request}")
-            response = await node.Goose(request, timeout=2)
-        print(f"From {candidate} Received {response.message}")
-        if response.message == "Goose!":
-            coordinator = candidate
+            response = await node.Goose(
+                ccline_pb2.GooseRequest(), timeout=GOOSE_TIMEOUT_S
+            )
+    except grpc.aio.AioRpcError as e:
+        print(f"Candidate {candidate} failed: {e.code().name}")
+        return None
+    print(f"From {candidate} Received {response.message}")
+    return response.message
+
+
+async def probe_coordinator(resolver: Resolver) -> Optional[str]:
+    """Asks every node at once and returns the first one that replies Goose."""
+
+    async def ask(candidate: str):
+        return candidate, await ask_goose(candidate, resolver)
+
+    tasks = [asyncio.create_task(ask(c)) for c in resolver.all_nodes()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            candidate, message = await next_done
+            if message == "Goose!":
+                return candidate
+        return None
+    finally:
+        # Don't wait for nodes that are slow or powered off.
+        for task in tasks:
+            task.cancel()
+
+
+async def find_coordinator(
+    resolver: Resolver, use_cache: bool = True
+) -> Optional[str]:
+    """Returns the name of the coordinator node or None if it can't be found.
+
+    Args:
+      resolver: Maps names to IPs for the array.
+      use_cache: False to ignore the cached coordinator and ask the nodes.
+    """
+    cache = CoordinatorCache()
+    if use_cache:
+        coordinator = cache.get(resolver)
+        if coordinator is not None:
+            print(f"Cached coordinator {coordinator}")
+            return coordinator
+    coordinator = await probe_coordinator(resolver)
+    if coordinator is None:
+        cache.forget(resolver)
+    else:
+        cache.put(resolver, coordinator)
     return coordinator
 
 
+async def run_on_coordinator(
+    resolver: Resolver, command: Callable[[str, Resolver], Awaitable[None]]
+) -> bool:
+    """Runs `command(coordinator, resolver)` on the coordinator.
+
+    Uses the cached coordinator if there is one. If it can't be reached or is
+    no longer the coordinator then the coordinator is discovered again and the
+    command retried once.
+
+    Returns: False if no coordinator could be found.
+    """
+    coordinator = await find_coordinator(resolver)
+    if coordinator is None:
+        return False
+    try:
+        await command(coordinator, resolver)
+        return True
+    except grpc.aio.AioRpcError as e:
+        if e.code() not in STALE_COORDINATOR_CODES:
+            raise
+        print(f"Coordinator {coordinator} failed ({e.code().name}), rediscovering")
+    CoordinatorCache().forget(resolver)
+    coordinator = await find_coordinator(resolver, use_cache=False)
+    if coordinator is None:
+        return False
+    await command(coordinator, resolver)
+    return True
+
+
+class CoordinatorClient:
+    """Sends requests to the coordinator over a channel that stays open.
+
+    For clients that send many requests, like the hardware UI, so each one
+    doesn't pay for finding the coordinator and connecting to it. Create and
+    use it on one event loop.
+    """
+
+    def __init__(self, resolver: Resolver):
+        self.resolver = resolver
+        # Keeps the channel to the coordinator warm between requests.
+        self.channel_pool_ = ChannelPool(resolver)
+        self.coordinator_: Optional[str] = None
+
+    async def connect(self, use_cache: bool = True) -> str:
+        """Finds the coordinator and starts connecting to it.
+
+        Returns: The name of the coordinator.
+
+        Raises: RuntimeError if no coordinator could be found.
+        """
+        if self.coordinator_ is None or not use_cache:
+            coordinator = await find_coordinator(self.resolver, use_cache)
+            if coordinator is None:
+                raise RuntimeError("No coordinator found")
+            self.coordinator_ = coordinator
+        self.channel_pool_.channel(self.coordinator_).get_state(try_to_connect=True)
+        return self.coordinator_
+
+    async def call(self, method: str, request, timeout: float = COORDINATOR_TIMEOUT_S):
+        """Sends `request` to the Coordinator `method` and returns the reply.
+
+        Rediscovers the coordinator and retries once if it can't be reached or
+        is no longer the coordinator, like run_on_coordinator().
+        """
+        for use_cache in (True, False):
+            coordinator = await self.connect(use_cache)
+            stub = ccline_pb2_grpc.CoordinatorStub(
+                self.channel_pool_.channel(coordinator)
+            )
+            try:
+                return await getattr(stub, method)(request, timeout=timeout)
+            except grpc.aio.AioRpcError as e:
+                self.channel_pool_.report_failure(coordinator, e.code())
+                if e.code() not in STALE_COORDINATOR_CODES or not use_cache:
+                    raise
+                print(
+                    f"Coordinator {coordinator} failed ({e.code().name}),"
+                    " rediscovering"
+                )
+                CoordinatorCache().forget(self.resolver)
+
+    async def close(self) -> None:
+        await self.channel_pool_.close()
+
+
 async def request_sample(target_node_id: str, resolver: Resolver):
     print(
         f"Sample from {target_node_id} {resolver.address_for_name(target_node_id)}"
@@ -70,17 +335,51 @@ async def request_sample(target_node_id: str, resolver: Resolver):
         target=resolver.address_for_name(target_node_id), options=CHANNEL_OPTIONS
     ) as channel:
         node = ccline_pb2_grpc.NodeStub(channel)
-        response = await node.LiveSample(ccline_pb2.LiveSampleRequest(), timeout=10)
-    print(f"From {target_node_id}")
-    with open(f"sample-{target_node_id}.jpg", "wb") as f:
-        f.write(response.image)
+        chunks = node.StreamLiveSample(ccline_pb2.LiveSampleRequest(), timeout=10)
+        size = await write_chunks(chunks, f"sample-{target_node_id}.jpg")
+    print(f"From {target_node_id} {size} bytes")
+
+
+async def sample_all(coordinator: str, resolver: Resolver, directory: str) -> None:
+    """Captures a sample on every node at once and saves them in `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    files: dict[str, PartialFile] = {}
+    async with grpc.aio.insecure_channel(
+        target=resolver.address_for_name(coordinator), options=CHANNEL_OPTIONS
+    ) as channel:
+        goose = ccline_pb2_grpc.CoordinatorStub(channel)
+        stream = goose.SampleAll(
+            ccline_pb2.SampleAllRequest(), timeout=SAMPLE_ALL_TIMEOUT_S
+        )
+        try:
+            async for message in stream:
+                node = message.node_id
+                if message.HasField("chunk"):
+                    if node not in files:
+                        path = os.path.join(directory, f"sample-{node}.jpg")
+                        files[node] = PartialFile(path)
+                    files[node].write(message.chunk)
+                elif message.HasField("node_result"):
+                    print_node_results([message.node_result])
+                    partial_file = files.pop(node, None)
+                    if partial_file is None:
+                        continue
+                    if message.node_result.status == ccline_pb2.NodeResult.OK:
+                        partial_file.finish()
+                    else:
+                        partial_file.abort()
+        finally:
+            for partial_file in files.values():
+                partial_file.abort()
+    print(f"Samples saved to {directory}")
 
 
 async def start_collecting(
     coordinator: str,
     resolver: Resolver,
     recording_id: str,
-    recording_tag: Optional[str] = None,
+    recording_tags: Sequence[str] = (),
+    force: bool = False,
 ) -> None:
     print(
         f"Start collecting {coordinator}, {resolver.address_for_name(coordinator)}"
@@ -93,10 +392,14 @@ async def start_collecting(
         if recording_id is None:
             logging.fatal("Missing required recording_id.")
         request.recording_id = recording_id
-        if recording_tag is not None:
-            request.recording_tag.append(recording_tag)
-        response = await goose.StartCollecting(request, timeout=10)
+        request.recording_tag.extend(recording_tags)
+        request.force = force
+        response = await goose.StartCollecting(
+            request, timeout=COORDINATOR_TIMEOUT_S
+        )
     print(f"Start collecting response: {response.message}")
+    print(f"Start time {response.start_time_ns / 1e9:.3f}")
+    print_node_results(response.node_results)
 
 
 async def stop_collecting(coordinator: str, resolver: Resolver) -> None:
@@ -104,18 +407,111 @@ async def stop_collecting(coordinator: str, resolver: Resolver) -> None:
         target=resolver.address_for_name(coordinator), options=CHANNEL_OPTIONS
     ) as channel:
         goose = ccline_pb2_grpc.CoordinatorStub(channel)
-        _ = await goose.StopAllCollects(ccline_pb2.StopAllCollectsRequest(), timeout=10)
-    print("Stopped collecting")
+        response = await goose.StopAllCollects(
+            ccline_pb2.StopAllCollectsRequest(), timeout=COORDINATOR_TIMEOUT_S
+        )
+    print(f"Stopped collecting: {response.message}")
+    print_node_results(response.node_results)
 
 
-async def shutdown(coordinator: str, resolver: Resolver) -> None:
+async def array_status(coordinator: str, resolver: Resolver) -> None:
+    async with grpc.aio.insecure_channel(
+        target=resolver.address_for_name(coordinator), options=CHANNEL_OPTIONS
+    ) as channel:
+        goose = ccline_pb2_grpc.CoordinatorStub(channel)
+        response = await goose.GetArrayStatus(
+            ccline_pb2.ArrayStatusRequest(), timeout=COORDINATOR_TIMEOUT_S
+        )
+    channels = {c.node_id: c for c in response.channels}
+    print(
+        f"{'node':<12} {'state':<10} {'frames':>8} {'fps':>6} {'MB/s':>6}"
+        f" {'free GB':>8} {'left h':>6} {'reconnects':>10}"
+    )
+    for status in response.node_statuses:
+        state = ccline_pb2.NodeStatus.RecordingState.Name(status.state)
+        if status.stalled:
+            state += "!"
+        channel = channels.get(status.node_id)
+        reconnects = channel.reconnects if channel is not None else 0
+        print(
+            f"{status.node_id:<12} {state:<10} {status.frame_count:>8}"
+            f" {status.frames_per_s:>6.1f} {status.write_bytes_per_s / 1e6:>6.2f}"
+            f" {status.disk_free_bytes / 1e9:>8.1f} {status.remaining_s / 3600:>6.1f}"
+            f"{'!' if status.low_disk else ' '}{reconnects:>10}"
+        )
+        # Only sensors that have crashed are worth a line.
+        sensors = [
+            f"{s.sensor} {'up' if s.alive else 'down'}, {s.restarts} restarts"
+            for s in status.sensors
+            if s.restarts or not s.alive
+        ]
+        if sensors:
+            print(f"{'':<12} " + "; ".join(sensors))
+    unreachable = [r for r in response.node_results if r.status != r.OK]
+    if unreachable:
+        print("Unreachable:")
+        print_node_results(unreachable)
+
+
+async def list_recordings(
+    coordinator: str, resolver: Resolver, request: ccline_pb2.ListRecordingsRequest
+) -> None:
+    async with grpc.aio.insecure_channel(
+        target=resolver.address_for_name(coordinator), options=CHANNEL_OPTIONS
+    ) as channel:
+        goose = ccline_pb2_grpc.CoordinatorStub(channel)
+        response = await goose.ListRecordings(request, timeout=COORDINATOR_TIMEOUT_S)
+    print(
+        f"{'recording':<16} {'started':<19} {'minutes':>7} {'nodes':>5}"
+        f" {'frames':>8} {'GB':>7}  tags"
+    )
+    for recording in response.recordings:
+        started = time.strftime(
+            "%Y-%m-%d %H:%M:%S", time.localtime(recording.start_time_ns / 1e9)
+        )
+        if recording.stop_time_ns:
+            minutes = f"{(recording.stop_time_ns - recording.start_time_ns) / 6e10:.1f}"
+        else:
+            minutes = "going"
+        print(
+            f"{recording.recording_id:<16} {started:<19} {minutes:>7}"
+            f" {len(recording.nodes):>5} {recording.frame_count:>8}"
+            f" {recording.bytes_written / 1e9:>7.2f}  {','.join(recording.tags)}"
+        )
+
+
+async def fetch(resolver: Resolver, recording_id: str) -> None:
+    directory = os.path.join(FLAGS.fetch_dir, recording_id)
+    print(f"Fetching {recording_id} to {directory}")
+    outcomes = await fetch_recording(
+        resolver, recording_id, directory, FLAGS.fetch_concurrency
+    )
+    for outcome in outcomes:
+        if outcome.ok:
+            summary = outcome.response
+            outcome.message = f"{summary.files} files, {summary.bytes / 1e6:.1f} MB"
+    print_node_results([o.to_proto() for o in outcomes])
+
+
+async def shutdown(coordinator: str, resolver: Resolver, force: bool = False) -> None:
     print(f"Client sending shutdown to {resolver.address_for_name(coordinator)}")
     async with grpc.aio.insecure_channel(
         target=resolver.address_for_name(coordinator), options=CHANNEL_OPTIONS
     ) as channel:
         goose = ccline_pb2_grpc.CoordinatorStub(channel)
-        _ = await goose.ShutdownCluster(ccline_pb2.ShutdownClusterRequest())
-    print("Shutdown sent from client")
+        response = await goose.ShutdownCluster(
+            ccline_pb2.ShutdownClusterRequest(force=force),
+            timeout=SHUTDOWN_CLUSTER_TIMEOUT_S,
+        )
+    print(f"Shutdown sent from client: {response.message}")
+    print_node_results(response.node_results)
+    if response.result == ccline_pb2.ShutdownClusterReply.OK:
+        print(f"Safe to cut power in {response.power_off_s:.0f} s")
+    else:
+        print(
+            f"Nodes that acknowledged are safe to power off in"
+            f" {response.power_off_s:.0f} s"
+        )
 
 
 def run():
@@ -126,23 +522,40 @@ def run():
     recording_id = FLAGS.recording_id
     if recording_id is None:
         recording_id = f"r_{timestamp_stub()}"
+    sample_dir = FLAGS.sample_dir
+    if sample_dir is None:
+        sample_dir = os.path.join("jot", f"s_{timestamp_stub()}")
     resolver = Resolver()
     print(f"Command {command}, recording_id {recording_id}")
-    coordinator_commands = ["start", "stop", "shutdown"]
+    coordinator_commands = {
+        "start": lambda c, r: start_collecting(
+            c, r, recording_id, FLAGS.recording_tag, FLAGS.force
+        ),
+        "stop": stop_collecting,
+        "shutdown": lambda c, r: shutdown(c, r, FLAGS.force),
+        "status": array_status,
+        "sample_all": lambda c, r: sample_all(c, r, sample_dir),
+        "list": lambda c, r: list_recordings(
+            c,
+            r,
+            ccline_pb2.ListRecordingsRequest(
+                tags=FLAGS.recording_tag,
+                node_id=FLAGS.target_node_id or "",
+                limit=FLAGS.list_limit,
+            ),
+        ),
+    }
     if command in coordinator_commands:
-        coordinator = asyncio.run(find_coordinator(resolver=resolver))
-        if coordinator is None:
+        found = asyncio.run(
+            run_on_coordinator(resolver, coordinator_commands[command])
+        )
+        if not found:
             logging.fatal("Could not find coordinator.")
             exit()
-        if command == "start":
-            print(
-                f"Start command {coordinator}, {resolver.address_for_name(coordinator)}"
-            )
-            asyncio.run(start_collecting(coordinator, resolver, recording_id))
-        if command == "stop":
-            asyncio.run(stop_collecting(coordinator, resolver))
-        if command == "shutdown":
-            asyncio.run(shutdown(coordinator, resolver))
+    if command == "fetch":
+        if FLAGS.recording_id is None:
+            logging.fatal("fetch needs --recording_id.")
+        asyncio.run(fetch(resolver, recording_id))
     if command == "sample":
         target_node_id = config.target_node_id
         if target_node_id is None:
@@ -0,0 +1,122 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Concurrent fan-out of requests from the coordinator to the nodes.
+
+Every coordinator task ends up sending the same request to each node in the
+array. Sending them one after another makes the latency of the whole task the
+sum of the latency to each node, and the last node starts noticeably later
+than the first. The dispatcher sends to all nodes at once so the task takes
+as long as the slowest node, and collects a result per node so one missing
+node doesn't hide the outcome from the others.
+"""
+
+import asyncio
+import dataclasses
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import grpc
+
+from ccline import ccline_pb2
+
+
+@dataclasses.dataclass
+class NodeOutcome:
+    """Result of sending one request to one node."""
+
+    node_id: str
+    status: int = ccline_pb2.NodeResult.UNKNOWN
+    # The reply from the node, if any.
+    response: Optional[Any] = None
+    # Human readable detail, mostly useful on failure.
+    message: str = ""
+    # GRPC status if the request failed in GRPC.
+    code: Optional[grpc.StatusCode] = None
+    # Wall clock time (ns since epoch) just before sending and just after the
+    # reply arrived.
+    sent_ns: int = 0
+    received_ns: int = 0
+    latency_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == ccline_pb2.NodeResult.OK
+
+    def to_proto(self) -> ccline_pb2.NodeResult:
+        return ccline_pb2.NodeResult(
+            node_id=self.node_id,
+            status=self.status,
+            message=self.message,
+            latency_ms=self.latency_ms,
+        )
+
+
+async def call_node(
+    node_id: str, call: Callable[[str], Awaitable[Any]], timeout: Optional[float]
+) -> NodeOutcome:
+    """Runs `call(node_id)` with a deadline and records how it went."""
+    outcome = NodeOutcome(node_id)
+    start = time.monotonic()
+    outcome.sent_ns = time.time_ns()
+    try:
+        outcome.response = await asyncio.wait_for(call(node_id), timeout)
+        outcome.status = ccline_pb2.NodeResult.OK
+    except asyncio.TimeoutError:
+        outcome.status = ccline_pb2.NodeResult.TIMEOUT
+        outcome.message = f"No reply within {timeout}s"
+    except grpc.aio.AioRpcError as e:
+        outcome.code = e.code()
+        if e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+            outcome.status = ccline_pb2.NodeResult.TIMEOUT
+        else:
+            outcome.status = ccline_pb2.NodeResult.ERROR
+        outcome.message = f"{e.code().name}: {e.details()}"
+    except Exception as e:
+        # Failures outside GRPC, like a fetch that can't write to disk, are
+        # the node's outcome too rather than ending the whole fan-out.
+        print(f"Request to {node_id} failed: {e!r}")
+        outcome.status = ccline_pb2.NodeResult.ERROR
+        outcome.message = str(e) or type(e).__name__
+    outcome.received_ns = time.time_ns()
+    outcome.latency_ms = (time.monotonic() - start) * 1000.0
+    return outcome
+
+
+async def dispatch(
+    node_ids: Iterable[str],
+    call: Callable[[str], Awaitable[Any]],
+    timeout: Optional[float],
+) -> list[NodeOutcome]:
+    """Runs `call` for every node concurrently.
+
+    Args:
+      node_ids: Names of the nodes to send to.
+      call: Coroutine function taking a node name and returning its reply.
+      timeout: Deadline in seconds for each node, or None for no deadline.
+
+    Returns:
+      One outcome per node, in the same order as `node_ids`.
+    """
+    return list(await asyncio.gather(*(call_node(n, call, timeout) for n in node_ids)))
+
+
+def summarize(outcomes: list[NodeOutcome]) -> str:
+    """One line description of a fan-out for logs and replies."""
+    failed = [o.node_id for o in outcomes if not o.ok]
+    if not failed:
+        return f"All {len(outcomes)} nodes OK."
+    return f"{len(outcomes) - len(failed)}/{len(outcomes)} nodes OK, failed: " + (
+        ", ".join(failed)
+    )
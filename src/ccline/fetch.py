@@ -0,0 +1,277 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Retrieving a recording from every node in the array.
+
+Copying from one node after another takes as long as all of the transfers
+added together. Fetching from the nodes at the same time takes about as long
+as the slowest node instead. Each node's files land in
+`<directory>/<node>/` along with a manifest of the files received, their sizes
+and SHA-256 checksums. Running the fetch again only asks for files missing from
+the manifest, and a file that was cut off part way resumes where it stopped.
+
+Nodes send the checksum of each file with its last chunk. A file whose
+checksum doesn't match, e.g. because the part it resumed from was damaged, is
+deleted rather than added to the manifest, and fetched again from the start.
+"""
+
+import asyncio
+import dataclasses
+import functools
+import hashlib
+import json
+import os
+from typing import AsyncIterable, Callable, Iterable, Optional
+
+import grpc
+
+from ccline import ccline_pb2, ccline_pb2_grpc
+from ccline.dispatch import NodeOutcome, dispatch
+from ccline.resolver import Resolver
+from ccline.transfer import PartialFile
+from ccline.transform import Transformer
+
+MANIFEST_NAME = "manifest.json"
+
+# The manifest is saved after this many new files, so an interrupted fetch
+# only has to check a few files again.
+MANIFEST_SAVE_EVERY = 100
+
+# Nodes fetched from at the same time. The workstation link is shared so
+# more than a few at once doesn't make the whole fetch faster.
+FETCH_CONCURRENCY = 3
+
+# Times a node's files are requested before giving up on files whose
+# checksums don't match.
+FETCH_ATTEMPTS = 3
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Files received from one node, with their sizes and checksums."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        # File name to {"size": bytes, "sha256": hex digest}.
+        self.files: dict[str, dict] = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.files = json.load(f)["files"]
+        self.unsaved_ = 0
+
+    def have_bytes(self, names: Optional[Iterable[str]] = None) -> dict[str, int]:
+        """Bytes already received of each file, for FetchRecordingRequest.
+
+        Files in the manifest count as complete if they're still on disk with
+        the same size. Partial files from an interrupted transfer resume from
+        their current size.
+
+        Args:
+          names: Files to report on. None for every file in the directory.
+        """
+        if names is None:
+            names = set(self.files)
+            for name in os.listdir(self.directory):
+                if name.endswith(".part"):
+                    names.add(name[: -len(".part")])
+        have_bytes = {}
+        for name in names:
+            path = os.path.join(self.directory, name)
+            entry = self.files.get(name)
+            if (
+                entry is not None
+                and os.path.exists(path)
+                and os.path.getsize(path) == entry["size"]
+            ):
+                have_bytes[name] = entry["size"]
+            elif os.path.exists(path + ".part"):
+                have_bytes[name] = os.path.getsize(path + ".part")
+        return have_bytes
+
+    def add(self, name: str, size: int, sha256: str) -> None:
+        self.files[name] = {"size": size, "sha256": sha256}
+        self.unsaved_ += 1
+        if self.unsaved_ >= MANIFEST_SAVE_EVERY:
+            self.save()
+
+    def remove(self, name: str) -> None:
+        """Forgets a file so it's sent again from the start."""
+        if self.files.pop(name, None) is not None:
+            self.unsaved_ += 1
+        path = os.path.join(self.directory, name)
+        for stale in (path, path + ".part"):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    def save(self) -> None:
+        partial_path = self.path + ".part"
+        with open(partial_path, "w") as f:
+            json.dump({"files": self.files}, f, indent=1, sort_keys=True)
+        os.replace(partial_path, self.path)
+        self.unsaved_ = 0
+
+
+@dataclasses.dataclass
+class FetchSummary:
+    """What was received from one node."""
+
+    files: int = 0
+    bytes: int = 0
+    # Files deleted because they didn't match the sender's checksum.
+    mismatched: list[str] = dataclasses.field(default_factory=list)
+
+
+async def receive_recording(
+    chunks: AsyncIterable[ccline_pb2.FileChunk],
+    directory: str,
+    manifest: Optional[Manifest] = None,
+    on_file: Optional[Callable[[str], None]] = None,
+) -> FetchSummary:
+    """Writes a stream of files into `directory` and adds them to its manifest.
+
+    Args:
+      chunks: Chunks of one or more files, each file's chunks in order.
+      directory: Directory to save the files in.
+      manifest: Manifest of `directory` kept by the caller, who is responsible
+        for saving it. None to load the manifest and save it when done.
+      on_file: Called with the path of each file once it's complete.
+    """
+    os.makedirs(directory, exist_ok=True)
+    owns_manifest = manifest is None
+    if manifest is None:
+        manifest = Manifest(directory)
+    summary = FetchSummary()
+    partial_file: Optional[PartialFile] = None
+    try:
+        async for chunk in chunks:
+            path = os.path.join(directory, os.path.basename(chunk.name))
+            if partial_file is not None and partial_file.path != path:
+                # The previous file changed size while being sent.
+                partial_file.keep()
+                partial_file = None
+            if partial_file is None:
+                partial_file = PartialFile(path, resume=chunk.offset > 0)
+            partial_file.write(chunk)
+            summary.bytes += len(chunk.data)
+            if chunk.offset + len(chunk.data) < chunk.size:
+                continue
+            partial_file.finish()
+            name = os.path.basename(chunk.name)
+            sha256 = await asyncio.to_thread(file_sha256, partial_file.path)
+            partial_file = None
+            if chunk.sha256 and chunk.sha256 != sha256:
+                print(f"{name} doesn't match the sender's checksum, deleting it")
+                manifest.remove(name)
+                summary.mismatched.append(name)
+                continue
+            manifest.add(name, chunk.size, sha256)
+            summary.files += 1
+            if on_file is not None:
+                on_file(path)
+    finally:
+        if partial_file is not None:
+            # Keep what arrived so the next fetch resumes from there.
+            partial_file.keep()
+        if owns_manifest:
+            manifest.save()
+    return summary
+
+
+async def fetch_node(
+    node: str,
+    resolver: Resolver,
+    recording_id: str,
+    directory: str,
+    transformer: Optional[Transformer] = None,
+) -> FetchSummary:
+    """Fetches the files of one recording from one node into `<directory>/<node>`.
+
+    Files that don't match the node's checksums are fetched again, up to
+    FETCH_ATTEMPTS times in all.
+
+    Args:
+      transformer: Transforms the frames as they arrive, including any
+        received by earlier fetches that haven't been transformed yet.
+    """
+    node_dir = os.path.join(directory, node)
+    on_file = None
+    if transformer is not None:
+        on_file = functools.partial(transformer.submit, directory, node)
+        if os.path.isdir(node_dir):
+            for name in Manifest(node_dir).files:
+                if os.path.exists(os.path.join(node_dir, name)):
+                    on_file(os.path.join(node_dir, name))
+    summary = FetchSummary()
+    async with grpc.aio.insecure_channel(
+        target=resolver.address_for_name(node)
+    ) as channel:
+        stub = ccline_pb2_grpc.NodeStub(channel)
+        for _ in range(FETCH_ATTEMPTS):
+            request = ccline_pb2.FetchRecordingRequest(recording_id=recording_id)
+            if os.path.isdir(node_dir):
+                request.have_bytes.update(Manifest(node_dir).have_bytes())
+            received = await receive_recording(
+                stub.FetchRecording(request), node_dir, on_file=on_file
+            )
+            summary.files += received.files
+            summary.bytes += received.bytes
+            summary.mismatched = received.mismatched
+            if not received.mismatched:
+                return summary
+            print(f"Fetching {len(received.mismatched)} files from {node} again")
+    raise RuntimeError(
+        f"Checksums of {', '.join(summary.mismatched)} from {node} don't match"
+    )
+
+
+async def fetch_recording(
+    resolver: Resolver,
+    recording_id: str,
+    directory: str,
+    concurrency: int = FETCH_CONCURRENCY,
+) -> list[NodeOutcome]:
+    """Fetches a recording from every node into `<directory>/<node>/`.
+
+    Frames of nodes with a transform profile are also transformed into
+    `<directory>.transformed/<node>/` as they arrive.
+
+    Returns:
+      One outcome per node with a FetchSummary as the response if it worked.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    transformer = Transformer(resolver.transforms())
+
+    async def fetch(node: str) -> FetchSummary:
+        async with semaphore:
+            return await fetch_node(
+                node, resolver, recording_id, directory, transformer
+            )
+
+    try:
+        # Transfers take as long as they take, so no deadline.
+        outcomes = await dispatch(resolver.all_nodes(), fetch, timeout=None)
+        await transformer.wait()
+    finally:
+        transformer.close()
+    if transformer.transformed:
+        print(f"Transformed {transformer.transformed} frames")
+    return outcomes
@@ -0,0 +1,236 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Keeps track of the frames saved during a collection.
+
+A long collection has tens of thousands of frames in one directory so listing
+the directory to count them gets slow. The collection command numbers frames
+in order (`frame-%06d.jpg`) so the index only has to look for the next file
+names after the last one it found. Each refresh costs a couple of `stat` calls
+plus one per new frame, no matter how long the recording is.
+
+A collection command restarted after a crash numbers its frames from zero
+again, so restarts are given a pattern that numbers frames from the next
+multiple of `run_stride` instead (`frame-1%05d.jpg` for `frame-%06d.jpg`).
+The index follows on to the next run when the current one ends.
+"""
+
+import collections
+import os
+import re
+import time
+from typing import Callable, Optional
+
+# printf-style name of the frames saved by the collection command.
+DEFAULT_PATTERN = "frame-%06d.jpg"
+
+# Collection commands number the first frame 0 or 1.
+FIRST_INDICES = [0, 1]
+
+# Frame and write rates are averaged over about this many seconds.
+RATE_WINDOW_S = 10.0
+
+_NUMBER = re.compile(r"%0(\d+)d")
+
+
+def run_stride(pattern: str) -> Optional[int]:
+    """Frame numbers set aside for each run of the collection command.
+
+    None if the frame numbers in `pattern` aren't zero padded, so restarts
+    can't be numbered apart from the first run.
+    """
+    match = _NUMBER.search(pattern)
+    if match is None or int(match.group(1)) < 2:
+        return None
+    return 10 ** (int(match.group(1)) - 1)
+
+
+def run_pattern(pattern: str, run: int) -> str:
+    """The frame pattern for a restarted collection command.
+
+    Its frames are numbered from `run * run_stride(pattern)`, as if by
+    `pattern`, so they follow on from the earlier runs.
+    """
+    if run == 0:
+        return pattern
+    match = _NUMBER.search(pattern)
+    assert match is not None
+    width = int(match.group(1)) - 1
+    return f"{pattern[: match.start()]}{run}%0{width}d{pattern[match.end() :]}"
+
+
+class FrameIndex:
+    """Counts the frames saved in one collection directory."""
+
+    def __init__(self, directory: str, pattern: str = DEFAULT_PATTERN):
+        """Counts the frames saved in one collection directory.
+
+        Args:
+          directory: Directory the collection command saves frames to.
+          pattern: printf-style file name of each frame with the frame number.
+        """
+        self.directory = directory
+        self.pattern = pattern
+        self.frame_count = 0
+        # Modification time of the newest frame, ns since the epoch.
+        self.last_frame_time_ns = 0
+        # Number of the next frame to look for, or None until the first frame.
+        self.next_index_: Optional[int] = None
+        self.first_index_: Optional[int] = None
+        # Last frame of each run to the first frame of the next run, and back.
+        self.run_starts_: dict[int, int] = {}
+        self.run_ends_: dict[int, int] = {}
+        # Bytes in all frames except the newest, which may still be growing.
+        self.complete_bytes_ = 0
+        self.newest_bytes_ = 0
+        # (monotonic time, frame count, bytes written) at each refresh.
+        self.samples_: collections.deque = collections.deque()
+        # Called with the path and stat of each frame once it's complete.
+        self.on_complete: Optional[Callable[[str, os.stat_result], None]] = None
+
+    def frame_path(self, index: int) -> str:
+        return os.path.join(self.directory, self.pattern % index)
+
+    @property
+    def bytes_written(self) -> int:
+        return self.complete_bytes_ + self.newest_bytes_
+
+    def refresh(self) -> int:
+        """Picks up frames saved since the last refresh.
+
+        Returns: The number of new frames.
+        """
+        new_frames = self._find_new_frames()
+        now = time.monotonic()
+        self.samples_.append((now, self.frame_count, self.bytes_written))
+        # Keep one sample from before the window as the starting point.
+        while len(self.samples_) > 2 and self.samples_[1][0] <= now - RATE_WINDOW_S:
+            self.samples_.popleft()
+        return new_frames
+
+    def rates(self) -> tuple[float, float]:
+        """Frames per second and bytes per second over the recent window."""
+        if len(self.samples_) < 2:
+            return 0.0, 0.0
+        start_s, start_frames, start_bytes = self.samples_[0]
+        end_s, end_frames, end_bytes = self.samples_[-1]
+        if end_s <= start_s:
+            return 0.0, 0.0
+        duration_s = end_s - start_s
+        return (
+            (end_frames - start_frames) / duration_s,
+            (end_bytes - start_bytes) / duration_s,
+        )
+
+    def _find_new_frames(self) -> int:
+        if self.next_index_ is None:
+            for index in FIRST_INDICES:
+                if os.path.exists(self.frame_path(index)):
+                    self.next_index_ = index
+                    self.first_index_ = index
+                    break
+            else:
+                return 0
+        new_frames = 0
+        while True:
+            try:
+                stat = os.stat(self.frame_path(self.next_index_))
+            except FileNotFoundError:
+                if self._find_next_run():
+                    continue
+                break
+            if self.frame_count:
+                # The previous newest frame is finished now that there's a
+                # later one.
+                self._complete(self.previous(self.next_index_))
+            self.next_index_ += 1
+            self.frame_count += 1
+            new_frames += 1
+            self.newest_bytes_ = stat.st_size
+            self.last_frame_time_ns = stat.st_mtime_ns
+        if self.frame_count and not new_frames:
+            self.newest_bytes_ = self._size(self.newest_index())
+        return new_frames
+
+    def _find_next_run(self) -> bool:
+        """Moves on to the first frame of a restarted run, if there is one."""
+        stride = run_stride(self.pattern)
+        if stride is None or not self.frame_count:
+            return False
+        start = (self.next_index_ // stride + 1) * stride
+        for index in FIRST_INDICES:
+            if os.path.exists(self.frame_path(start + index)):
+                newest = self.next_index_ - 1
+                self.run_starts_[newest] = start + index
+                self.run_ends_[start + index] = newest
+                self.next_index_ = start + index
+                return True
+        return False
+
+    def next_after(self, index: int) -> int:
+        """Number of the frame after frame `index`."""
+        return self.run_starts_.get(index, index + 1)
+
+    def previous(self, index: int) -> int:
+        """Number of the frame before frame `index`."""
+        return self.run_ends_.get(index, index - 1)
+
+    def first_index(self) -> Optional[int]:
+        return self.first_index_
+
+    def finish(self) -> None:
+        """Reports the newest frame complete once the collection has stopped."""
+        self.refresh()
+        newest = self.newest_index()
+        if newest is not None and self.on_complete is not None:
+            path = self.frame_path(newest)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return
+            self.on_complete(path, stat)
+
+    def _complete(self, index: int) -> None:
+        path = self.frame_path(index)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        self.complete_bytes_ += stat.st_size
+        if self.on_complete is not None:
+            self.on_complete(path, stat)
+
+    def newest_index(self) -> Optional[int]:
+        if not self.frame_count:
+            return None
+        return self.next_index_ - 1
+
+    def latest_complete(self) -> Optional[str]:
+        """Path to the newest frame that's finished being written.
+
+        Frames are written in order so every frame except the newest one is
+        complete. The newest frame is returned if it's the only one.
+        """
+        if not self.frame_count:
+            return None
+        newest = self.next_index_ - 1
+        if self.frame_count == 1:
+            return self.frame_path(newest)
+        return self.frame_path(self.previous(newest))
+
+    def _size(self, index: int) -> int:
+        try:
+            return os.path.getsize(self.frame_path(index))
+        except FileNotFoundError:
+            return 0
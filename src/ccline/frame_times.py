@@ -0,0 +1,137 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""When each frame was saved, for matching frames across nodes.
+
+Frame numbers don't line up across nodes once one of them drops a frame, so
+matching "the same moment" by number drifts. Each node writes a small sidecar,
+`frames.csv` in the recording directory, with the time each frame was
+completed. It's fetched along with the frames, and `match_frames` joins the
+sidecars of all the nodes into sets of frames taken at the same time. Other
+sensors on a node each get their own sidecar, `frames_<sensor>.csv`, next to
+Camera1's.
+
+Times are the modification time of the frame file on the node's clock, so
+they're only as close as the node clocks (see chrony in the usage notes) plus
+the encode time of a frame.
+"""
+
+import csv
+import os
+from typing import IO, Iterable, Iterator, Optional
+
+SIDECAR_NAME = "frames.csv"
+FIELDS = ["frame", "time_ns", "bytes"]
+
+
+def sidecar_name(sensor: str = "Camera1") -> str:
+    """Sidecar of a sensor. Camera1's is the one `match_frames` reads."""
+    if sensor == "Camera1":
+        return SIDECAR_NAME
+    return f"frames_{sensor}.csv"
+
+
+class FrameTimesWriter:
+    """Appends a line to the sidecar for each completed frame."""
+
+    def __init__(self, directory: str, name: str = SIDECAR_NAME):
+        self.path = os.path.join(directory, name)
+        self.file_: Optional[IO[str]] = None
+
+    def add(self, path: str, stat: os.stat_result) -> None:
+        """Records the frame at `path`. Fits FrameIndex.on_complete."""
+        if self.file_ is None:
+            # Opened on the first frame, once the collection has made the
+            # directory.
+            is_new = not os.path.exists(self.path)
+            self.file_ = open(self.path, "a")
+            if is_new:
+                self.file_.write(",".join(FIELDS) + "\n")
+        # One write per line so a reader never sees half a line.
+        name = os.path.basename(path)
+        self.file_.write(f"{name},{stat.st_mtime_ns},{stat.st_size}\n")
+        self.file_.flush()
+
+    def close(self) -> None:
+        if self.file_ is not None:
+            self.file_.close()
+            self.file_ = None
+
+
+def read_frame_times(path: str) -> Iterator[tuple[int, str]]:
+    """Yields (time_ns, frame name) from a sidecar, in file order.
+
+    Lines that can't be read, such as a partial last line, are skipped.
+    """
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                yield int(row["time_ns"]), row["frame"]
+            except (TypeError, ValueError):
+                continue
+
+
+class _Cursor:
+    """Walks one node's frame times alongside the reference times."""
+
+    def __init__(self, times: Iterable[tuple[int, str]]):
+        self.times_ = iter(times)
+        self.before: Optional[tuple[int, str]] = None
+        self.after = next(self.times_, None)
+
+    def nearest(self, time_ns: int, tolerance_ns: int) -> Optional[str]:
+        """The frame closest to `time_ns` within the tolerance, if any.
+
+        Times passed in must not decrease from one call to the next.
+        """
+        while self.after is not None and self.after[0] <= time_ns:
+            self.before = self.after
+            self.after = next(self.times_, None)
+        candidates = [c for c in (self.before, self.after) if c is not None]
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda c: abs(c[0] - time_ns))
+        if abs(best[0] - time_ns) > tolerance_ns:
+            return None
+        return best[1]
+
+
+def match_frames(
+    node_times: dict[str, Iterable[tuple[int, str]]],
+    reference: str,
+    tolerance_ns: int,
+) -> Iterator[tuple[int, dict[str, Optional[str]]]]:
+    """Finds the frame of every node nearest to each frame of the reference node.
+
+    Reads each node's times once, in order, holding only a couple of frames per
+    node in memory, so it handles recordings of any length.
+
+    Args:
+      node_times: (time_ns, frame name) of each node in time order.
+      reference: Node whose frames set the times of the frame sets.
+      tolerance_ns: Frames further than this from the reference frame aren't
+        matched.
+
+    Yields:
+      (reference time_ns, frame name of each node or None if it has no frame
+      within the tolerance).
+    """
+    cursors = {
+        node: _Cursor(times) for node, times in node_times.items() if node != reference
+    }
+    for time_ns, frame in node_times[reference]:
+        frame_set: dict[str, Optional[str]] = {reference: frame}
+        for node, cursor in cursors.items():
+            frame_set[node] = cursor.nearest(time_ns, tolerance_ns)
+        yield time_ns, frame_set
@@ -0,0 +1,172 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Looks up `.local` names with multicast DNS.
+
+Nodes on a network without a DNS server announce themselves as
+`<hostname>.local` with avahi. Looking them up through the system resolver
+depends on nss-mdns being installed and goes one name at a time. Here every
+name is asked for in one burst of one-shot queries (RFC 6762 section 5.1)
+from a single socket, and the answers, sent straight back to that socket,
+are collected until every name is found or the timeout passes.
+
+Only IPv4 addresses (A records) are looked up, as that's what the array's
+configs use.
+"""
+
+import asyncio
+import socket
+import struct
+from typing import Iterable, Optional
+
+MDNS_ADDRESS = ("224.0.0.251", 5353)
+
+TYPE_A = 1
+CLASS_IN = 1
+
+# Pointer to an earlier name in a DNS message.
+POINTER = 0xC0
+
+
+def build_query(name: str, query_id: int) -> bytes:
+    """A DNS query for the A record of `name`."""
+    header = struct.pack("!HHHHHH", query_id, 0, 1, 0, 0, 0)
+    question = b"".join(
+        bytes([len(label)]) + label.encode() for label in name.rstrip(".").split(".")
+    )
+    return header + question + b"\0" + struct.pack("!HH", TYPE_A, CLASS_IN)
+
+
+def read_name(message: bytes, offset: int) -> tuple[str, int]:
+    """Reads a possibly compressed name.
+
+    Returns: The name in lower case and the offset just after it.
+    """
+    labels = []
+    end = None
+    # Each pointer must go backwards so a bad message can't loop forever.
+    limit = offset
+    while True:
+        if offset >= len(message):
+            raise ValueError("Name runs past the end of the message")
+        length = message[offset]
+        if length & POINTER == POINTER:
+            if offset + 1 >= len(message):
+                raise ValueError("Truncated name pointer")
+            target = ((length & ~POINTER) << 8) | message[offset + 1]
+            if target >= limit:
+                raise ValueError("Name pointer doesn't point back")
+            if end is None:
+                end = offset + 2
+            offset = limit = target
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(message[offset : offset + length].decode(errors="replace"))
+        offset += length
+    return ".".join(labels).lower(), offset if end is None else end
+
+
+def parse_addresses(message: bytes) -> dict[str, str]:
+    """IPv4 addresses in the answers of a DNS response, by lower case name."""
+    if len(message) < 12:
+        raise ValueError("Message shorter than a header")
+    _, flags, questions, answers, authorities, additional = struct.unpack(
+        "!HHHHHH", message[:12]
+    )
+    if not flags & 0x8000:
+        # A query, maybe our own looped back.
+        return {}
+    offset = 12
+    for _ in range(questions):
+        _, offset = read_name(message, offset)
+        offset += 4
+    addresses = {}
+    for _ in range(answers + authorities + additional):
+        name, offset = read_name(message, offset)
+        if offset + 10 > len(message):
+            raise ValueError("Truncated record")
+        record_type, record_class, _, length = struct.unpack(
+            "!HHIH", message[offset : offset + 10]
+        )
+        offset += 10
+        data = message[offset : offset + length]
+        offset += length
+        # The top bit of the class is mDNS's cache flush flag.
+        if record_type == TYPE_A and record_class & 0x7FFF == CLASS_IN:
+            if len(data) == 4:
+                addresses[name] = socket.inet_ntoa(data)
+    return addresses
+
+
+class _Responses(asyncio.DatagramProtocol):
+
+    def __init__(self, wanted: set[str]):
+        self.wanted = wanted
+        self.found: dict[str, str] = {}
+        self.all_found = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            addresses = parse_addresses(data)
+        except ValueError:
+            return
+        for name, address in addresses.items():
+            if name in self.wanted:
+                self.found.setdefault(name, address)
+        if len(self.found) == len(self.wanted) and not self.all_found.done():
+            self.all_found.set_result(None)
+
+    def error_received(self, exc: Exception) -> None:
+        print(f"mDNS lookup error: {exc}")
+
+
+async def resolve(
+    names: Iterable[str],
+    timeout_s: float,
+    address: tuple[str, int] = MDNS_ADDRESS,
+) -> dict[str, str]:
+    """Looks up all of `names` at once.
+
+    Args:
+      names: Names ending in `.local`.
+      timeout_s: Time to wait for the answers.
+      address: Where to send the queries. The mDNS group unless testing.
+
+    Returns: The IPv4 address of each name that answered in time.
+    """
+    names = list(names)
+    wanted = {n.rstrip(".").lower() for n in names}
+    if not wanted:
+        return {}
+    loop = asyncio.get_running_loop()
+    transport, responses = await loop.create_datagram_endpoint(
+        lambda: _Responses(wanted), local_addr=("0.0.0.0", 0)
+    )
+    try:
+        for query_id, name in enumerate(wanted, start=1):
+            transport.sendto(build_query(name, query_id), address)
+        try:
+            await asyncio.wait_for(responses.all_found, timeout_s)
+        except asyncio.TimeoutError:
+            pass
+    finally:
+        transport.close()
+    found: dict[str, str] = {}
+    for name in names:
+        address_found: Optional[str] = responses.found.get(name.rstrip(".").lower())
+        if address_found is not None:
+            found[name] = address_found
+    return found
@@ -0,0 +1,257 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Copying frames off a node while it's collecting.
+
+Without offload every frame stays on the SD card until the recording is
+fetched, which limits recordings to the card size and makes the fetch the
+longest step of a collection. The offloader uploads each frame to a sink on a
+workstation (see `sink.py`) as soon as the collection command moves on to the
+next one, so most of the recording is already off the array when it stops.
+
+Frames found on disk go into a bounded queue for the uploader. If the network
+can't keep up the queue fills and the offloader stops looking for new frames
+until there's room, leaving them on disk rather than holding them in memory.
+Upload failures are retried with backoff, including a file the sink saved
+with the wrong checksum. After a failure the sink is asked how much of the
+file it has so the upload resumes rather than starting over.
+Frames that can't be read, e.g. because they were deleted to make room, are
+skipped. If the uploader fails outright the offloader stops looking for
+frames rather than waiting forever for room in the queue.
+
+Set `Offloader.sink_address` to enable it.
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator, Optional
+
+import gin
+import grpc
+
+from ccline import ccline_pb2, ccline_pb2_grpc
+from ccline.frame_index import FrameIndex
+from ccline.transfer import read_chunks
+
+# First delay before retrying a failed upload. Doubles on each failure.
+RETRY_MIN_S = 0.5
+
+# Deadline for the sink to report its progress on a file.
+PROGRESS_TIMEOUT_S = 5.0
+
+
+@gin.configurable(denylist=["node_id"])
+class Offloader:
+    """Uploads the frames of one collection to the sink as they're saved."""
+
+    def __init__(
+        self,
+        node_id: str,
+        sink_address: Optional[str] = None,
+        queue_frames: int = 32,
+        poll_s: float = 0.5,
+        retry_max_s: float = 30.0,
+    ):
+        """Uploads the frames of one collection to the sink as they're saved.
+
+        Args:
+          node_id: Name of this node, which the sink saves the frames under.
+          sink_address: host:port of the sink. None to disable offload.
+          queue_frames: Frames waiting to upload before the offloader stops
+            looking for more.
+          poll_s: Interval to look for new frames.
+          retry_max_s: Longest delay between retries of a failed upload.
+        """
+        self.node_id = node_id
+        self.sink_address = sink_address
+        self.queue_frames = queue_frames
+        self.poll_s = poll_s
+        self.retry_max_s = retry_max_s
+        self.recording_id = ""
+        self.uploaded_frames = 0
+        self.uploaded_bytes = 0
+        self.queue_: asyncio.Queue = asyncio.Queue(queue_frames)
+        self.stopping_ = asyncio.Event()
+        # Uploads the queued frames.
+        self.upload_: Optional[asyncio.Task] = None
+        # Queues the frames of each sensor.
+        self.finders_: list[asyncio.Task] = []
+        # Frame time sidecars to upload once the frames are done.
+        self.sidecars_: list[str] = []
+        # Bytes the sink already has of each file, from the last progress
+        # check. None until the first check.
+        self.have_bytes_: Optional[dict[str, int]] = None
+        # Ask the sink for its progress on the next file before uploading it.
+        self.check_progress_ = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink_address is not None
+
+    @property
+    def tasks_(self) -> list[asyncio.Task]:
+        return self.finders_ + ([self.upload_] if self.upload_ else [])
+
+    def start(self, recording_id: str, frame_index: Optional[FrameIndex] = None):
+        """Starts offloading, with the frames found by `frame_index` if given."""
+        self.recording_id = recording_id
+        self.upload_ = asyncio.create_task(self.upload_frames())
+        self.upload_.add_done_callback(self.upload_done)
+        if frame_index is not None:
+            self.add(frame_index)
+
+    def add(self, frame_index: FrameIndex, sidecar: Optional[str] = None) -> None:
+        """Offloads the frames found by `frame_index` too.
+
+        The offloader keeps its own index of the directory so it can fall
+        behind the collection without affecting the node's frame counts.
+
+        Args:
+          frame_index: Frames of one sensor.
+          sidecar: Frame times of the sensor, uploaded after its frames.
+        """
+        assert not self.stopping_.is_set(), "Offloader is finishing"
+        index = FrameIndex(frame_index.directory, frame_index.pattern)
+        self.finders_.append(asyncio.create_task(self.find_frames(index)))
+        if sidecar is not None:
+            self.sidecars_.append(sidecar)
+
+    def upload_done(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        print(f"Offload of {self.recording_id} failed: {task.exception()!r}")
+        # Nothing will make room in the queue.
+        for finder in self.finders_:
+            finder.cancel()
+
+    def finish(self) -> None:
+        """Uploads the remaining frames, including the last, then stops.
+
+        Call after the collection command has exited so the last frame is
+        complete. Returns right away and the upload carries on in the
+        background.
+        """
+        self.stopping_.set()
+        if not self.finders_:
+            self.queue_.put_nowait(None)
+
+    async def cancel(self) -> None:
+        """Stops offloading, raising the error if the upload had failed."""
+        for task in self.tasks_:
+            task.cancel()
+        await self.wait()
+
+    async def wait(self) -> None:
+        """Waits for the offloader to stop, raising the error if it failed."""
+        results = await asyncio.gather(*self.tasks_, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def find_frames(self, frame_index: FrameIndex) -> None:
+        """Queues frames once they're complete, then None once finished."""
+        next_index: Optional[int] = None
+        while True:
+            stopping = self.stopping_.is_set()
+            frame_index.refresh()
+            newest = frame_index.newest_index()
+            if newest is not None:
+                if next_index is None:
+                    next_index = frame_index.first_index()
+                    assert next_index is not None
+                # The newest frame may still be being written until the
+                # collection command has stopped.
+                last = newest if stopping else frame_index.previous(newest)
+                while next_index <= last:
+                    # Waits while the queue is full.
+                    await self.queue_.put(frame_index.frame_path(next_index))
+                    next_index = frame_index.next_after(next_index)
+            if stopping:
+                await self.queue_.put(None)
+                return
+            try:
+                await asyncio.wait_for(self.stopping_.wait(), self.poll_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def upload_frames(self) -> None:
+        assert self.sink_address is not None
+        async with grpc.aio.insecure_channel(self.sink_address) as channel:
+            sink = ccline_pb2_grpc.SinkStub(channel)
+            finished = 0
+            # Finders are only added before finishing, so the count is final
+            # by the time any of them is done.
+            while finished < max(len(self.finders_), 1):
+                path = await self.queue_.get()
+                if path is None:
+                    finished += 1
+                else:
+                    await self.upload_with_retry(sink, path)
+            for sidecar in self.sidecars_:
+                if os.path.exists(sidecar):
+                    await self.upload_with_retry(sink, sidecar)
+        print(
+            f"Offloaded {self.uploaded_frames} frames,"
+            f" {self.uploaded_bytes / 1e6:.1f} MB of {self.recording_id}"
+        )
+
+    async def upload_with_retry(self, sink: ccline_pb2_grpc.SinkStub, path: str):
+        delay_s = RETRY_MIN_S
+        while True:
+            try:
+                await self.upload(sink, path)
+                return
+            except OSError as e:
+                print(f"Offload of {path} skipped, unable to read it: {e}")
+                return
+            except grpc.aio.AioRpcError as e:
+                print(f"Offload of {path} failed ({e.code().name}), retry {delay_s}s")
+                self.check_progress_ = True
+            await asyncio.sleep(delay_s)
+            delay_s = min(delay_s * 2, self.retry_max_s)
+
+    async def upload(self, sink: ccline_pb2_grpc.SinkStub, path: str) -> None:
+        name = os.path.basename(path)
+        if self.have_bytes_ is None:
+            # Skips whatever an earlier run already uploaded.
+            self.have_bytes_ = dict(await self.progress(sink, []))
+        elif self.check_progress_:
+            self.have_bytes_.update(await self.progress(sink, [name]))
+            self.check_progress_ = False
+        offset = self.have_bytes_.pop(name, None)
+        size = os.path.getsize(path)
+        if offset == size:
+            return
+        if offset is None or offset > size:
+            offset = 0
+        reply = await sink.Upload(self.chunks(path, name, offset))
+        self.uploaded_frames += 1
+        self.uploaded_bytes += reply.bytes_received
+
+    async def progress(self, sink: ccline_pb2_grpc.SinkStub, names: list[str]):
+        reply = await sink.OffloadProgress(
+            ccline_pb2.OffloadProgressRequest(
+                node_id=self.node_id, recording_id=self.recording_id, names=names
+            ),
+            timeout=PROGRESS_TIMEOUT_S,
+        )
+        return reply.have_bytes
+
+    async def chunks(
+        self, path: str, name: str, offset: int
+    ) -> AsyncIterator[ccline_pb2.OffloadChunk]:
+        async for chunk in read_chunks(path, name, offset, sha256=True):
+            yield ccline_pb2.OffloadChunk(
+                node_id=self.node_id, recording_id=self.recording_id, chunk=chunk
+            )
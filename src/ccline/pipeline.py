@@ -0,0 +1,178 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Post-processing every frame of a recording on all cores.
+
+A recording is tens of thousands of frames in `jot/<recording_id>/<node>/`.
+Splitting the files into one fixed slice per core leaves cores idle once their
+slice is done while a slower slice holds up the job. Instead the frames go on
+a shared work queue and each worker process takes the next few as soon as it's
+free.
+
+Outputs mirror the input directory layout and are written under a temporary
+name then renamed, so an output that exists is complete. Frames with an output
+newer than the input are skipped, so an interrupted run picks up where it
+stopped. A frame that fails, say one that isn't a JPEG, is reported and
+counted and the run carries on with the rest, so one bad file in tens of
+thousands doesn't throw away the work on the others.
+"""
+
+import dataclasses
+import multiprocessing
+import os
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+# Frames handed to a worker at a time. Large enough to keep queue overhead
+# small next to decoding a 4K frame, small enough to share out the tail.
+CHUNK_SIZE = 8
+
+# Seconds between progress reports.
+PROGRESS_INTERVAL_S = 5.0
+
+
+@dataclasses.dataclass(frozen=True)
+class Job:
+    """One frame to process."""
+
+    source: str
+    destination: str
+
+
+def find_jobs(
+    source_dir: str, destination_dir: str, extensions: Iterable[str] = (".jpg",)
+) -> Iterator[Job]:
+    """Finds frames under `source_dir`, descending into subdirectories.
+
+    Point it at one node directory, one recording or all of `jot`. The output
+    for `<source_dir>/<path>` is `<destination_dir>/<path>`.
+    """
+    extensions = tuple(extensions)
+    destination_dir = os.path.abspath(destination_dir)
+    for directory, subdirectories, files in os.walk(source_dir):
+        # Don't descend into the output if it's inside the input.
+        subdirectories[:] = sorted(
+            d
+            for d in subdirectories
+            if os.path.abspath(os.path.join(directory, d)) != destination_dir
+        )
+        relative = os.path.relpath(directory, source_dir)
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                yield Job(
+                    os.path.join(directory, name),
+                    os.path.normpath(os.path.join(destination_dir, relative, name)),
+                )
+
+
+def is_done(job: Job) -> bool:
+    """True if the output exists and is at least as new as the input."""
+    try:
+        return os.stat(job.destination).st_mtime_ns >= os.stat(job.source).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def temporary_path(destination: str) -> str:
+    """Name to write an output under until it's complete.
+
+    Keeps the extension so libraries that pick the format from it still work.
+    """
+    directory, name = os.path.split(destination)
+    return os.path.join(directory, f".part-{name}")
+
+
+class Progress:
+    """Prints how far through the job it is every so often."""
+
+    def __init__(self, total: int, interval_s: float = PROGRESS_INTERVAL_S):
+        self.total = total
+        self.interval_s = interval_s
+        self.done = 0
+        self.failed = 0
+        self.start_s = time.monotonic()
+        self.last_report_s = self.start_s
+
+    def update(self, count: int = 1, failed: int = 0) -> None:
+        """Counts finished frames, `failed` of which failed."""
+        self.done += count
+        self.failed += failed
+        now = time.monotonic()
+        if now - self.last_report_s >= self.interval_s or self.done == self.total:
+            self.last_report_s = now
+            print(self.line(now))
+
+    def line(self, now: float) -> str:
+        elapsed_s = now - self.start_s
+        rate = self.done / elapsed_s if elapsed_s > 0 else 0.0
+        remaining_s = (self.total - self.done) / rate if rate > 0 else 0.0
+        failed = f" ({self.failed} failed)" if self.failed else ""
+        return (
+            f"{self.done}/{self.total} frames{failed}, {rate:.1f}/s,"
+            f" {remaining_s:.0f}s remaining"
+        )
+
+
+class _Worker:
+    """Runs the process function and publishes the output when it's complete."""
+
+    def __init__(self, process: Callable[[Job], None]):
+        self.process = process
+
+    def __call__(self, job: Job) -> Optional[str]:
+        """Returns: Why the job failed, or None if it succeeded."""
+        try:
+            self.process(job)
+            os.replace(temporary_path(job.destination), job.destination)
+        except Exception as e:
+            # A string, as not every exception survives the trip back from the
+            # worker process.
+            try:
+                os.remove(temporary_path(job.destination))
+            except FileNotFoundError:
+                pass
+            return f"{job.source}: {e!r}"
+        return None
+
+
+def run(
+    jobs: Iterable[Job],
+    process: Callable[[Job], None],
+    processes: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Runs `process` on every job that isn't done yet, on all cores.
+
+    Args:
+      jobs: Frames to process.
+      process: Called with each job in a worker process. Must be picklable, so
+        a module-level function or a functools.partial of one. It should write
+        to `temporary_path(job.destination)`, which is renamed once it returns.
+      processes: Worker processes. Defaults to one per core.
+      chunk_size: Jobs handed to a worker at a time.
+
+    Returns: The number of frames processed, not counting those that failed.
+    """
+    todo = [job for job in jobs if not is_done(job)]
+    if not todo:
+        return 0
+    for directory in {os.path.dirname(job.destination) for job in todo}:
+        os.makedirs(directory, exist_ok=True)
+    progress = Progress(len(todo))
+    with multiprocessing.Pool(processes) as pool:
+        for error in pool.imap_unordered(_Worker(process), todo, chunksize=chunk_size):
+            if error is not None:
+                print(f"Failed {error}")
+            progress.update(failed=error is not None)
+    return progress.done - progress.failed
@@ -12,11 +12,114 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict
+"""Maps the names of the nodes to their addresses.
+
+Addresses normally come from the config. With `probe` the nodes are looked
+up and connected to when the Resolver is created, and the ones that can't be
+reached are left out. Every node is probed at once with a timeout, so a
+large array takes about as long as its slowest node rather than one lookup
+after another. `.local` names are looked up with multicast DNS, others with
+the system resolver. Results are cached for the life of the process and,
+optionally, in a file, so creating more Resolvers is free.
+
+Dropping unreachable nodes suits a client running one command. The server
+keeps its Resolver for as long as it runs and starts before some of the other
+nodes, so it only looks names up (`connect=False`) and never drops a node.
+"""
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import json
+import os
+import socket
+import time
+from typing import ClassVar, Dict, Iterable, Optional
 
 import gin
 
-from ccline.cli_runner import CliRunner
+from ccline import mdns
+from ccline.transform import Transform
+
+
+@gin.configurable()
+@dataclasses.dataclass
+class ProbeCache:
+    """Remembers the probed address of each node.
+
+    Kept in memory for the life of the process and optionally in a file so
+    separate runs can share it.
+    """
+
+    # File holding the cache. None to only cache in memory.
+    path: Optional[str] = None
+    # Seconds before a reachable node is probed again.
+    ttl_s: float = 300.0
+    # Seconds before an unreachable node is probed again. Short so a node
+    # that's just booted is found soon.
+    unreachable_ttl_s: float = 10.0
+
+    # In-process cache shared by all instances, keyed like the file.
+    memory_: ClassVar[dict[str, dict]] = {}
+
+    @staticmethod
+    def key(name: str, port: Optional[str]) -> str:
+        return f"{name}:{port}"
+
+    def get(self, name: str, port: Optional[str]) -> Optional[str]:
+        """The cached address, "" if unreachable, or None if not cached."""
+        key = self.key(name, port)
+        entry = self.memory_.get(key)
+        if entry is None:
+            entry = self._read_file().get(key)
+        if entry is None or entry["expires"] < time.time():
+            return None
+        self.memory_[key] = entry
+        return entry["address"]
+
+    def put_all(self, addresses: dict[tuple[str, Optional[str]], str]) -> None:
+        """Caches the address, or "" if unreachable, of each (name, port)."""
+        now = time.time()
+        for (name, port), address in addresses.items():
+            ttl_s = self.ttl_s if address else self.unreachable_ttl_s
+            self.memory_[self.key(name, port)] = {
+                "address": address,
+                "expires": now + ttl_s,
+            }
+        if self.path is None:
+            return
+        entries = self._read_file()
+        entries.update(
+            (self.key(name, port), self.memory_[self.key(name, port)])
+            for name, port in addresses
+        )
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(entries, f)
+        except OSError as e:
+            print(f"Unable to save probe cache {self.path}: {e}")
+
+    def _read_file(self) -> dict[str, dict]:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+def run_blocking(coroutine):
+    """Runs `coroutine` to completion from synchronous code."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Called from inside an event loop, which can't run another coroutine to
+    # completion, so use a loop of its own.
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
 
 
 @gin.configurable()
@@ -28,6 +131,10 @@ class Resolver:
         name_to_ip: Dict[str, str] = {},
         name_to_port: Dict[str, str] = {},
         probe=False,
+        name_to_transform: Dict[str, dict] = {},
+        probe_timeout_s: float = 1.0,
+        connect: bool = True,
+        keep: Iterable[str] = (),
     ):
         """Access functions to find camera node resources by node name.
 
@@ -35,26 +142,124 @@ class Resolver:
           name_to_ip: Dictionary of node IP addresses keyed by node names.
           name_to_port: Dictionary of node port keyed by node names.
           probe: True to check for connectivity and remove unresponsive nodes.
+          name_to_transform: Corrections for the frames of each node, see
+            `ccline.transform`. Nodes without one are left alone.
+          probe_timeout_s: Time each node has to be looked up and accept a
+            connection when probing.
+          connect: False to only look the nodes up when probing, keeping
+            every node whether or not it can be reached yet.
+          keep: Nodes never dropped by probing, such as the coordinator.
         """
         self.name_to_ip = name_to_ip
         self.name_to_port = name_to_port
+        self.name_to_transform = name_to_transform
+        self.probe_timeout_s = probe_timeout_s
         print(self.name_to_ip)
         print(self.name_to_port)
         # Overwrite with just the ones that are found.
         if probe:
-            self.name_to_ip = self.probe_nodes(self.name_to_ip.keys())
+            self.name_to_ip = run_blocking(
+                self.probe_nodes(self.name_to_ip.keys(), connect, keep)
+            )
 
     def all_nodes(self):
         return self.name_to_ip.keys()
 
-    def probe_nodes(self, probe_names):
-        probed_name_to_ip = {}
-        cli_runner = CliRunner()
-        for hostname in probe_names:
-            ip_address = cli_runner.run_dig_cmd(hostname)
-            print(f"{hostname} : {ip_address}")
-            probed_name_to_ip[hostname] = ip_address
-        return probed_name_to_ip
+    def transforms(self) -> Dict[str, Transform]:
+        return {
+            name: Transform.from_config(config)
+            for name, config in self.name_to_transform.items()
+        }
+
+    async def probe_nodes(
+        self,
+        probe_names: Iterable[str],
+        connect: bool = True,
+        keep: Iterable[str] = (),
+    ) -> Dict[str, str]:
+        """Looks up and connects to every node at once.
+
+        A node that can't be looked up is tried at its configured address.
+
+        Args:
+          probe_names: Nodes to probe.
+          connect: False to only look the nodes up. Nodes that can't be looked
+            up keep their configured address, or their name for GRPC to look
+            up when it connects. Nothing is cached, as reachable is unknown.
+          keep: Nodes to keep even if they can't be reached.
+
+        Returns: The address of each node that accepted a connection, or of
+          every node without `connect`.
+        """
+        names = list(probe_names)
+        keep = set(keep)
+        cache = ProbeCache()
+        probed: dict[tuple[str, Optional[str]], str] = {}
+        pending = []
+        for name in names:
+            port = self.name_to_port.get(name)
+            address = cache.get(name, port) if connect else None
+            if address is None:
+                pending.append(name)
+            else:
+                probed[(name, port)] = address
+        # One burst of queries for all the .local names.
+        local_names = [n for n in pending if n.rstrip(".").endswith(".local")]
+        local_addresses = asyncio.ensure_future(
+            mdns.resolve(local_names, self.probe_timeout_s)
+        )
+
+        async def probe(name: str) -> str:
+            if name in local_names:
+                address = (await local_addresses).get(name)
+            else:
+                address = await self.lookup(name)
+            address = address or self.name_to_ip.get(name)
+            if not address:
+                return ""
+            port = self.name_to_port.get(name)
+            if connect and port is not None:
+                _, writer = await asyncio.open_connection(address, int(port))
+                writer.close()
+            return address
+
+        async def probe_with_timeout(name: str) -> str:
+            try:
+                return await asyncio.wait_for(probe(name), self.probe_timeout_s)
+            except (asyncio.TimeoutError, OSError) as e:
+                print(f"{name} unreachable: {e!r}")
+                return ""
+
+        try:
+            addresses = await asyncio.gather(
+                *(probe_with_timeout(n) for n in pending)
+            )
+        finally:
+            local_addresses.cancel()
+        found = {(n, self.name_to_port.get(n)): a for n, a in zip(pending, addresses)}
+        if connect:
+            cache.put_all(found)
+        probed.update(found)
+        name_to_ip = {}
+        for name in names:
+            address = probed[(name, self.name_to_port.get(name))]
+            print(f"{name} : {address or 'unreachable'}")
+            if not address and (name in keep or not connect):
+                address = self.name_to_ip.get(name) or name
+            if address:
+                name_to_ip[name] = address
+        return name_to_ip
+
+    @staticmethod
+    async def lookup(hostname: str) -> Optional[str]:
+        """The IPv4 address of `hostname` from the system resolver."""
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                hostname, None, family=socket.AF_INET, type=socket.SOCK_STREAM
+            )
+        except socket.gaierror:
+            return None
+        return infos[0][4][0] if infos else None
 
     def address_for_name(self, name: str, listen: bool = False) -> str:
         """Gives the address with port for the given node name.
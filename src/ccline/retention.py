@@ -0,0 +1,77 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Keeping room on the nodes' SD cards for the next recording.
+
+At 1-2 MB per 4K frame a card fills in well under a day of recording, and a
+full card ends the capture without any error reaching the client. Nodes
+estimate how long they can keep recording from the free space and their write
+rate, so the coordinator can refuse to start a collection that would run out
+and warn about one that's getting close. Nodes can also delete their oldest
+recordings to keep space free, for long unattended collections where the
+frames are offloaded or fetched as they go.
+"""
+
+import os
+import shutil
+from typing import Container
+
+
+def free_bytes(path: str) -> int:
+    """Free space on the file system holding `path`, which needn't exist yet."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path).free
+
+
+def remaining_s(free: int, write_bytes_per_s: float) -> float:
+    """Seconds of recording left in `free` bytes at the given write rate."""
+    if write_bytes_per_s <= 0:
+        return float("inf")
+    return free / write_bytes_per_s
+
+
+def recordings_oldest_first(base_path: str, exclude: Container[str]) -> list[str]:
+    """Recording directories under `base_path`, least recently written first."""
+    recordings = []
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False) and entry.name not in exclude:
+                recordings.append((entry.stat().st_mtime_ns, entry.path))
+    return [path for _, path in sorted(recordings)]
+
+
+def evict(base_path: str, keep_free_bytes: int, exclude: Container[str]) -> list[str]:
+    """Deletes the oldest recordings until `keep_free_bytes` are free.
+
+    Blocks while deleting, so run it in a thread.
+
+    Args:
+      base_path: Directory holding a directory for each recording.
+      keep_free_bytes: Free space to make.
+      exclude: Names of recordings to keep, such as the current one.
+
+    Returns: The directories deleted.
+    """
+    if not os.path.isdir(base_path):
+        return []
+    evicted = []
+    for path in recordings_oldest_first(base_path, exclude):
+        if free_bytes(base_path) >= keep_free_bytes:
+            break
+        print(f"Deleting {path} to keep {keep_free_bytes / 1e9:.1f} GB free")
+        shutil.rmtree(path, ignore_errors=True)
+        evicted.append(path)
+    return evicted
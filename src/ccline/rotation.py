@@ -0,0 +1,199 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Ways to rotate JPEG frames.
+
+Decoding and re-encoding a 4K frame with OpenCV to rotate it costs most of the
+time of a rotation pass and loses quality each time. There are two ways to
+rotate without decoding:
+
+* `jpegtran` rearranges the compressed DCT blocks, which gives the same pixels
+  as decoding, rotating and encoding at no loss, in a fraction of the time.
+  Rotations are exact when the image size is a multiple of the JPEG block size
+  (16 pixels for the usual 4:2:0 frames), which 3840x2160 is.
+* Setting the EXIF orientation tag only rewrites a few bytes of the header and
+  leaves the image data alone. Viewers and most libraries (OpenCV's imread
+  included) rotate on load, but tools that ignore EXIF see the frame unrotated.
+"""
+
+import shutil
+import struct
+import subprocess
+from typing import Optional
+
+# Clockwise angles in degrees.
+ANGLES = ["90", "180", "270"]
+
+# EXIF orientation values that display the stored image rotated clockwise.
+ORIENTATION_FOR_ANGLE = {"0": 1, "90": 6, "180": 3, "270": 8}
+ANGLE_FOR_ORIENTATION = {v: k for k, v in ORIENTATION_FOR_ANGLE.items()}
+
+ORIENTATION_TAG = 0x0112
+SHORT_TYPE = 3
+
+SOI = b"\xff\xd8"
+APP0 = 0xE0
+APP1 = 0xE1
+SOS = 0xDA
+EXIF_HEADER = b"Exif\x00\x00"
+
+
+def rotate_opencv(source: str, destination: str, angle: str) -> None:
+    """Decodes, rotates and re-encodes with OpenCV."""
+    # OpenCV is only needed on the workstation, and only for this method.
+    import cv2
+
+    cv2_rotations = {
+        "90": cv2.ROTATE_90_CLOCKWISE,
+        "180": cv2.ROTATE_180,
+        "270": cv2.ROTATE_90_COUNTERCLOCKWISE,
+    }
+    image = cv2.imread(source)
+    if image is None:
+        raise ValueError(f"Can't read {source}")
+    if not cv2.imwrite(destination, cv2.rotate(image, cv2_rotations[angle])):
+        raise ValueError(f"Can't write {destination}")
+
+
+def rotate_jpegtran(source: str, destination: str, angle: str) -> None:
+    """Rotates losslessly with `jpegtran` from libjpeg.
+
+    Raises:
+      RuntimeError: The image size isn't a multiple of the block size, so the
+        rotation wouldn't be exact, or jpegtran isn't installed.
+    """
+    jpegtran = shutil.which("jpegtran")
+    if jpegtran is None:
+        raise RuntimeError("jpegtran not found. Install libjpeg-turbo-progs.")
+    result = subprocess.run(
+        [
+            jpegtran,
+            "-rotate",
+            angle,
+            "-perfect",
+            "-copy",
+            "all",
+            "-outfile",
+            destination,
+            source,
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"jpegtran failed on {source}: {result.stderr.strip()}")
+
+
+def rotate_exif(source: str, destination: str, angle: str) -> None:
+    """Rotates by setting the EXIF orientation tag, without touching the image.
+
+    An existing orientation is combined with the rotation.
+    """
+    with open(source, "rb") as f:
+        data = bytearray(f.read())
+    data = set_orientation(data, angle)
+    with open(destination, "wb") as f:
+        f.write(data)
+
+
+def set_orientation(data: bytearray, angle: str) -> bytearray:
+    """Adds `angle` to the orientation of a JPEG held in memory."""
+    if data[:2] != SOI:
+        raise ValueError("Not a JPEG")
+    insert_at = 2
+    for marker, start, length in segments(data):
+        if marker == APP0:
+            # JFIF requires APP0 to come first.
+            insert_at = start + 2 + length
+        if marker == APP1 and data[start + 4 : start + 10] == EXIF_HEADER:
+            tiff_start = start + 10
+            offset = find_orientation(data, tiff_start, start + 2 + length)
+            if offset is None:
+                raise ValueError(
+                    "EXIF has no orientation tag to update, use jpegtran instead"
+                )
+            byte_order = ">" if data[tiff_start : tiff_start + 2] == b"MM" else "<"
+            (current,) = struct.unpack_from(byte_order + "H", data, offset)
+            struct.pack_into(
+                byte_order + "H", data, offset, combined_orientation(current, angle)
+            )
+            return data
+    orientation = combined_orientation(1, angle)
+    data[insert_at:insert_at] = exif_segment(orientation)
+    return data
+
+
+def combined_orientation(current: int, angle: str) -> int:
+    if current not in ANGLE_FOR_ORIENTATION:
+        raise ValueError(f"Can't rotate mirrored EXIF orientation {current}")
+    total = (int(ANGLE_FOR_ORIENTATION[current]) + int(angle)) % 360
+    return ORIENTATION_FOR_ANGLE[str(total)]
+
+
+def segments(data: bytearray):
+    """Yields (marker, start, length) of each header segment up to the image.
+
+    `start` is the position of the 0xFF of the marker and `length` includes the
+    two length bytes but not the marker.
+    """
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            raise ValueError(f"Bad JPEG marker at {position}")
+        marker = data[position + 1]
+        if marker == SOS:
+            return
+        (length,) = struct.unpack_from(">H", data, position + 2)
+        yield marker, position, length
+        position += 2 + length
+
+
+def find_orientation(data: bytearray, tiff_start: int, end: int) -> Optional[int]:
+    """Position of the orientation value in the first IFD, if it has one."""
+    byte_order = data[tiff_start : tiff_start + 2]
+    if byte_order not in (b"MM", b"II"):
+        raise ValueError("Bad EXIF byte order")
+    order = ">" if byte_order == b"MM" else "<"
+    (ifd_offset,) = struct.unpack_from(order + "I", data, tiff_start + 4)
+    ifd = tiff_start + ifd_offset
+    (count,) = struct.unpack_from(order + "H", data, ifd)
+    for i in range(count):
+        entry = ifd + 2 + 12 * i
+        if entry + 12 > end:
+            break
+        tag, value_type, value_count = struct.unpack_from(order + "HHI", data, entry)
+        if tag == ORIENTATION_TAG and value_type == SHORT_TYPE and value_count == 1:
+            return entry + 8
+    return None
+
+
+def exif_segment(orientation: int) -> bytes:
+    """APP1 segment with an EXIF block holding only the orientation."""
+    tiff = (
+        b"MM\x00\x2a"
+        + struct.pack(">I", 8)
+        + struct.pack(">H", 1)
+        + struct.pack(">HHIHH", ORIENTATION_TAG, SHORT_TYPE, 1, orientation, 0)
+        + struct.pack(">I", 0)
+    )
+    payload = EXIF_HEADER + tiff
+    return struct.pack(">BBH", 0xFF, APP1, len(payload) + 2) + payload
+
+
+# Rotation functions by name. Each takes (source, destination, angle).
+METHODS = {
+    "opencv": rotate_opencv,
+    "jpegtran": rotate_jpegtran,
+    "exif": rotate_exif,
+}
@@ -0,0 +1,126 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Ways for a node to produce a live sample image.
+
+Starting `libcamera-still` for every sample pays for process startup, camera
+initialisation and exposure convergence each time, which takes seconds. The
+warm sampler keeps a preview command running instead and hands out the most
+recent image it saved, copied so the preview can't overwrite it while it's
+being sent. During a collection the camera belongs to the
+collection command so samples are taken from the frames it's already saving.
+
+Select the sampler with the gin binding `create_sampler.backend`.
+"""
+
+import asyncio
+import os
+import shutil
+import time
+from typing import Optional
+
+import gin
+
+from ccline.cli_runner import CliRunner
+
+# Interval to check for a new preview image while waiting for one.
+POLL_S = 0.02
+
+# Copy of the newest preview image handed out by the warm sampler, in
+# `nocollection`.
+WARM_SAMPLE_NAME = "warm_sample.jpg"
+
+
+class OneShotSampler:
+    """Runs `CliRunner.camera_live_sample_cmd` for every sample."""
+
+    async def sample(self) -> str:
+        """Captures a single image and returns the path to it."""
+        cli_runner = CliRunner()
+        process = await cli_runner.run_live_sample_cmd()
+        await process.wait()
+        # TODO: 'live_sample.jpg' must match the config file. Name should be returned from cli_runner.
+        return os.path.join(cli_runner.get_full_nocollection_path(), "live_sample.jpg")
+
+    async def pause(self) -> None:
+        pass
+
+
+class WarmSampler:
+    """Keeps `CliRunner.camera_preview_cmd` running and returns its latest image."""
+
+    def __init__(self, startup_timeout_s: float = 10.0):
+        self.startup_timeout_s = startup_timeout_s
+        self.process_: Optional[asyncio.subprocess.Process] = None
+        # Held while starting the preview so overlapping samples don't each
+        # start one.
+        self.lock_ = asyncio.Lock()
+
+    async def sample(self) -> str:
+        """Returns the path to a copy of the newest complete preview image.
+
+        Starts the preview command first if it isn't running, in which case this
+        waits for the first image.
+        """
+        cli_runner = CliRunner()
+        latest = cli_runner.get_preview_latest_path()
+        async with self.lock_:
+            if self.process_ is None or self.process_.returncode is not None:
+                if os.path.lexists(latest):
+                    # Left over from an earlier preview so it may be stale.
+                    os.remove(latest)
+                self.process_ = await cli_runner.run_preview_cmd()
+            deadline = time.monotonic() + self.startup_timeout_s
+            while not os.path.exists(latest):
+                if self.process_.returncode is not None:
+                    raise RuntimeError(
+                        f"Preview command exited with {self.process_.returncode}"
+                    )
+                if time.monotonic() > deadline:
+                    raise TimeoutError(
+                        f"No preview image after {self.startup_timeout_s}s"
+                    )
+                await asyncio.sleep(POLL_S)
+        # The link always points at a complete image but the preview wraps
+        # around and overwrites it, so send a copy. Replacing the copy leaves
+        # files already opened by earlier samples intact.
+        source = os.path.realpath(latest)
+        path = os.path.join(cli_runner.get_full_nocollection_path(), WARM_SAMPLE_NAME)
+        partial = f"{path}.{id(asyncio.current_task())}.partial"
+        await asyncio.to_thread(shutil.copyfile, source, partial)
+        os.replace(partial, path)
+        return path
+
+    async def pause(self) -> None:
+        """Stops the preview so another command can use the camera."""
+        if self.process_ is not None and self.process_.returncode is None:
+            self.process_.terminate()
+            await self.process_.wait()
+        self.process_ = None
+
+
+@gin.configurable()
+def create_sampler(backend: str = "oneshot"):
+    """Creates the sampler for live samples outside of a collection.
+
+    Args:
+      backend: "oneshot" to run `CliRunner.camera_live_sample_cmd` for each
+        sample. "warm" to keep `CliRunner.camera_preview_cmd` running.
+    """
+    if backend == "oneshot":
+        return OneShotSampler()
+    if backend == "warm":
+        return WarmSampler()
+    raise ValueError(f"Unknown sampler backend {backend}")
+
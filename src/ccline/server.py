@@ -20,19 +20,64 @@ Implements the Node and Coordinator interfaces.
 
 import asyncio
 import os
+import time
 from signal import SIGTERM, signal
+from typing import AsyncIterator, Iterable, Optional
 
+import gin
 import grpc
 from absl import app, flags
 
 from ccline import ccline_pb2, ccline_pb2_grpc
+from ccline.catalogue import Catalogue
+from ccline.channel_pool import SERVER_OPTIONS, ChannelPool
 from ccline.cli_runner import CliRunner
 from ccline.config import Config, read_config
+from ccline.dispatch import NodeOutcome, call_node, dispatch, summarize
+from ccline.frame_index import FrameIndex
+from ccline.frame_times import FrameTimesWriter, sidecar_name
+from ccline.offload import Offloader
 from ccline.resolver import Resolver
+from ccline.retention import evict, free_bytes, remaining_s
+from ccline.sampler import create_sampler
+from ccline.supervisor import Supervisor
+from ccline.transfer import read_chunks, read_directory
 
 FLAGS = flags.FLAGS
 
+# Deadline for each node to answer a request relayed by the coordinator. Covers
+# a node waiting CliRunner.stop_timeout_s for its capture to exit.
+NODE_TIMEOUT_S = 10.0
 
+# Deadline for each node to stop collecting, flush its disk and start shutting
+# down.
+SHUTDOWN_TIMEOUT_S = 20.0
+
+# Deadline for each node to report its status.
+STATUS_TIMEOUT_S = 2.0
+
+# Interval between frame index refreshes during a collection.
+MONITOR_INTERVAL_S = 1.0
+
+# Deadline for each node to capture and send a live sample.
+SAMPLE_TIMEOUT_S = 30.0
+
+# Image chunks buffered on the coordinator while sampling all nodes.
+SAMPLE_QUEUE_CHUNKS = 64
+
+ALL_SENSOR_IDS = [
+    ccline_pb2.Camera1,
+    ccline_pb2.Camera2,
+    ccline_pb2.Camera3,
+    ccline_pb2.Camera4,
+    ccline_pb2.Imu1,
+    ccline_pb2.Imu2,
+    ccline_pb2.Imu3,
+    ccline_pb2.Imu4,
+]
+
+
+@gin.configurable(denylist=["my_id", "coordinator_id"])
 class Node(ccline_pb2_grpc.NodeServicer):
     """The Node server runs on every participant in the flexible camera array.
 
@@ -40,11 +85,67 @@ class Node(ccline_pb2_grpc.NodeServicer):
     may target the node.
     """
 
-    def __init__(self, my_id: str, coordinator_id: str):
+    def __init__(
+        self,
+        my_id: str,
+        coordinator_id: str,
+        stall_after_s: float = 5.0,
+        expected_write_bytes_per_s: float = 15e6,
+        warn_remaining_s: float = 1800.0,
+        keep_free_bytes: int = 0,
+        halt_s: float = 20.0,
+    ):
+        """The Node server runs on every participant in the flexible camera array.
+
+        Args:
+          my_id: Network-unique name for the node.
+          coordinator_id: Name of the goose.
+          stall_after_s: A recording node that hasn't saved a frame for this
+            long is reported as stalled.
+          expected_write_bytes_per_s: Write rate used to estimate the recording
+            time left until a collection has measured the real one.
+          warn_remaining_s: Reports low disk space when less than this much
+            recording time is left.
+          keep_free_bytes: Deletes the oldest recordings to keep this much
+            space free. 0 never deletes anything.
+          halt_s: Seconds from starting the shutdown command until the node
+            has halted and is safe to power off.
+        """
         self.node_id = my_id
+        self.stall_after_s = stall_after_s
+        self.expected_write_bytes_per_s = expected_write_bytes_per_s
+        self.warn_remaining_s = warn_remaining_s
+        self.keep_free_bytes = keep_free_bytes
+        self.halt_s = halt_s
         self.coordinator_id = coordinator_id
         self.is_coordinator = self.coordinator_id == self.node_id
-        self.collection_process = None
+        # Capture process of each sensor collecting.
+        self.supervisor_ = Supervisor()
+        # Runs the commands of the current collection.
+        self.cli_runner_: Optional[CliRunner] = None
+        # Pending release of a collection with a scheduled start time.
+        self.scheduled_start_: Optional[asyncio.Task] = None
+        # ID of the current or most recent recording.
+        self.recording_id_ = ""
+        # Frames of each sensor in the current recording.
+        self.frame_indexes_: dict[str, FrameIndex] = {}
+        # Records when each frame of each sensor was saved.
+        self.frame_times_: dict[str, FrameTimesWriter] = {}
+        # Monotonic time the capture began saving frames.
+        self.capture_started_s_ = 0.0
+        # Refreshes the frame index in the background during a collection.
+        self.monitor_: Optional[asyncio.Task] = None
+        # Uploads frames of the current collection, if offload is configured.
+        self.offloader_: Optional[Offloader] = None
+        # Offloaders still uploading the end of an earlier collection.
+        self.finishing_offloaders_: set[Offloader] = set()
+        # Write rate measured by the most recent collection.
+        self.write_bytes_per_s_ = 0.0
+        # Deletes old recordings in the background when space runs low.
+        self.eviction_: Optional[asyncio.Task] = None
+        self.sampler_ = create_sampler()
+        # Runs the shutdown command once the reply to Shutdown is sent.
+        self.shutdown_: Optional[asyncio.Task] = None
         print(f"Starting node {my_id} coordinator {coordinator_id}")
 
     async def Goose(
@@ -60,53 +161,385 @@ class Node(ccline_pb2_grpc.NodeServicer):
     async def Record(
         self, request: ccline_pb2.RecordRequest, context: grpc.aio.ServicerContext
     ) -> ccline_pb2.RecordReply:
-        print("Record on node %s", self.node_id)
-        print("  Turn on %s", request.start_sensor_ids)
-        print("  Turn off %s", request.stop_sensor_ids)
-        print(f"Received Record on {self.node_id}")
-        cli_runner = CliRunner()
-        if request.data_path:
-            cli_runner.set_collection_path(request.data_path)
-        # TODO: This needs to be refined. The Record command should handle the
-        # lists of sensors to start and stop then run the appropriate commands
-        # for each sensor or group of sensors. For now we just run one command
-        # to start recording as long as any sensors are asked to start. And if
-        # not then all sensors are stopped.
+        reply = ccline_pb2.RecordReply(node_time_ns=time.time_ns())
+        print(f"Record on node {self.node_id}")
+        print(f"  Turn on {request.start_sensor_ids}")
+        print(f"  Turn off {request.stop_sensor_ids}")
+        if request.stop_sensor_ids:
+            await self.stop_sensors(request.stop_sensor_ids, reply)
         if request.start_sensor_ids:
-            self.collection_process = cli_runner.run_start_collection_cmd()
+            await self.start_sensors(request, reply.node_time_ns)
+        elif not request.stop_sensor_ids:
+            # Stops everything if no sensors are given.
+            await self.stop_sensors(ALL_SENSOR_IDS, reply)
+        return reply
+
+    async def start_sensors(
+        self, request: ccline_pb2.RecordRequest, node_time_ns: int
+    ) -> None:
+        """Starts the requested sensors, beginning a collection if none is going.
+
+        Sensors added while a collection is going join it, whatever its data
+        path.
+        """
+        if self.cli_runner_ is None:
+            cli_runner = CliRunner()
+            if request.data_path:
+                cli_runner.set_collection_path(request.data_path)
+            await self.begin_collection(cli_runner, request.data_path)
+        assert self.cli_runner_ is not None
+        sensors = []
+        for sensor_id in request.start_sensor_ids:
+            sensor = ccline_pb2.SensorId.Name(sensor_id)
+            # Sensors this node doesn't have are skipped.
+            if self.cli_runner_.sensor_cmd(sensor) is None:
+                continue
+            if sensor not in self.supervisor_.sensors():
+                sensors.append(sensor)
+        if request.start_time_ns > node_time_ns:
+            await self.schedule_start(self.cli_runner_, sensors, request.start_time_ns)
         else:
-            self.collection_process = cli_runner.stop_collection_cmd(
-                self.collection_process
+            await asyncio.gather(
+                *(self.start_sensor(self.cli_runner_, s) for s in sensors)
+            )
+            self.capture_started_s_ = time.monotonic()
+
+    async def begin_collection(self, cli_runner: CliRunner, recording_id: str) -> None:
+        # The sampler may be holding the camera.
+        await self.sampler_.pause()
+        self.cli_runner_ = cli_runner
+        self.recording_id_ = recording_id
+        self.frame_indexes_ = {}
+        self.close_frame_times()
+        if self.monitor_ is None:
+            self.monitor_ = asyncio.create_task(self.monitor_collection())
+        self.make_room()
+        self.finish_offload()
+        offloader = Offloader(self.node_id)
+        if offloader.enabled:
+            offloader.start(self.recording_id_)
+            self.offloader_ = offloader
+
+    def track_frames(self, cli_runner: CliRunner, sensor: str) -> None:
+        """Counts, timestamps and offloads the frames a sensor saves."""
+        if sensor in self.frame_indexes_:
+            return
+        pattern = cli_runner.get_sensor_output_pattern(sensor)
+        if pattern is None:
+            print(f"No frame pattern in the command of {sensor}, not tracking it")
+            return
+        frame_index = FrameIndex(cli_runner.get_full_collection_path(), pattern)
+        frame_times = FrameTimesWriter(frame_index.directory, sidecar_name(sensor))
+        frame_index.on_complete = frame_times.add
+        self.frame_indexes_[sensor] = frame_index
+        self.frame_times_[sensor] = frame_times
+        if self.offloader_ is not None:
+            self.offloader_.add(frame_index, frame_times.path)
+
+    async def start_sensor(
+        self, cli_runner: CliRunner, sensor: str, armed: bool = False
+    ) -> None:
+        self.track_frames(cli_runner, sensor)
+
+        async def spawn(run: int, armed: bool) -> asyncio.subprocess.Process:
+            return await cli_runner.run_start_collection_cmd(
+                armed=armed, sensor=sensor, run=run
             )
-        return ccline_pb2.RecordReply()
+
+        await self.supervisor_.start(sensor, spawn, armed)
+
+    async def stop_sensors(
+        self, sensor_ids: Iterable[int], reply: ccline_pb2.RecordReply
+    ) -> None:
+        """Stops sensors, ending the collection once none are left."""
+        sensors = [ccline_pb2.SensorId.Name(s) for s in sensor_ids]
+        cli_runner = self.cli_runner_ or CliRunner()
+        # Returns once each capture has exited and written its last frame.
+        stopped = await self.supervisor_.stop(sensors, cli_runner.stop_collection_cmd)
+        reply.killed = not all(stopped.values())
+        if self.supervisor_.sensors():
+            return
+        if self.scheduled_start_ is not None:
+            self.scheduled_start_.cancel()
+            self.scheduled_start_ = None
+        if self.monitor_ is not None:
+            self.monitor_.cancel()
+            self.monitor_ = None
+        if self.cli_runner_ is not None:
+            reply.recording_id = self.recording_id_
+        self.cli_runner_ = None
+        for sensor, frame_index in self.frame_indexes_.items():
+            frame_index.finish()
+            reply.frame_count += frame_index.frame_count
+            reply.bytes_written += frame_index.bytes_written
+            newest = frame_index.newest_index()
+            if newest is not None and (sensor == "Camera1" or not reply.last_frame):
+                reply.last_frame = os.path.basename(frame_index.frame_path(newest))
+        # Later stops while idle have nothing to report, and mustn't finish the
+        # recording again.
+        self.frame_indexes_ = {}
+        self.close_frame_times()
+        self.finish_offload()
+
+    def close_frame_times(self) -> None:
+        for frame_times in self.frame_times_.values():
+            frame_times.close()
+        self.frame_times_ = {}
+
+    def finish_offload(self) -> None:
+        """Lets the offloader upload the rest of the frames in the background."""
+        offloader = self.offloader_
+        if offloader is None:
+            return
+        self.offloader_ = None
+        offloader.finish()
+        self.finishing_offloaders_.add(offloader)
+        assert offloader.upload_ is not None
+        offloader.upload_.add_done_callback(
+            lambda _: self.finishing_offloaders_.discard(offloader)
+        )
+
+    async def monitor_collection(self):
+        """Keeps the frame counts and rates current and warns about stalls."""
+        stalled = False
+        low_disk = False
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL_S)
+            if not self.frame_indexes_:
+                continue
+            for frame_index in self.frame_indexes_.values():
+                frame_index.refresh()
+            if self.is_stalled() != stalled:
+                stalled = not stalled
+                print(f"Collection on {self.node_id} stalled: {stalled}")
+            _, write_bytes_per_s = self.frame_rates()
+            if write_bytes_per_s > 0:
+                self.write_bytes_per_s_ = write_bytes_per_s
+            self.make_room()
+            left_s = self.recording_time_left_s()
+            if (left_s < self.warn_remaining_s) != low_disk:
+                low_disk = not low_disk
+                print(
+                    f"Disk space on {self.node_id} low: {low_disk},"
+                    f" {left_s / 60:.0f} minutes left"
+                )
+
+    def make_room(self) -> None:
+        """Deletes old recordings in the background if space is running out."""
+        if not self.keep_free_bytes:
+            return
+        if self.eviction_ is not None and not self.eviction_.done():
+            return
+        base_collection_path = CliRunner().base_collection_path
+        assert isinstance(base_collection_path, str)
+        if free_bytes(base_collection_path) >= self.keep_free_bytes:
+            return
+        # Never the current recording, nor the samples and previews.
+        keep = {self.recording_id_, "nocollection"}
+        self.eviction_ = asyncio.create_task(
+            asyncio.to_thread(evict, base_collection_path, self.keep_free_bytes, keep)
+        )
+
+    def recording_time_left_s(self, free: Optional[int] = None) -> float:
+        """Estimated seconds of recording left before the disk is full.
+
+        Args:
+          free: Free bytes where recordings are saved, if already known.
+        """
+        if free is None:
+            base_collection_path = CliRunner().base_collection_path
+            assert isinstance(base_collection_path, str)
+            free = free_bytes(base_collection_path)
+        write_bytes_per_s = self.write_bytes_per_s_ or self.expected_write_bytes_per_s
+        return remaining_s(free, write_bytes_per_s)
+
+    async def schedule_start(
+        self, cli_runner: CliRunner, sensors: list[str], start_time_ns: int
+    ):
+        """Prepares the sensors now and begins saving frames at start_time_ns.
+
+        Sensors whose command can be started paused are spawned right away so
+        that process and camera startup are out of the way before the start
+        time. The others are spawned at the start time.
+        """
+        armed = [s for s in sensors if cli_runner.can_arm(s)]
+        await asyncio.gather(
+            *(self.start_sensor(cli_runner, s, armed=True) for s in armed)
+        )
+
+        async def release():
+            await asyncio.sleep((start_time_ns - time.time_ns()) / 1e9)
+            for sensor in armed:
+                process = self.supervisor_.process(sensor)
+                if process is not None:
+                    cli_runner.release_collection(process)
+            await asyncio.gather(
+                *(self.start_sensor(cli_runner, s) for s in sensors if s not in armed)
+            )
+            self.capture_started_s_ = time.monotonic()
+            print(f"Released collection on {self.node_id}, {time.time_ns()}")
+
+        self.scheduled_start_ = asyncio.create_task(release())
 
     async def LiveSample(
         self, request: ccline_pb2.LiveSampleRequest, context: grpc.aio.ServicerContext
     ) -> ccline_pb2.LiveSampleReply:
-        print(
-            "LiveSample on node %s, sensors %s", self.node_id, request.sensor_ids
-        )
-        cli_runner = CliRunner()
-        process = cli_runner.run_live_sample_cmd()
-        process.wait()
-        # TODO: 'live_sample.jpg' must match the config file. Name should be returned from cli_runner.
-        filename = os.path.join(
-            cli_runner.get_full_nocollection_path(), "live_sample.jpg"
-        )
+        print(f"LiveSample on node {self.node_id}, sensors {request.sensor_ids}")
+        filename = await self.capture_live_sample()
         content = None
         with open(filename, "rb") as f:
-            content = f.read()
+            content = await asyncio.to_thread(f.read)
         return ccline_pb2.LiveSampleReply(image=content)
 
+    async def StreamLiveSample(
+        self, request: ccline_pb2.LiveSampleRequest, context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[ccline_pb2.FileChunk]:
+        print(f"StreamLiveSample on node {self.node_id}, sensors {request.sensor_ids}")
+        filename = await self.capture_live_sample()
+        async for chunk in read_chunks(filename, os.path.basename(filename)):
+            yield chunk
+
+    async def capture_live_sample(self) -> str:
+        """Captures a single image and returns the path to it."""
+        frame_index = self.frame_indexes_.get("Camera1")
+        if self.is_collecting() and frame_index is not None:
+            # The camera is busy so use the newest frame from the collection.
+            frame_index.refresh()
+            frame = frame_index.latest_complete()
+            if frame is not None:
+                return frame
+        return await self.sampler_.sample()
+
+    def is_collecting(self) -> bool:
+        return self.supervisor_.alive()
+
+    def recording_state(self) -> int:
+        if not self.supervisor_.sensors() and self.scheduled_start_ is None:
+            return ccline_pb2.NodeStatus.IDLE
+        if self.scheduled_start_ is not None and not self.scheduled_start_.done():
+            return ccline_pb2.NodeStatus.ARMED
+        if self.is_collecting():
+            return ccline_pb2.NodeStatus.RECORDING
+        return ccline_pb2.NodeStatus.EXITED
+
+    def is_stalled(self) -> bool:
+        """True if recording but a sensor hasn't saved a frame for stall_after_s."""
+        if self.recording_state() != ccline_pb2.NodeStatus.RECORDING:
+            return False
+        if not self.frame_indexes_:
+            return time.monotonic() - self.capture_started_s_ > self.stall_after_s
+        for frame_index in self.frame_indexes_.values():
+            if not frame_index.frame_count:
+                since_frame_s = time.monotonic() - self.capture_started_s_
+            else:
+                since_frame_s = (time.time_ns() - frame_index.last_frame_time_ns) / 1e9
+            if since_frame_s > self.stall_after_s:
+                return True
+        return False
+
+    def frame_rates(self) -> tuple[float, float]:
+        """Frames and bytes saved per second by all the sensors together."""
+        frames_per_s = 0.0
+        write_bytes_per_s = 0.0
+        for frame_index in self.frame_indexes_.values():
+            sensor_frames_per_s, sensor_bytes_per_s = frame_index.rates()
+            frames_per_s += sensor_frames_per_s
+            write_bytes_per_s += sensor_bytes_per_s
+        return frames_per_s, write_bytes_per_s
+
+    async def FetchRecording(
+        self,
+        request: ccline_pb2.FetchRecordingRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> AsyncIterator[ccline_pb2.FileChunk]:
+        recording_id = request.recording_id
+        if not recording_id or os.path.basename(recording_id) != recording_id:
+            await context.abort(
+                grpc.StatusCode.INVALID_ARGUMENT, f"Bad recording {recording_id}"
+            )
+        base_collection_path = CliRunner().base_collection_path
+        assert isinstance(base_collection_path, str)
+        directory = os.path.join(base_collection_path, recording_id)
+        if not os.path.isdir(directory):
+            await context.abort(
+                grpc.StatusCode.NOT_FOUND, f"No recording {recording_id}"
+            )
+        exclude = []
+        if recording_id == self.recording_id_ and self.is_collecting():
+            # The newest frame of each sensor may still be being written.
+            for frame_index in self.frame_indexes_.values():
+                frame_index.refresh()
+                newest = frame_index.newest_index()
+                if newest is not None:
+                    exclude.append(os.path.basename(frame_index.frame_path(newest)))
+        async for chunk in read_directory(
+            directory, request.have_bytes, exclude, sha256=True
+        ):
+            yield chunk
+
+    async def GetStatus(
+        self, request: ccline_pb2.StatusRequest, context: grpc.aio.ServicerContext
+    ) -> ccline_pb2.NodeStatus:
+        status = ccline_pb2.NodeStatus(
+            node_id=self.node_id, recording_id=self.recording_id_
+        )
+        # Totals of all the sensors.
+        for frame_index in self.frame_indexes_.values():
+            frame_index.refresh()
+            status.frame_count += frame_index.frame_count
+            status.last_frame_time_ns = max(
+                status.last_frame_time_ns, frame_index.last_frame_time_ns
+            )
+            status.bytes_written += frame_index.bytes_written
+        status.frames_per_s, status.write_bytes_per_s = self.frame_rates()
+        status.state = self.recording_state()
+        for sensor in self.supervisor_.sensors():
+            process = self.supervisor_.process(sensor)
+            sensor_status = status.sensors.add(
+                sensor=sensor, restarts=self.supervisor_.restarts[sensor]
+            )
+            if process is not None:
+                sensor_status.pid = process.pid
+                sensor_status.alive = process.returncode is None
+                if not status.capture_pid:
+                    status.capture_pid = process.pid
+        status.capture_alive = self.is_collecting()
+        status.stalled = self.is_stalled()
+        base_collection_path = CliRunner().base_collection_path
+        assert isinstance(base_collection_path, str)
+        status.disk_free_bytes = free_bytes(base_collection_path)
+        status.remaining_s = self.recording_time_left_s(status.disk_free_bytes)
+        status.low_disk = status.remaining_s < self.warn_remaining_s
+        status.evicts_recordings = self.keep_free_bytes > 0
+        return status
+
     async def Shutdown(
         self, request: ccline_pb2.ShutdownRequest, context: grpc.aio.ServicerContext
     ) -> ccline_pb2.ShutdownReply:
         print(f"Received shutdown on node {self.node_id}")
-        cli_runner = CliRunner()
-        _ = cli_runner.run_shutdown_cmd()
-        return ccline_pb2.ShutdownReply()
+        reply = ccline_pb2.ShutdownReply(power_off_s=request.delay_s + self.halt_s)
+        if self.supervisor_.sensors():
+            stopped = ccline_pb2.RecordReply()
+            await self.stop_sensors(ALL_SENSOR_IDS, stopped)
+            reply.recording_id = stopped.recording_id
+            reply.frame_count = stopped.frame_count
+            reply.bytes_written = stopped.bytes_written
+        # Frames still in the page cache would be lost when the power is cut.
+        await asyncio.to_thread(os.sync)
+        if self.shutdown_ is None:
+            self.shutdown_ = asyncio.create_task(self.run_shutdown(request.delay_s))
+        return reply
+
+    async def run_shutdown(self, delay_s: float) -> None:
+        await asyncio.sleep(delay_s)
+        process = await CliRunner().run_shutdown_cmd()
+        returncode = await process.wait()
+        if returncode:
+            print(f"Shutdown command on {self.node_id} failed with {returncode}")
+            self.shutdown_ = None
 
 
+@gin.configurable(denylist=["resolver", "channel_pool", "node_id"])
 class Coordinator(ccline_pb2_grpc.CoordinatorServicer):
     """The coordinator (goose) handles tasks targetted at the camera array.
 
@@ -115,8 +548,78 @@ class Coordinator(ccline_pb2_grpc.CoordinatorServicer):
     and results to and from all nodes.
     """
 
-    def __init__(self, resolver: Resolver):
+    def __init__(
+        self,
+        resolver: Resolver,
+        channel_pool: Optional[ChannelPool] = None,
+        start_lead_s: float = 2.0,
+        catalogue_path: Optional[str] = None,
+        min_remaining_s: float = 600.0,
+        node_id: Optional[str] = None,
+        reply_grace_s: float = 2.0,
+    ):
+        """The coordinator (goose) handles tasks targetted at the camera array.
+
+        Args:
+          resolver: Maps names to IPs for the array.
+          channel_pool: Open channels to the nodes. Created if not given.
+          start_lead_s: How far in the future to schedule the start of a
+            collection. Must cover sending the request to every node and
+            preparing the camera on the slowest node.
+          catalogue_path: SQLite database listing the recordings. None keeps
+            the list in memory until the coordinator restarts.
+          min_remaining_s: Collections don't start unless every node has
+            space for at least this many seconds of recording, or makes room
+            by deleting old recordings.
+          node_id: Name of the node running the coordinator, which is shut
+            down after the others.
+          reply_grace_s: Time the coordinator's node waits before shutting
+            down, so the reply to ShutdownCluster reaches the client.
+        """
         self.resolver = resolver
+        self.start_lead_s = start_lead_s
+        if channel_pool is None:
+            channel_pool = ChannelPool(resolver)
+        self.channel_pool = channel_pool
+        self.catalogue = Catalogue(catalogue_path)
+        self.min_remaining_s = min_remaining_s
+        self.node_id = node_id
+        self.reply_grace_s = reply_grace_s
+
+    async def fan_out(
+        self,
+        method: str,
+        request,
+        timeout: float = NODE_TIMEOUT_S,
+        nodes: Optional[list[str]] = None,
+    ) -> list[NodeOutcome]:
+        """Sends `request` to the Node `method` on every node at the same time.
+
+        Args:
+          method: Name of the Node RPC, e.g. "Record".
+          request: Request message sent unchanged to each node.
+          timeout: Deadline in seconds for each node.
+          nodes: Nodes to send to. Defaults to every node in the array.
+
+        Returns:
+          One outcome per node in the array.
+        """
+
+        async def call(node: str):
+            client = self.channel_pool.stub(node)
+            return await getattr(client, method)(request, timeout=timeout)
+
+        if nodes is None:
+            nodes = self.resolver.all_nodes()
+        outcomes = await dispatch(nodes, call, timeout)
+        for outcome in outcomes:
+            if not outcome.ok:
+                self.channel_pool.report_failure(outcome.node_id, outcome.code)
+            print(
+                f"{method} {outcome.node_id} {outcome.latency_ms:.1f} ms: "
+                f"{outcome.response if outcome.ok else outcome.message}"
+            )
+        return outcomes
 
     async def StartCollecting(
         self,
@@ -124,24 +627,73 @@ class Coordinator(ccline_pb2_grpc.CoordinatorServicer):
         context: grpc.aio.ServicerContext,
     ) -> ccline_pb2.StartCollectingReply:
         print("StartCollecting")
-        print("  Recording ID %s", request.recording_id)
+        print(f"  Recording ID {request.recording_id}")
+        short, warnings = await self.check_disk_space()
+        if short and not request.force:
+            return ccline_pb2.StartCollectingReply(
+                result=ccline_pb2.StartCollectingReply.ERROR,
+                message="Not enough disk space to start: " + ", ".join(short),
+            )
         # Start clients for all nodes, including itself.
-        for node in self.resolver.all_nodes():
-            async with grpc.aio.insecure_channel(
-                target=self.resolver.address_for_name(node)
-            ) as channel:
-                client = ccline_pb2_grpc.NodeStub(channel)
-                record_request = ccline_pb2.RecordRequest()
-                # TODO: The coordinator doesn't have a way to choose which cameras
-                # or sensors to select here yet.
-                record_request.start_sensor_ids.append(ccline_pb2.Camera1)
-                record_request.data_path = request.recording_id
-                print(f"Sending Record to {node}: record_request {record_request}")
-                response = await client.Record(record_request)
-            print(f"Record {node} response: {response}")
-        return ccline_pb2.StartCollectingReply(
-            result=StartCollectingResult.OK, message="All sensors started."
+        record_request = ccline_pb2.RecordRequest()
+        # Each node starts the sensors it has collection commands for.
+        record_request.start_sensor_ids.extend(ALL_SENSOR_IDS)
+        record_request.data_path = request.recording_id
+        # All nodes start at the same instant rather than whenever the request
+        # happens to reach them.
+        start_time_ns = request.start_time_ns
+        if start_time_ns == 0:
+            start_time_ns = time.time_ns() + int(self.start_lead_s * 1e9)
+        record_request.start_time_ns = start_time_ns
+        outcomes = await self.fan_out("Record", record_request)
+        reply = ccline_pb2.StartCollectingReply(start_time_ns=start_time_ns)
+        for outcome in outcomes:
+            node_result = reply.node_results.add()
+            node_result.CopyFrom(outcome.to_proto())
+            if outcome.ok:
+                node_result.clock_offset_ms = clock_offset_ms(outcome)
+        if time.time_ns() > start_time_ns:
+            print("Warning: start time passed before all nodes replied.")
+        self.catalogue.start(
+            request.recording_id,
+            request.recording_tag,
+            start_time_ns,
+            [o.node_id for o in outcomes if o.ok],
         )
+        if all(o.ok for o in outcomes):
+            reply.result = ccline_pb2.StartCollectingReply.OK
+            reply.message = "All sensors started."
+        else:
+            reply.result = ccline_pb2.StartCollectingReply.ERROR
+            reply.message = summarize(outcomes)
+        if short or warnings:
+            reply.message += " Low disk space: " + ", ".join(short + warnings)
+        return reply
+
+    async def check_disk_space(self) -> tuple[list[str], list[str]]:
+        """Finds nodes that may run out of space during a collection.
+
+        Returns:
+          Nodes with less than min_remaining_s of recording left, and nodes
+          that are low but delete old recordings or are below their own
+          warning threshold, each with the minutes left. Nodes that don't
+          answer are left to fail when the collection starts.
+        """
+        outcomes = await self.fan_out(
+            "GetStatus", ccline_pb2.StatusRequest(), STATUS_TIMEOUT_S
+        )
+        short = []
+        warnings = []
+        for status in (o.response for o in outcomes if o.ok):
+            left = f"{status.node_id} ({status.remaining_s / 60:.0f} min)"
+            if status.remaining_s >= self.min_remaining_s:
+                if status.low_disk:
+                    warnings.append(left)
+            elif status.evicts_recordings:
+                warnings.append(left + " deleting old recordings")
+            else:
+                short.append(left)
+        return short, warnings
 
     async def StopAllCollects(
         self,
@@ -149,26 +701,120 @@ class Coordinator(ccline_pb2_grpc.CoordinatorServicer):
         context: grpc.aio.ServicerContext,
     ) -> ccline_pb2.StopAllCollectsReply:
         print("StopAllCollects")
-        # Start clients for all nodes, including itself.
-        for node in self.resolver.all_nodes():
-            async with grpc.aio.insecure_channel(
-                target=self.resolver.address_for_name(node)
-            ) as channel:
-                client = ccline_pb2_grpc.NodeStub(channel)
-                record_request = ccline_pb2.RecordRequest()
-                record_request.stop_sensor_ids.extend([
-                    ccline_pb2.Camera1,
-                    ccline_pb2.Camera2,
-                    ccline_pb2.Camera3,
-                    ccline_pb2.Camera4,
-                    ccline_pb2.Imu1,
-                    ccline_pb2.Imu2,
-                    ccline_pb2.Imu3,
-                    ccline_pb2.Imu4,
-                ])
-                response = await client.Record(record_request, timeout=10)
-            print(f"Record {node} response: {response}")
-        return ccline_pb2.StopCollectingReply()
+        # Stop clients for all nodes, including itself.
+        record_request = ccline_pb2.RecordRequest()
+        record_request.stop_sensor_ids.extend(ALL_SENSOR_IDS)
+        outcomes = await self.fan_out("Record", record_request)
+        # Nodes reply once their capture has exited, with the final size of
+        # the recording they stopped.
+        counts = []
+        killed = []
+        for outcome in outcomes:
+            stopped = outcome.response
+            if not outcome.ok:
+                continue
+            if stopped.killed:
+                killed.append(outcome.node_id)
+            if stopped.recording_id:
+                counts.append(
+                    (
+                        stopped.recording_id,
+                        outcome.node_id,
+                        stopped.frame_count,
+                        stopped.bytes_written,
+                    )
+                )
+                outcome.message = (
+                    f"{stopped.frame_count} frames, last {stopped.last_frame}"
+                    + (", killed" if stopped.killed else "")
+                )
+        self.catalogue.update_nodes(counts)
+        for recording_id in {c[0] for c in counts}:
+            self.catalogue.stop(recording_id, time.time_ns())
+        message = summarize(outcomes)
+        if killed:
+            message += " Killed, last frame may be incomplete: " + ", ".join(killed)
+        return ccline_pb2.StopAllCollectsReply(
+            node_results=[o.to_proto() for o in outcomes], message=message
+        )
+
+    async def GetArrayStatus(
+        self,
+        request: ccline_pb2.ArrayStatusRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> ccline_pb2.ArrayStatus:
+        outcomes = await self.fan_out(
+            "GetStatus", ccline_pb2.StatusRequest(), STATUS_TIMEOUT_S
+        )
+        reply = ccline_pb2.ArrayStatus(
+            node_statuses=[o.response for o in outcomes if o.ok],
+            node_results=[o.to_proto() for o in outcomes],
+        )
+        # Keeps the catalogue current while a recording is going.
+        self.catalogue.update_nodes(
+            (s.recording_id, s.node_id, s.frame_count, s.bytes_written)
+            for s in reply.node_statuses
+            if s.recording_id
+        )
+        for node, stats in self.channel_pool.stats().items():
+            reply.channels.add(
+                node_id=node,
+                state=stats.state,
+                connects=stats.connects,
+                reconnects=stats.reconnects,
+                failures=stats.failures,
+            )
+        return reply
+
+    async def SampleAll(
+        self,
+        request: ccline_pb2.SampleAllRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> AsyncIterator[ccline_pb2.SampleAllChunk]:
+        print("SampleAll")
+        live_request = ccline_pb2.LiveSampleRequest(sensor_ids=request.sensor_ids)
+        # Bounded so a slow client holds back the nodes instead of buffering
+        # every image on the coordinator.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SAMPLE_QUEUE_CHUNKS)
+
+        async def sample(node: str):
+            stub = self.channel_pool.stub(node)
+            chunks = stub.StreamLiveSample(live_request, timeout=SAMPLE_TIMEOUT_S)
+            async for chunk in chunks:
+                await queue.put(ccline_pb2.SampleAllChunk(node_id=node, chunk=chunk))
+
+        async def sample_and_report(node: str):
+            outcome = await call_node(node, sample, SAMPLE_TIMEOUT_S)
+            if not outcome.ok:
+                self.channel_pool.report_failure(node, outcome.code)
+            print(f"SampleAll {node} {outcome.latency_ms:.1f} ms {outcome.message}")
+            await queue.put(
+                ccline_pb2.SampleAllChunk(node_id=node, node_result=outcome.to_proto())
+            )
+
+        tasks = [
+            asyncio.create_task(sample_and_report(node))
+            for node in self.resolver.all_nodes()
+        ]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                message = await queue.get()
+                if message.HasField("node_result"):
+                    remaining -= 1
+                yield message
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def ListRecordings(
+        self,
+        request: ccline_pb2.ListRecordingsRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> ccline_pb2.ListRecordingsReply:
+        return ccline_pb2.ListRecordingsReply(
+            recordings=self.catalogue.find(request)
+        )
 
     async def ShutdownCluster(
         self,
@@ -176,22 +822,63 @@ class Coordinator(ccline_pb2_grpc.CoordinatorServicer):
         context: grpc.aio.ServicerContext,
     ) -> ccline_pb2.ShutdownClusterReply:
         print("Shutdown all nodes")
-        # This implementation shuts down all nodes in any order. However some nodes
-        # may play a specific role in connecting back to the client. It would be
-        # preferable to shut down that node last.
-        for node in self.resolver.all_nodes():
-            print(f"Sending shutdown to {node}")
-            async with grpc.aio.insecure_channel(
-                target=self.resolver.address_for_name(node)
-            ) as channel:
-                client = ccline_pb2_grpc.NodeStub(channel)
-                record_request = ccline_pb2.ShutdownRequest()
-                response = await client.Shutdown(record_request, timeout=10)
-            print(f"Shutdown {node} response: {response}")
-        reply = ccline_pb2.ShutdownClusterReply()
+        # The coordinator relays the client's requests, so it goes last, once
+        # the others have stopped collecting and started shutting down.
+        nodes = self.resolver.all_nodes()
+        others = [n for n in nodes if n != self.node_id]
+        outcomes = await self.fan_out(
+            "Shutdown", ccline_pb2.ShutdownRequest(), SHUTDOWN_TIMEOUT_S, others
+        )
+        acknowledged = all(o.ok for o in outcomes)
+        if self.node_id in nodes and (acknowledged or request.force):
+            outcomes += await self.fan_out(
+                "Shutdown",
+                ccline_pb2.ShutdownRequest(delay_s=self.reply_grace_s),
+                SHUTDOWN_TIMEOUT_S,
+                [self.node_id],
+            )
+        reply = ccline_pb2.ShutdownClusterReply(
+            node_results=[o.to_proto() for o in outcomes],
+            message=summarize(outcomes),
+        )
+        # Each node's countdown started when it replied.
+        now_ns = time.time_ns()
+        for outcome in outcomes:
+            if outcome.ok:
+                halted_ns = outcome.received_ns + outcome.response.power_off_s * 1e9
+                reply.power_off_s = max(reply.power_off_s, (halted_ns - now_ns) / 1e9)
+        self.catalogue.update_nodes(
+            (
+                o.response.recording_id,
+                o.node_id,
+                o.response.frame_count,
+                o.response.bytes_written,
+            )
+            for o in outcomes
+            if o.ok and o.response.recording_id
+        )
+        for recording_id in {o.response.recording_id for o in outcomes if o.ok}:
+            if recording_id:
+                self.catalogue.stop(recording_id, now_ns)
+        if len(outcomes) == len(nodes) and all(o.ok for o in outcomes):
+            reply.result = ccline_pb2.ShutdownClusterReply.OK
+        else:
+            reply.result = ccline_pb2.ShutdownClusterReply.ERROR
+            if self.node_id in nodes and len(outcomes) < len(nodes):
+                reply.message += f" Left {self.node_id} running to retry."
         return reply
 
 
+def clock_offset_ms(outcome: NodeOutcome) -> float:
+    """Estimates node clock minus coordinator clock from a RecordReply.
+
+    Assumes the node handled the request halfway through the round trip, so the
+    error is at most half the round trip time.
+    """
+    midpoint_ns = (outcome.sent_ns + outcome.received_ns) / 2
+    return (outcome.response.node_time_ns - midpoint_ns) / 1e6
+
+
 def create_server(
     my_id: str, coordinator_id: str, resolver: Resolver
 ) -> grpc.aio.Server:
@@ -202,14 +889,17 @@ def create_server(
       coordinator_id: Name of the goose - the node that receives requests for the array.
       resolver: Maps names to IPs for the array.
     """
-    new_server = grpc.aio.server()
+    new_server = grpc.aio.server(options=SERVER_OPTIONS)
     ccline_pb2_grpc.add_NodeServicer_to_server(Node(my_id, coordinator_id), new_server)
     if my_id == coordinator_id:
         # This node is the coordinator. Start up a coordinator server to answer
         # external requests.
         print(f"Coordinator service on {my_id}")
+        # Channels to the nodes stay open for the lifetime of the server.
+        channel_pool = ChannelPool(resolver)
+        channel_pool.open_all()
         ccline_pb2_grpc.add_CoordinatorServicer_to_server(
-            Coordinator(resolver), new_server
+            Coordinator(resolver, channel_pool, node_id=my_id), new_server
         )
     listen_address = resolver.address_for_name(my_id, listen=True)
     port_num = new_server.add_insecure_port(listen_address)
@@ -247,9 +937,13 @@ async def serve_and_block(my_id: str, coordinator_id: str, resolver: Resolver):
 def run():
     read_config()
     config = Config()
-    resolver = Resolver()
     assert isinstance(config.node_id, str)
     assert isinstance(config.coordinator_node_id, str)
+    # The server keeps its Resolver, so a node that isn't up yet mustn't be
+    # dropped for good, nor this node, which isn't listening yet.
+    resolver = Resolver(
+        connect=False, keep=[config.node_id, config.coordinator_node_id]
+    )
     _ = asyncio.run(
         serve_and_block(config.node_id, config.coordinator_node_id, resolver)
     )
@@ -0,0 +1,144 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Workstation receiver for frames offloaded during a collection.
+
+Nodes with `Offloader.sink_address` set upload each frame here as soon as it's
+complete. Frames are saved in the same layout as the `fetch` command,
+`<directory>/<recording_id>/<node>/` with a manifest, so a `fetch` afterwards
+only transfers whatever the offload missed. Frames are transformed as they
+arrive by the node profiles in `Resolver.name_to_transform`.
+"""
+
+import asyncio
+import functools
+import os
+from typing import AsyncIterator, Optional
+
+import gin
+import grpc
+
+from ccline import ccline_pb2, ccline_pb2_grpc
+from ccline.config import read_config
+from ccline.fetch import Manifest, receive_recording
+from ccline.resolver import Resolver
+from ccline.transform import Transformer
+
+
+def is_plain_name(name: str) -> bool:
+    """True if `name` can't escape the directory it's joined to."""
+    return bool(name) and name not in (".", "..") and os.path.basename(name) == name
+
+
+class Sink(ccline_pb2_grpc.SinkServicer):
+    """Saves frames uploaded by the nodes."""
+
+    def __init__(self, directory: str, transformer: Optional[Transformer] = None):
+        """Saves frames uploaded by the nodes.
+
+        Args:
+          directory: Recordings are saved to `<directory>/<recording_id>/<node>/`.
+          transformer: Transforms frames as they arrive.
+        """
+        self.directory = directory
+        self.transformer = transformer
+        # Manifests by (recording_id, node_id). Kept in memory since one is
+        # updated for every frame.
+        self.manifests_: dict[tuple[str, str], Manifest] = {}
+
+    def manifest(self, recording_id: str, node_id: str) -> Manifest:
+        key = (recording_id, node_id)
+        if key not in self.manifests_:
+            directory = os.path.join(self.directory, recording_id, node_id)
+            os.makedirs(directory, exist_ok=True)
+            self.manifests_[key] = Manifest(directory)
+        return self.manifests_[key]
+
+    def save(self) -> None:
+        for manifest in self.manifests_.values():
+            manifest.save()
+
+    async def Upload(
+        self,
+        request_iterator: AsyncIterator[ccline_pb2.OffloadChunk],
+        context: grpc.aio.ServicerContext,
+    ) -> ccline_pb2.OffloadReply:
+        first = await anext(request_iterator, None)
+        if first is None:
+            return ccline_pb2.OffloadReply()
+        if not (is_plain_name(first.node_id) and is_plain_name(first.recording_id)):
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Bad upload names")
+        manifest = self.manifest(first.recording_id, first.node_id)
+
+        async def chunks():
+            yield first.chunk
+            async for message in request_iterator:
+                yield message.chunk
+
+        on_file = None
+        if self.transformer is not None:
+            on_file = functools.partial(
+                self.transformer.submit,
+                os.path.join(self.directory, first.recording_id),
+                first.node_id,
+            )
+        summary = await receive_recording(
+            chunks(), manifest.directory, manifest, on_file
+        )
+        if summary.mismatched:
+            # The node retries, sending the deleted file from the start.
+            await context.abort(
+                grpc.StatusCode.DATA_LOSS,
+                f"Checksum of {', '.join(summary.mismatched)} doesn't match",
+            )
+        return ccline_pb2.OffloadReply(bytes_received=summary.bytes)
+
+    async def OffloadProgress(
+        self,
+        request: ccline_pb2.OffloadProgressRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> ccline_pb2.OffloadProgressReply:
+        if not (is_plain_name(request.node_id) and is_plain_name(request.recording_id)):
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Bad names")
+        manifest = self.manifest(request.recording_id, request.node_id)
+        names = list(request.names) or None
+        return ccline_pb2.OffloadProgressReply(have_bytes=manifest.have_bytes(names))
+
+
+@gin.configurable()
+async def serve_sink(listen_address: str = "[::]:51050", directory: str = "jot"):
+    """Runs the sink until interrupted.
+
+    Args:
+      listen_address: Address and port to listen on. Nodes connect to the
+        workstation address with this port, see `Offloader.sink_address`.
+      directory: Recordings are saved to `<directory>/<recording_id>/<node>/`.
+    """
+    sink = Sink(directory, Transformer(Resolver().transforms()))
+    server = grpc.aio.server()
+    ccline_pb2_grpc.add_SinkServicer_to_server(sink, server)
+    server.add_insecure_port(listen_address)
+    await server.start()
+    print(f"Sink on {listen_address} saving to {directory}")
+    try:
+        await server.wait_for_termination()
+    finally:
+        sink.save()
+        if sink.transformer is not None:
+            sink.transformer.close()
+
+
+def run():
+    read_config()
+    asyncio.run(serve_sink())
@@ -0,0 +1,158 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs a capture process for each sensor on a node.
+
+A node can have several cameras and IMUs, each saving with its own command.
+The supervisor starts and stops each sensor's process on its own, so one
+sensor failing doesn't stop the others. A process that exits while its sensor
+should be collecting is restarted, waiting longer after each crash in a row
+so a sensor that can't start doesn't spin. Every process is waited on as soon
+as it's started so exits are noticed, and reaped, straight away.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+
+import gin
+
+# Starts the process for one run of a sensor: (run number, armed).
+Spawn = Callable[[int, bool], Awaitable[asyncio.subprocess.Process]]
+
+# Stops a process. Returns False if it had to be killed.
+Stop = Callable[[asyncio.subprocess.Process], Awaitable[bool]]
+
+
+class Capture:
+    """The capture process of one sensor, restarted if it crashes."""
+
+    def __init__(self, sensor: str, spawn: Spawn):
+        self.sensor = sensor
+        self.spawn_ = spawn
+        self.process: Optional[asyncio.subprocess.Process] = None
+        # Number of times the process has been started, less one.
+        self.run = 0
+        self.stopping = False
+        # Watches the process and restarts it.
+        self.task_: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+
+@gin.configurable()
+class Supervisor:
+    """Starts, stops and restarts the capture process of each sensor."""
+
+    def __init__(
+        self,
+        restart_delay_s: float = 1.0,
+        restart_delay_max_s: float = 30.0,
+        healthy_after_s: float = 60.0,
+    ):
+        """Starts, stops and restarts the capture process of each sensor.
+
+        Args:
+          restart_delay_s: Wait before restarting a process that crashed.
+            Doubles after each crash in a row.
+          restart_delay_max_s: Longest wait before a restart.
+          healthy_after_s: A process that ran for this long before crashing
+            is restarted after restart_delay_s again.
+        """
+        self.restart_delay_s = restart_delay_s
+        self.restart_delay_max_s = restart_delay_max_s
+        self.healthy_after_s = healthy_after_s
+        self.captures_: dict[str, Capture] = {}
+        # Restarts of each sensor during the current collection.
+        self.restarts: dict[str, int] = {}
+
+    async def start(self, sensor: str, spawn: Spawn, armed: bool = False) -> None:
+        """Starts collecting from `sensor` unless it's already collecting.
+
+        Args:
+          sensor: Name of the sensor.
+          spawn: Starts its process. Called again with a higher run number for
+            each restart.
+          armed: Passed to the first spawn. Restarts are never armed.
+        """
+        capture = self.captures_.get(sensor)
+        if capture is not None and not capture.stopping:
+            return
+        capture = Capture(sensor, spawn)
+        self.captures_[sensor] = capture
+        self.restarts[sensor] = 0
+        capture.process = await spawn(0, armed)
+        capture.task_ = asyncio.create_task(self._watch(capture))
+
+    async def _watch(self, capture: Capture) -> None:
+        delay_s = self.restart_delay_s
+        while True:
+            assert capture.process is not None
+            started_s = time.monotonic()
+            returncode = await capture.process.wait()
+            if capture.stopping:
+                return
+            if time.monotonic() - started_s >= self.healthy_after_s:
+                delay_s = self.restart_delay_s
+            print(
+                f"{capture.sensor} capture exited with {returncode},"
+                f" restarting in {delay_s:.1f}s"
+            )
+            await asyncio.sleep(delay_s)
+            delay_s = min(delay_s * 2, self.restart_delay_max_s)
+            capture.run += 1
+            self.restarts[capture.sensor] += 1
+            capture.process = await capture.spawn_(capture.run, False)
+
+    async def stop(self, sensors: Iterable[str], stop: Stop) -> dict[str, bool]:
+        """Stops the given sensors at the same time.
+
+        Args:
+          sensors: Names of the sensors. Ones that aren't collecting are
+            ignored.
+          stop: Stops one process, see CliRunner.stop_collection_cmd.
+
+        Returns: Whether each stopped sensor's process exited by itself.
+        """
+        captures = [self.captures_.pop(s) for s in sensors if s in self.captures_]
+        for capture in captures:
+            capture.stopping = True
+            if capture.task_ is not None:
+                # Between restarts there may be no process to stop.
+                capture.task_.cancel()
+
+        async def stop_capture(capture: Capture) -> bool:
+            if capture.task_ is not None:
+                await asyncio.gather(capture.task_, return_exceptions=True)
+            if not capture.alive:
+                return True
+            assert capture.process is not None
+            return await stop(capture.process)
+
+        stopped = await asyncio.gather(*(stop_capture(c) for c in captures))
+        return {c.sensor: s for c, s in zip(captures, stopped)}
+
+    def sensors(self) -> list[str]:
+        """Sensors that are collecting, including ones waiting to restart."""
+        return list(self.captures_)
+
+    def process(self, sensor: str) -> Optional[asyncio.subprocess.Process]:
+        capture = self.captures_.get(sensor)
+        return capture.process if capture is not None else None
+
+    def alive(self) -> bool:
+        """True if any sensor's process is running."""
+        return any(c.alive for c in self.captures_.values())
@@ -0,0 +1,186 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Sending and receiving files as streams of chunks.
+
+Full resolution frames are several MB. Sending a file as one message holds the
+whole thing in memory on both ends and runs into the GRPC message size limit,
+so files are read and written a chunk at a time instead.
+
+The sender can include a checksum of the whole file in its last chunk so the
+receiver can tell if what it saved, including anything it resumed from, is
+the file that was sent.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Container, Mapping
+
+from ccline import ccline_pb2
+
+# GRPC recommends messages in the 16-64 KiB range for streaming.
+CHUNK_SIZE = 64 * 1024
+
+# Bytes read at a time while checksumming the part of a file that isn't sent.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _hash_start(f: BinaryIO, digest, length: int) -> None:
+    """Adds the first `length` bytes of `f` to `digest`."""
+    while length > 0:
+        block = f.read(min(length, HASH_BLOCK_SIZE))
+        if not block:
+            break
+        digest.update(block)
+        length -= len(block)
+
+
+async def read_chunks(
+    path: str,
+    name: str,
+    offset: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+    sha256: bool = False,
+) -> AsyncIterator[ccline_pb2.FileChunk]:
+    """Reads a file from disk a chunk at a time.
+
+    Sends the file as it was when it was opened. Anything appended while it's
+    being sent is left for the next transfer. An empty file, or one with
+    nothing after `offset`, is sent as a single chunk with no data so the
+    receiver still learns its size and checksum.
+
+    Args:
+      path: File to read.
+      name: Name to send in each chunk.
+      offset: Position in the file to start reading from.
+      chunk_size: Maximum bytes per chunk.
+      sha256: True to send the SHA-256 of the whole file in the last chunk.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        digest = None
+        if sha256:
+            # The receiver checks the whole file, including what it has.
+            digest = hashlib.sha256()
+            await asyncio.to_thread(_hash_start, f, digest, offset)
+        f.seek(offset)
+        while True:
+            data = b""
+            if offset < size:
+                # Reads are small but still shouldn't block the event loop on
+                # a slow SD card.
+                data = await asyncio.to_thread(f.read, min(chunk_size, size - offset))
+                if not data:
+                    # Truncated while being sent.
+                    break
+            chunk = ccline_pb2.FileChunk(name=name, offset=offset, data=data, size=size)
+            if digest is not None:
+                digest.update(data)
+                if offset + len(data) == size:
+                    chunk.sha256 = digest.hexdigest()
+            yield chunk
+            offset += len(data)
+            if offset >= size:
+                break
+
+
+async def read_directory(
+    directory: str,
+    have_bytes: Mapping[str, int],
+    exclude: Container[str] = (),
+    sha256: bool = False,
+) -> AsyncIterator[ccline_pb2.FileChunk]:
+    """Reads every file in a directory a chunk at a time, in name order.
+
+    Args:
+      directory: Directory to send. Subdirectories aren't included.
+      have_bytes: Bytes of each file the receiver already has. Files with all
+        their bytes are skipped and shorter ones are sent from that offset.
+      exclude: Names of files not to send, such as one still being written.
+      sha256: True to send the SHA-256 of each file in its last chunk.
+    """
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name in exclude or not os.path.isfile(path):
+            continue
+        size = os.path.getsize(path)
+        if name in have_bytes and have_bytes[name] == size:
+            continue
+        offset = have_bytes.get(name, 0)
+        if offset > size:
+            # Not the same file, send all of it again.
+            offset = 0
+        async for chunk in read_chunks(path, name, offset, sha256=sha256):
+            yield chunk
+
+
+class PartialFile:
+    """A file being received a chunk at a time.
+
+    The file is written under a temporary name and only renamed to its final
+    path once complete, so an interrupted transfer doesn't leave a truncated
+    file that looks complete.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        """A file being received a chunk at a time.
+
+        Args:
+          path: Final path of the file.
+          resume: True to keep the bytes of an earlier interrupted transfer.
+        """
+        self.path = path
+        self.partial_path = path + ".part"
+        self.written = 0
+        if resume and not os.path.exists(self.partial_path) and os.path.exists(path):
+            # The complete file has grown since, like a sidecar during a
+            # collection. Append to a copy of it.
+            shutil.copyfile(path, self.partial_path)
+        mode = "r+b" if resume and os.path.exists(self.partial_path) else "wb"
+        self.file_ = open(self.partial_path, mode)
+
+    def write(self, chunk: ccline_pb2.FileChunk) -> None:
+        self.file_.seek(chunk.offset)
+        self.file_.write(chunk.data)
+        self.written += len(chunk.data)
+
+    def finish(self) -> None:
+        self.file_.close()
+        os.replace(self.partial_path, self.path)
+
+    def abort(self) -> None:
+        self.file_.close()
+        os.remove(self.partial_path)
+
+    def keep(self) -> None:
+        """Closes the file, leaving the partial file to resume from later."""
+        self.file_.close()
+
+
+async def write_chunks(chunks: AsyncIterable[ccline_pb2.FileChunk], path: str) -> int:
+    """Writes a stream of chunks for one file to `path`.
+
+    Returns: The number of bytes written.
+    """
+    partial_file = PartialFile(path)
+    try:
+        async for chunk in chunks:
+            partial_file.write(chunk)
+    except BaseException:
+        partial_file.abort()
+        raise
+    partial_file.finish()
+    return partial_file.written
@@ -0,0 +1,215 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-node corrections applied to frames as they're retrieved.
+
+Nodes are mounted in different orientations on the rig, so their frames need
+different rotations, flips and crops. Each node's profile is set next to its
+address with `Resolver.name_to_transform`, for example:
+
+    Resolver.name_to_transform = {
+      'gamma2': {'rotate': '180'},
+      'gamma5': {'crop': [0, 80, 3840, 2000], 'flip': 'horizontal'},
+    }
+
+Crops are `[x, y, width, height]` in the original frame, then the flip, then
+the clockwise rotation. Frames received by `fetch` or the offload sink are
+transformed in worker processes while the transfer carries on, into
+`<recording>.transformed/<node>/` next to the recording. It's kept out of the
+recording directory so tools that treat each subdirectory of a recording as a
+node don't mistake it for one. Each output is made once. It's made again only
+if the source frame is newer or the node's profile changed.
+"""
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import json
+import os
+import shutil
+from typing import Optional
+
+from ccline import pipeline, rotation
+
+# Added to the recording directory for the directory with the transformed
+# frames of each node.
+TRANSFORMED_SUFFIX = ".transformed"
+
+# File in each node's transformed directory holding the profile used.
+PROFILE_NAME = "transform.json"
+
+FLIPS = ["horizontal", "vertical"]
+
+
+@dataclasses.dataclass(frozen=True)
+class Transform:
+    """Corrections for the frames of one node."""
+
+    # Clockwise rotation in degrees, one of rotation.ANGLES, or None.
+    rotate: Optional[str] = None
+    # "horizontal" or "vertical", or None.
+    flip: Optional[str] = None
+    # (x, y, width, height) to keep, or None for the whole frame.
+    crop: Optional[tuple[int, int, int, int]] = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Transform":
+        unknown = set(config) - {"rotate", "flip", "crop"}
+        if unknown:
+            raise ValueError(f"Unknown transform settings {sorted(unknown)}")
+        rotate = config.get("rotate")
+        if rotate is not None:
+            rotate = str(rotate)
+            if rotate not in rotation.ANGLES:
+                raise ValueError(f"Rotation must be one of {rotation.ANGLES}")
+        flip = config.get("flip")
+        if flip is not None and flip not in FLIPS:
+            raise ValueError(f"Flip must be one of {FLIPS}")
+        crop = config.get("crop")
+        if crop is not None:
+            crop = tuple(int(v) for v in crop)
+            if len(crop) != 4:
+                raise ValueError("Crop must be [x, y, width, height]")
+        return cls(rotate=rotate, flip=flip, crop=crop)
+
+    def to_config(self) -> dict:
+        """The profile as it's written in gin and in PROFILE_NAME."""
+        config: dict = {}
+        if self.rotate is not None:
+            config["rotate"] = self.rotate
+        if self.flip is not None:
+            config["flip"] = self.flip
+        if self.crop is not None:
+            config["crop"] = list(self.crop)
+        return config
+
+
+def apply(job: pipeline.Job, transform: Transform) -> None:
+    """Transforms one frame. Runs in a worker process."""
+    destination = pipeline.temporary_path(job.destination)
+    if transform.flip is None and transform.crop is None and shutil.which("jpegtran"):
+        if transform.rotate is None:
+            shutil.copyfile(job.source, destination)
+        else:
+            rotation.rotate_jpegtran(job.source, destination, transform.rotate)
+    else:
+        _apply_opencv(job.source, destination, transform)
+    os.replace(destination, job.destination)
+
+
+def _apply_opencv(source: str, destination: str, transform: Transform) -> None:
+    # OpenCV is only needed on the workstation.
+    import cv2
+
+    image = cv2.imread(source)
+    if image is None:
+        raise ValueError(f"Can't read {source}")
+    if transform.crop is not None:
+        x, y, width, height = transform.crop
+        image = image[y : y + height, x : x + width]
+    if transform.flip is not None:
+        image = cv2.flip(image, 1 if transform.flip == "horizontal" else 0)
+    if transform.rotate is not None:
+        cv2_rotations = {
+            "90": cv2.ROTATE_90_CLOCKWISE,
+            "180": cv2.ROTATE_180,
+            "270": cv2.ROTATE_90_COUNTERCLOCKWISE,
+        }
+        image = cv2.rotate(image, cv2_rotations[transform.rotate])
+    if not cv2.imwrite(destination, image):
+        raise ValueError(f"Can't write {destination}")
+
+
+class Transformer:
+    """Transforms frames in worker processes as they arrive."""
+
+    def __init__(
+        self,
+        name_to_transform: dict[str, Transform],
+        executor: Optional[concurrent.futures.Executor] = None,
+    ):
+        """Transforms frames in worker processes as they arrive.
+
+        Args:
+          name_to_transform: Profile of each node. Frames from other nodes are
+            left alone.
+          executor: Runs the transforms. Defaults to a process per core.
+        """
+        self.name_to_transform = name_to_transform
+        self.executor_ = executor
+        # Transforms still running.
+        self.futures_: set[asyncio.Future] = set()
+        # Node directories whose profile has been checked.
+        self.checked_: set[str] = set()
+        self.submitted_: set[str] = set()
+        self.transformed = 0
+
+    def destination_dir(self, recording_dir: str, node: str) -> str:
+        return os.path.join(os.path.normpath(recording_dir) + TRANSFORMED_SUFFIX, node)
+
+    def submit(self, recording_dir: str, node: str, source: str) -> None:
+        """Transforms `source` in the background unless it's done already."""
+        transform = self.name_to_transform.get(node)
+        if transform is None or source in self.submitted_:
+            return
+        if not source.lower().endswith(".jpg"):
+            # Sidecars and other files that aren't frames.
+            return
+        directory = self.destination_dir(recording_dir, node)
+        if directory not in self.checked_:
+            self.check_profile(directory, transform)
+            self.checked_.add(directory)
+        job = pipeline.Job(source, os.path.join(directory, os.path.basename(source)))
+        if pipeline.is_done(job):
+            return
+        if self.executor_ is None:
+            self.executor_ = concurrent.futures.ProcessPoolExecutor()
+        self.submitted_.add(source)
+        future = asyncio.get_running_loop().run_in_executor(
+            self.executor_, apply, job, transform
+        )
+        self.futures_.add(future)
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future: asyncio.Future) -> None:
+        self.futures_.discard(future)
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print(f"Transform failed: {future.exception()}")
+        else:
+            self.transformed += 1
+
+    def check_profile(self, directory: str, transform: Transform) -> None:
+        """Discards earlier outputs made with a different profile."""
+        os.makedirs(directory, exist_ok=True)
+        profile_path = os.path.join(directory, PROFILE_NAME)
+        if os.path.exists(profile_path):
+            with open(profile_path) as f:
+                if json.load(f) == transform.to_config():
+                    return
+            print(f"Transform for {directory} changed, redoing it")
+            for name in os.listdir(directory):
+                if name != PROFILE_NAME:
+                    os.remove(os.path.join(directory, name))
+        with open(profile_path, "w") as f:
+            json.dump(transform.to_config(), f)
+
+    async def wait(self) -> None:
+        """Waits for every submitted transform to finish."""
+        await asyncio.gather(*self.futures_, return_exceptions=True)
+
+    def close(self) -> None:
+        if self.executor_ is not None:
+            self.executor_.shutdown()
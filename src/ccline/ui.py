@@ -13,23 +13,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import asyncio
 import datetime
 import threading
 import time
 from dataclasses import dataclass
-from pathlib import Path
 from typing import Callable, Dict, List, Optional
 
 import ui_oled_bonnet
 from absl import app, flags
 from adafruit_debouncer import Debouncer
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageFont
 from sshkeyboard import listen_keyboard
 
-from ccline import client
+from ccline import ccline_pb2, client
 from ccline.config import read_config, timestamp_stub
 from ccline.resolver import Resolver
+from ccline.ui_events import RUNNING, ActionRunner, PolledStat, UiLoop, poll_buttons
+from ccline.ui_render import OledRenderer
 
 FLAGS = flags.FLAGS
 
@@ -47,21 +47,20 @@ FLAGS = flags.FLAGS
 # row may immediately update to show the info.
 
 
-def do_hat_button_queue(queue: List[str], buttons: Dict):
+def do_hat_button_queue(loop: UiLoop, buttons: Dict):
     """The dict buttons has string names as a key for each button which is a
     DigitalInOut
     """
     switches = {n: Debouncer(b) for n, b in buttons.items()}
-    while True:
-        for name, switch in switches.items():
-            switch.update()
-            if switch.rose:
-                queue.append(name)
+    try:
+        poll_buttons(switches, loop.put, loop.stopped)
+    finally:
+        loop.stop()
 
 
-def do_keyboard_queue(queue: List[str]):
+def do_keyboard_queue(loop: UiLoop):
     def press(key):
-        queue.append(key)
+        loop.put(key)
 
     def release(key):
         pass
@@ -70,6 +69,8 @@ def do_keyboard_queue(queue: List[str]):
         on_press=press,
         on_release=release,
     )
+    # The UI ends with the keyboard listener.
+    loop.stop()
 
 
 class FakeDisplay:
@@ -165,10 +166,6 @@ class UiAction:
     statistic: Optional[Callable]
 
 
-def now_ms():
-    return time.monotonic_ns() // 1_000_000
-
-
 class Ui:
 
     def __init__(self):
@@ -182,8 +179,14 @@ class Ui:
         self.width_ = 128
         self.height_ = 64
         self.refresh_pause_ms_ = 200
-        self.next_refresh_ms_ = now_ms()
-        self.active_recording_ = ""
+        # Actions talk to the array in the background so the display keeps
+        # refreshing. The client keeps its channel to the coordinator open.
+        read_config()
+        self.runner_ = ActionRunner()
+        self.client_ = client.CoordinatorClient(Resolver())
+        self.runner_.submit("connect", self.connect)
+        # Frame counts of every node, from the coordinator.
+        self.array_status_ = PolledStat(self.runner_, self.get_array_status)
 
         c = self.ccline_client_
         self.actions_ = [
@@ -208,23 +211,37 @@ class Ui:
         )
         self.height_ = self.display_.height
         self.width_ = self.display_.width
+        # Text of each row for the next refresh.
+        self.rows_: List[str] = []
+        self.renderer_ = OledRenderer(self.display_, self.font_, self.padding_)
 
     def active(self):
         # TODO: Detect connected display or read a config value.
         return True
 
+    async def get_array_status(self) -> ccline_pb2.ArrayStatus:
+        return await self.client_.call(
+            "GetArrayStatus", ccline_pb2.ArrayStatusRequest()
+        )
+
     def get_current_count(self):
-        if self.active_recording_ == "":
+        status = self.array_status_.get()
+        if status is None:
+            return "frames: ?" if self.array_status_.error else "frames: ..."
+        recording = [
+            s
+            for s in status.node_statuses
+            if s.state == ccline_pb2.NodeStatus.RECORDING
+        ]
+        if not recording:
             return " Stopped "
-        r = Path(f"/home/pi/data/{self.active_recording_}")
-        count = len([x for x in r.iterdir() if x.suffix == ".jpg"])
-        return f"frames: {count}"
+        frames = sum(s.frame_count for s in recording)
+        return f"frames: {frames} on {len(recording)}"
 
     def draw_text(self, row, text):
-        x = self.padding_
-        top = self.padding_ + row * 20
-        # print(f'text line {row}/{x},{top}: {text}')
-        self.draw_.text((x, top), text, font=self.font_, outline=255, fill=1)
+        while len(self.rows_) <= row:
+            self.rows_.append("")
+        self.rows_[row] = text
 
     def write_action(self):
         self.draw_text(0, self.actions_[self.selected_action_idx_].name)
@@ -235,49 +252,66 @@ class Ui:
         #  Frame count, video length, etc - config in CliRunner
         #  IP addresses, hostname
         #  Peers online
-        stat_updater = self.actions_[self.selected_action_idx_].statistic
+        action = self.actions_[self.selected_action_idx_]
+        stat_updater = action.statistic
         text = ""
-        if stat_updater:
+        status = self.runner_.status(action.name)
+        if status is not None:
+            text = "..." if status.state == RUNNING else status.message
+            text = f"{status.state}: {text}"
+        elif stat_updater:
             text = stat_updater()
         self.draw_text(1, text)
 
     def refresh_all(self):
-        self.image_ = Image.new("1", (self.width_, self.height_))
-        self.draw_ = ImageDraw.Draw(self.image_)
+        self.rows_ = []
         self.write_action()
         self.write_stats()
-        self.display_.image(self.image_)
-        self.display_.show()
+        # Only draws and sends what changed since the last refresh, so this
+        # is nearly free when the display is idle.
+        self.renderer_.render(self.rows_)
+
+    async def connect(self) -> str:
+        return await self.client_.connect()
 
     def start(self):
-        read_config()
-        resolver = Resolver()
-        coordinator = asyncio.run(client.find_coordinator(resolver=resolver))
-        if coordinator is None:
-            print(f"No coordinator found.")
-            return
         recording_id = f"r_{timestamp_stub()}"
-        asyncio.run(client.start_collecting(coordinator, resolver, recording_id))
-        self.active_recording_ = recording_id
+
+        async def start() -> str:
+            reply = await self.client_.call(
+                "StartCollecting",
+                ccline_pb2.StartCollectingRequest(recording_id=recording_id),
+            )
+            client.print_node_results(reply.node_results)
+            if reply.result != ccline_pb2.StartCollectingReply.OK:
+                raise RuntimeError(reply.message)
+            return recording_id
+
+        self.runner_.submit("start", start)
 
     def stop(self):
-        read_config()
-        resolver = Resolver()
-        coordinator = asyncio.run(client.find_coordinator(resolver=resolver))
-        if coordinator is None:
-            print(f"No coordinator found.")
-            return
-        asyncio.run(client.stop_collecting(coordinator, resolver))
-        self.active_recording_ = ""
+        async def stop() -> str:
+            reply = await self.client_.call(
+                "StopAllCollects", ccline_pb2.StopAllCollectsRequest()
+            )
+            client.print_node_results(reply.node_results)
+            return reply.message
+
+        self.runner_.submit("stop", stop)
 
     def shutdown(self):
-        read_config()
-        resolver = Resolver()
-        coordinator = asyncio.run(client.find_coordinator(resolver=resolver))
-        if coordinator is None:
-            print(f"No coordinator found.")
-            return
-        asyncio.run(client.shutdown(coordinator, resolver))
+        async def shutdown() -> str:
+            reply = await self.client_.call(
+                "ShutdownCluster",
+                ccline_pb2.ShutdownClusterRequest(),
+                client.SHUTDOWN_CLUSTER_TIMEOUT_S,
+            )
+            client.print_node_results(reply.node_results)
+            if reply.result != ccline_pb2.ShutdownClusterReply.OK:
+                raise RuntimeError(reply.message)
+            return f"off in {reply.power_off_s:.0f} s"
+
+        self.runner_.submit("shutdown", shutdown)
 
     def select_next_action(self):
         self.selected_action_idx_ = self.selected_action_idx_ + 1
@@ -306,38 +340,36 @@ class Ui:
             action.right_runnable()
         if input == "a" and action.runnable:
             action.runnable()
-        # TODO: No way to know if the stats line needs updating
+        # Any input may change the stats line. Refreshing costs nothing if it
+        # didn't.
         self.refresh_all()
 
     def run(self):
-        queue: List[str] = []
+        # Sleeps between inputs and refreshes instead of spinning, which would
+        # take a core from the capture.
+        loop = UiLoop(
+            self.handle_input, self.refresh_all, self.refresh_pause_ms_ / 1000
+        )
         use_fake = False
         update_thread = None
         if use_fake:
-            update_thread = threading.Thread(target=do_keyboard_queue, args=[queue])
+            update_thread = threading.Thread(
+                target=do_keyboard_queue, args=[loop], daemon=True
+            )
         else:
             update_thread = threading.Thread(
                 target=do_hat_button_queue,
-                args=[queue, self.display_hat_.get_buttons()],
+                args=[loop, self.display_hat_.get_buttons()],
+                daemon=True,
             )
+        self.runner_.on_change = loop.refresh_soon
         update_thread.start()
-        done = False
-        while update_thread.is_alive() and not done:
-            if len(queue):
-                self.handle_input(queue.pop(0))
-            # TODO: There should be a way to sleep here without disrupting anything.
-            if self.next_refresh_ms_ < now_ms():
-                # update_start = now_ms()
-                self.next_refresh_ms_ = self.next_refresh_ms_ + self.refresh_pause_ms_
-                self.refresh_all()
-                # update_end = now_ms()
-                # print(f'update time {update_end - update_start}')
-                n = now_ms()
-                if self.next_refresh_ms_ < n:
-                    print(
-                        f"Failed to keep up with frame rate {self.next_refresh_ms_} < {n} by {n - self.next_refresh_ms_}"
-                    )
-        update_thread.join()
+        try:
+            loop.run()
+        finally:
+            loop.stop()
+            self.runner_.run(self.client_.close())
+            self.runner_.close()
 
 
 def main(argv):
@@ -0,0 +1,302 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Event loop for the hardware UI.
+
+The UI runs on the nodes next to libcamera-vid and the ccline server, so it
+mustn't take a core to itself. The loop sleeps on a queue until an input
+arrives or the display is due a refresh, and the buttons are sampled at a
+fixed rate rather than as fast as possible. GPIO reads through digitalio have
+no edge interrupts, but a press lasts far longer than the polling interval.
+
+Actions that talk to the array run on a separate, persistent asyncio loop so
+a slow network doesn't freeze the display or drop button presses. The display
+shows each action as running, done or failed. Stats from the array are
+requested on the same loop and the display shows the latest reply.
+
+Kept free of display and GPIO libraries so it can be tested and benchmarked
+away from the hardware. See scripts/bench_ui.py.
+"""
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import queue
+import threading
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Mapping, Optional
+
+# Interval between button samples. Matches the Debouncer's default interval.
+BUTTON_POLL_S = 0.01
+
+# Idle CPU use the UI should stay under, as a fraction of one core.
+IDLE_CPU_BUDGET = 0.02
+
+# How long the result of an action stays on the display.
+RESULT_SHOWN_S = 5.0
+
+# Time between requests for a stat from the array while it's displayed.
+STAT_POLL_S = 1.0
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def poll_buttons(
+    switches: Mapping[str, Any],
+    put: Callable[[str], None],
+    stop: threading.Event,
+    interval_s: float = BUTTON_POLL_S,
+) -> None:
+    """Samples the buttons every `interval_s`, passing presses to `put`.
+
+    Runs until `stop` is set, so run it in its own thread.
+
+    Args:
+      switches: Debounced button of each input name, with update() and rose
+        like adafruit_debouncer.Debouncer.
+      put: Called with the name of each button that was pressed.
+      stop: Ends polling once set.
+      interval_s: Time between samples.
+    """
+    next_s = time.monotonic()
+    while not stop.is_set():
+        for name, switch in switches.items():
+            switch.update()
+            if switch.rose:
+                put(name)
+        next_s += interval_s
+        # Waiting on the event sleeps without holding the GIL.
+        delay_s = next_s - time.monotonic()
+        if delay_s < 0:
+            next_s = time.monotonic()
+        else:
+            stop.wait(delay_s)
+
+
+class UiLoop:
+    """Handles UI inputs as they arrive and refreshes the display on time."""
+
+    def __init__(
+        self,
+        handle_input: Callable[[str], None],
+        refresh: Callable[[], None],
+        refresh_s: float = 0.2,
+    ):
+        """Handles UI inputs as they arrive and refreshes the display on time.
+
+        Args:
+          handle_input: Called in the loop's thread with each input.
+          refresh: Called in the loop's thread every `refresh_s`.
+          refresh_s: Time between refreshes.
+        """
+        self.handle_input = handle_input
+        self.refresh = refresh
+        self.refresh_s = refresh_s
+        self.inputs_: queue.Queue[Optional[str]] = queue.Queue()
+        # Set once stop() is called. Also ends poll_buttons.
+        self.stopped = threading.Event()
+        # Refreshes that started after the next one was due.
+        self.late_refreshes = 0
+
+    def put(self, name: str) -> None:
+        """Queues an input. Safe to call from any thread."""
+        self.inputs_.put(name)
+
+    def stop(self) -> None:
+        """Ends run() once the current input or refresh is finished."""
+        self.stopped.set()
+        # Wakes the loop if it's waiting for input.
+        self.inputs_.put(None)
+
+    def refresh_soon(self) -> None:
+        """Refreshes without waiting for the next one to be due.
+
+        Safe to call from any thread.
+        """
+        self.inputs_.put(None)
+
+    def run(self) -> None:
+        """Runs until stop() is called."""
+        next_refresh_s = time.monotonic()
+        while not self.stopped.is_set():
+            wait_s = next_refresh_s - time.monotonic()
+            if wait_s > 0:
+                try:
+                    name = self.inputs_.get(timeout=wait_s)
+                except queue.Empty:
+                    pass
+                else:
+                    if name is None:
+                        next_refresh_s = time.monotonic()
+                    else:
+                        self.handle_input(name)
+                    continue
+            self.refresh()
+            next_refresh_s += self.refresh_s
+            now_s = time.monotonic()
+            if next_refresh_s < now_s:
+                self.late_refreshes += 1
+                print(
+                    f"Failed to keep up with refresh rate, late by"
+                    f" {(now_s - next_refresh_s) * 1000:.0f} ms"
+                )
+                # Skip the missed refreshes rather than running them back to
+                # back.
+                next_refresh_s = now_s + self.refresh_s
+
+
+@dataclasses.dataclass
+class ActionStatus:
+    """How the most recent run of an action went."""
+
+    state: str = RUNNING
+    # Result or error to show on the display.
+    message: str = ""
+    # Monotonic time the action finished, 0 while running.
+    finished_s: float = 0.0
+
+
+class ActionRunner:
+    """Runs UI actions on a background event loop.
+
+    The loop lives as long as the runner so clients created on it, and their
+    open channels, are reused by later actions.
+    """
+
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
+        """Runs UI actions on a background event loop.
+
+        Args:
+          on_change: Called from the loop's thread when an action starts or
+            finishes, e.g. UiLoop.refresh_soon.
+        """
+        self.on_change = on_change
+        self.loop_ = asyncio.new_event_loop()
+        self.thread_ = threading.Thread(target=self.loop_.run_forever, daemon=True)
+        self.thread_.start()
+        self.statuses_: dict[str, ActionStatus] = {}
+
+    def submit(self, name: str, action: Callable[[], Awaitable[str]]) -> bool:
+        """Starts `action` in the background unless it's already running.
+
+        Args:
+          name: Name of the action, shown on the display.
+          action: Coroutine function returning a message for the display.
+            Exceptions it raises mark the action failed.
+
+        Returns: False if the action was already running.
+        """
+        status = self.statuses_.get(name)
+        if status is not None and status.state == RUNNING:
+            return False
+        self.statuses_[name] = ActionStatus()
+        asyncio.run_coroutine_threadsafe(self._run(name, action), self.loop_)
+        return True
+
+    async def _run(self, name: str, action: Callable[[], Awaitable[str]]) -> None:
+        status = self.statuses_[name]
+        self._changed()
+        try:
+            message = await action()
+            state = DONE
+        except Exception as e:
+            print(f"Action {name} failed: {e!r}")
+            message = str(e) or type(e).__name__
+            state = FAILED
+        status.message = message
+        status.finished_s = time.monotonic()
+        # Last, as the UI thread reads the status without a lock.
+        status.state = state
+        self._changed()
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change()
+
+    def status(self, name: str) -> Optional[ActionStatus]:
+        """Status of the action while it runs and for a while after."""
+        status = self.statuses_.get(name)
+        if status is None:
+            return None
+        if status.state != RUNNING and (
+            time.monotonic() - status.finished_s > RESULT_SHOWN_S
+        ):
+            return None
+        return status
+
+    def run(self, coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Runs `coroutine` on the background loop and waits for its result."""
+        return self.spawn(coroutine).result(timeout)
+
+    def spawn(self, coroutine: Coroutine) -> concurrent.futures.Future:
+        """Starts `coroutine` on the background loop without waiting for it."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop_)
+
+    def close(self) -> None:
+        self.loop_.call_soon_threadsafe(self.loop_.stop)
+        self.thread_.join()
+        self.loop_.close()
+
+
+class PolledStat:
+    """The latest reply to a request the runner repeats while it's displayed.
+
+    Reading the stat never waits for the array. Each read starts a new request
+    once the last one has finished and STAT_POLL_S has passed, so nothing is
+    requested while the stat isn't on the display.
+    """
+
+    def __init__(
+        self,
+        runner: ActionRunner,
+        request: Callable[[], Awaitable[Any]],
+        interval_s: float = STAT_POLL_S,
+    ):
+        """The latest reply to a request the runner repeats while it's displayed.
+
+        Args:
+          runner: Runs the requests.
+          request: Coroutine function returning the stat.
+          interval_s: Shortest time between the starts of two requests.
+        """
+        self.runner = runner
+        self.request = request
+        self.interval_s = interval_s
+        # Latest reply, None until the first one.
+        self.value: Any = None
+        # Why the latest request failed, empty if it didn't.
+        self.error = ""
+        self.pending_: Optional[concurrent.futures.Future] = None
+        self.requested_s_: Optional[float] = None
+
+    def get(self) -> Any:
+        """The latest reply, requesting a new one if it's due."""
+        now_s = time.monotonic()
+        if (self.pending_ is None or self.pending_.done()) and (
+            self.requested_s_ is None or now_s - self.requested_s_ >= self.interval_s
+        ):
+            self.requested_s_ = now_s
+            self.pending_ = self.runner.spawn(self._update())
+        return self.value
+
+    async def _update(self) -> None:
+        try:
+            self.value = await self.request()
+            self.error = ""
+        except Exception as e:
+            print(f"Stat request failed: {e!r}")
+            self.error = str(e) or type(e).__name__
+        self.runner._changed()
@@ -0,0 +1,195 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Draws the UI's rows of text on an SSD1306 OLED, sending only what changed.
+
+The UI refreshes every 200 ms but its text rarely changes between refreshes.
+Drawing a new image each time, converting it a pixel at a time and sending
+the whole 1 KB frame over I2C costs CPU and bus time on a Pi that's also
+capturing. Here each row of text is drawn once and kept, a frame is only
+built when a row changes, and only the rectangle of pages and columns that
+differs from the last frame sent goes over the bus.
+
+The SSD1306 stores the screen in pages of 8 pixel rows. Each byte is one
+column of a page with the top pixel in the lowest bit.
+"""
+
+from typing import Optional, Sequence
+
+from PIL import Image, ImageDraw, ImageFont
+
+# SSD1306 commands setting the column and page range that data is written to.
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+
+# Control byte marking the rest of an I2C write as display data.
+DATA_CONTROL = 0x40
+
+# Rendered rows kept for reuse, enough for every menu item and its details.
+ROW_CACHE_SIZE = 64
+
+
+def to_pages(image: Image.Image) -> bytes:
+    """The SSD1306 frame for a 1-bit image whose height is a multiple of 8."""
+    width, height = image.size
+    pages = height // 8
+    # After flipping and transposing, each row of the image is one column of
+    # the display, with the pages in reverse order and the top pixel of each
+    # page in the lowest bit.
+    columns = (
+        image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+        .transpose(Image.Transpose.TRANSPOSE)
+        .tobytes()
+    )
+    return b"".join(columns[pages - 1 - p :: pages] for p in range(pages))
+
+
+def dirty_window(
+    old: Optional[bytes], new: bytes, width: int
+) -> Optional[tuple[int, int, int, int]]:
+    """The smallest rectangle holding every byte that differs between frames.
+
+    Args:
+      old: Frame on the display, or None if unknown.
+      new: Frame to show.
+      width: Columns in each page.
+
+    Returns: (first page, last page, first column, last column), inclusive, or
+      None if the frames are the same.
+    """
+    pages = len(new) // width
+    if old is None:
+        return 0, pages - 1, 0, width - 1
+    dirty_pages = []
+    first_column = width
+    last_column = -1
+    for page in range(pages):
+        start = page * width
+        old_page = old[start : start + width]
+        new_page = new[start : start + width]
+        if old_page == new_page:
+            continue
+        dirty_pages.append(page)
+        for column in range(width):
+            if old_page[column] != new_page[column]:
+                first_column = min(first_column, column)
+                break
+        for column in range(width - 1, -1, -1):
+            if old_page[column] != new_page[column]:
+                last_column = max(last_column, column)
+                break
+    if not dirty_pages:
+        return None
+    return dirty_pages[0], dirty_pages[-1], first_column, last_column
+
+
+class OledRenderer:
+    """Shows rows of text, sending the display only the parts that changed."""
+
+    def __init__(
+        self,
+        display,
+        font: ImageFont.ImageFont,
+        padding: int = 5,
+        row_pitch: int = 20,
+    ):
+        """Shows rows of text, sending the display only the parts that changed.
+
+        Args:
+          display: adafruit_ssd1306.SSD1306_I2C, or any display with image()
+            and show(), which is always sent the whole frame.
+          font: Font for the text.
+          padding: Space in pixels left of the text and above the first row.
+          row_pitch: Distance in pixels between the tops of the rows.
+        """
+        self.display = display
+        self.font = font
+        self.padding = padding
+        self.row_pitch = row_pitch
+        self.width = display.width
+        self.height = display.height
+        self.image_ = Image.new("1", (self.width, self.height))
+        # Text shown on each row.
+        self.rows_: list[str] = []
+        self.row_images_: dict[str, Image.Image] = {}
+        # Frame on the display, None until the first one is sent.
+        self.sent_: Optional[bytes] = None
+        # Bytes of frame data written to the display.
+        self.bytes_sent = 0
+
+    def render(self, rows: Sequence[str]) -> bool:
+        """Shows `rows` of text, one per row from the top.
+
+        Returns: True if anything was sent to the display.
+        """
+        if list(rows) == self.rows_:
+            return False
+        for row in range(max(len(rows), len(self.rows_))):
+            text = rows[row] if row < len(rows) else ""
+            old_text = self.rows_[row] if row < len(self.rows_) else ""
+            if text != old_text or self.sent_ is None:
+                top = self.padding + row * self.row_pitch
+                self.image_.paste(self.row_image(text), (0, top))
+        self.rows_ = list(rows)
+        frame = to_pages(self.image_)
+        window = dirty_window(self.sent_, frame, self.width)
+        if window is None:
+            return False
+        self.send(frame, window)
+        self.sent_ = frame
+        return True
+
+    def row_image(self, text: str) -> Image.Image:
+        """One row with `text` drawn on it, drawn once for each text."""
+        image = self.row_images_.get(text)
+        if image is not None:
+            return image
+        image = Image.new("1", (self.width, self.row_pitch))
+        ImageDraw.Draw(image).text((self.padding, 0), text, font=self.font, fill=1)
+        if len(self.row_images_) >= ROW_CACHE_SIZE:
+            # Drop the oldest.
+            del self.row_images_[next(iter(self.row_images_))]
+        self.row_images_[text] = image
+        return image
+
+    def send(self, frame: bytes, window: tuple[int, int, int, int]) -> None:
+        first_page, last_page, first_column, last_column = window
+        display = self.display
+        if (
+            not hasattr(display, "i2c_device")
+            or getattr(display, "page_addressing", False)
+            or self.width != 128
+        ):
+            # Only the default horizontal addressing on a full width display
+            # maps the window straight onto the frame.
+            display.image(self.image_)
+            display.show()
+            self.bytes_sent += len(frame)
+            return
+        for command in (
+            SET_COL_ADDR,
+            first_column,
+            last_column,
+            SET_PAGE_ADDR,
+            first_page,
+            last_page,
+        ):
+            display.write_cmd(command)
+        data = bytearray([DATA_CONTROL])
+        for page in range(first_page, last_page + 1):
+            start = page * self.width
+            data += frame[start + first_column : start + last_column + 1]
+        with display.i2c_device:
+            display.i2c_device.write(data)
+        self.bytes_sent += len(data) - 1
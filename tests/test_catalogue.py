@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import unittest
+
+from ccline import ccline_pb2
+from ccline.catalogue import Catalogue
+
+
+class TestCatalogue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "catalogue.sqlite3")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def find(self, catalogue: Catalogue, **kwargs) -> list[str]:
+        request = ccline_pb2.ListRecordingsRequest(**kwargs)
+        return [r.recording_id for r in catalogue.find(request)]
+
+    def test_records_recordings(self):
+        catalogue = Catalogue(self.path)
+        catalogue.start("r_1", ["lab"], 1_000, ["gamma1", "gamma2"])
+        catalogue.update_nodes([("r_1", "gamma1", 10, 100), ("r_1", "gamma2", 9, 90)])
+        catalogue.stop("r_1", 2_000)
+        catalogue.start("r_2", ["field", "lab"], 3_000, ["gamma1"])
+        # Not part of r_2.
+        catalogue.update_nodes([("r_2", "gamma2", 5, 50)])
+        catalogue.close()
+
+        # Kept across restarts.
+        catalogue = Catalogue(self.path)
+        recordings = catalogue.find(ccline_pb2.ListRecordingsRequest())
+        self.assertEqual([r.recording_id for r in recordings], ["r_2", "r_1"])
+        r_2, r_1 = recordings
+        self.assertEqual(list(r_2.tags), ["field", "lab"])
+        self.assertEqual(r_2.stop_time_ns, 0)
+        self.assertEqual([n.node_id for n in r_2.nodes], ["gamma1"])
+        self.assertEqual(r_1.stop_time_ns, 2_000)
+        self.assertEqual(r_1.frame_count, 19)
+        self.assertEqual(r_1.bytes_written, 190)
+        self.assertEqual(r_1.nodes[1].frame_count, 9)
+        catalogue.close()
+
+    def test_filters(self):
+        catalogue = Catalogue()
+        catalogue.start("r_1", ["lab"], 1_000, ["gamma1", "gamma2"])
+        catalogue.start("r_2", ["field", "lab"], 2_000, ["gamma1"])
+        catalogue.start("r_3", [], 3_000, ["gamma2"])
+        self.assertEqual(self.find(catalogue, tags=["lab"]), ["r_2", "r_1"])
+        self.assertEqual(self.find(catalogue, tags=["lab", "field"]), ["r_2"])
+        self.assertEqual(self.find(catalogue, node_id="gamma2"), ["r_3", "r_1"])
+        self.assertEqual(self.find(catalogue, since_ns=2_000), ["r_3", "r_2"])
+        self.assertEqual(self.find(catalogue, until_ns=2_000), ["r_1"])
+        self.assertEqual(self.find(catalogue, limit=1), ["r_3"])
+        # Starting again under the same ID carries on the same recording.
+        catalogue.stop("r_1", 1_500)
+        catalogue.start("r_1", ["redo"], 4_000, ["gamma3"])
+        (r_1,) = catalogue.find(ccline_pb2.ListRecordingsRequest(tags=["redo"]))
+        self.assertEqual(r_1.start_time_ns, 1_000)
+        self.assertEqual(r_1.stop_time_ns, 0)
+        self.assertEqual(len(r_1.nodes), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,8 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import gin
 import os
+import signal
 import unittest
 from unittest import mock
 
@@ -46,8 +48,8 @@ class TestCliRunner(unittest.TestCase):
         self.assertEqual(address, "oops; ls * some address")
 
     @mock.patch("os.makedirs")
-    @mock.patch("subprocess.Popen")
-    def test_live_sample(self, mock_popen, mock_makedirs):
+    @mock.patch("asyncio.create_subprocess_exec")
+    def test_live_sample(self, mock_exec, mock_makedirs):
         read_config(
             ["test.gin"],
             gin_bindings=[
@@ -56,16 +58,16 @@ class TestCliRunner(unittest.TestCase):
             ],
         )
         cli_runner = CliRunner()
-        process = cli_runner.run_live_sample_cmd()
+        process = asyncio.run(cli_runner.run_live_sample_cmd())
         expected_path = os.path.join("/", "gamma", "data", "nocollection/")
         mock_makedirs.assert_called_with(expected_path, exist_ok=True)
-        mock_popen.assert_called_with(
-            ["echo", "no live_sample_cmd"], env=mock.ANY, cwd=expected_path
+        mock_exec.assert_called_with(
+            "echo", "no live_sample_cmd", env=mock.ANY, cwd=expected_path
         )
 
     @mock.patch("os.makedirs")
-    @mock.patch("subprocess.Popen")
-    def test_start_collection(self, mock_popen, mock_makedirs):
+    @mock.patch("asyncio.create_subprocess_exec")
+    def test_start_collection(self, mock_exec, mock_makedirs):
         read_config(
             ["test.gin"],
             gin_bindings=[
@@ -75,13 +77,70 @@ class TestCliRunner(unittest.TestCase):
         )
         cli_runner = CliRunner()
         cli_runner.set_collection_path("leaf")
-        process = cli_runner.run_start_collection_cmd()
+        process = asyncio.run(cli_runner.run_start_collection_cmd())
         expected_path = os.path.join("/", "gamma", "data", "leaf/")
         mock_makedirs.assert_called_with(expected_path, exist_ok=True)
-        mock_popen.assert_called_with(
-            ["echo", "collect now"], env={"DISPLAY": ":0.0"}, cwd=expected_path
+        mock_exec.assert_called_with(
+            "echo", "collect now", env={"DISPLAY": ":0.0"}, cwd=expected_path
         )
 
+    def test_sensor_restart_cmd(self):
+        read_config(
+            ["test.gin"],
+            gin_bindings=[
+                "CliRunner.camera_video_cmd = ['vid', '-o', 'frame-%06d.jpg']",
+                "CliRunner.sensor_cmds = {'Imu1': ['imu', '--log', 'imu.csv']}",
+            ],
+        )
+        cli_runner = CliRunner()
+        command = cli_runner.sensor_cmd("Camera1")
+        self.assertEqual(
+            cli_runner.restart_cmd(command, 2), ["vid", "-o", "frame-2%05d.jpg"]
+        )
+        self.assertIsNone(cli_runner.sensor_cmd("Camera2"))
+        # Commands without a frame pattern are restarted as they are.
+        command = cli_runner.sensor_cmd("Imu1")
+        self.assertEqual(cli_runner.restart_cmd(command, 1), command)
+        self.assertFalse(cli_runner.can_arm("Imu1"))
+        self.assertEqual(
+            cli_runner.get_sensor_output_pattern("Camera1"), "frame-%06d.jpg"
+        )
+        self.assertIsNone(cli_runner.get_sensor_output_pattern("Imu1"))
+
+    def test_stop_collection_reaps_process(self):
+        read_config(["test.gin"], gin_bindings=[])
+        cli_runner = CliRunner()
+
+        async def run():
+            process = await asyncio.create_subprocess_exec("sleep", "10")
+            await cli_runner.stop_collection_cmd(process)
+            return process
+
+        process = asyncio.run(run())
+        self.assertIsNotNone(process.returncode)
+        self.assertEqual(cli_runner.collection_path_, "nocollection")
+
+    def test_stop_collection_escalates(self):
+        read_config(["test.gin"], gin_bindings=["CliRunner.stop_timeout_s = 0.2"])
+        cli_runner = CliRunner()
+
+        async def run():
+            # Asked to stop with SIGINT.
+            process = await asyncio.create_subprocess_exec("sleep", "10")
+            stopped = await cli_runner.stop_collection_cmd(process)
+            self.assertTrue(stopped)
+            self.assertEqual(process.returncode, -signal.SIGINT)
+            # Ignores SIGINT so it's killed.
+            process = await asyncio.create_subprocess_exec(
+                "sh", "-c", "trap '' INT; exec sleep 10"
+            )
+            await asyncio.sleep(0.1)
+            stopped = await cli_runner.stop_collection_cmd(process)
+            self.assertFalse(stopped)
+            self.assertEqual(process.returncode, -signal.SIGKILL)
+
+        asyncio.run(run())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import gin
+import grpc
+
+from ccline import ccline_pb2, client
+from ccline.client import CoordinatorCache
+from ccline.resolver import Resolver
+
+
+def read_config(gin_configs: list[str], gin_bindings: list[str]):
+    gin.clear_config()
+    gin.parse_config_files_and_bindings(
+        [os.path.join(os.getcwd(), "tests", "config", c) for c in gin_configs],
+        gin_bindings,
+        skip_unknown=True,
+    )
+
+
+async def fake_ask_goose(candidate, resolver):
+    # name1 is powered off and never answers.
+    if candidate == "name1":
+        await asyncio.sleep(10)
+    return "Goose!" if candidate == "name2" else "Duck!"
+
+
+class TestClient(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        cache_path = os.path.join(self.tmp_dir.name, "coordinator.json")
+        read_config(["test.gin"], [f"CoordinatorCache.path = '{cache_path}'"])
+        CoordinatorCache.memory_.clear()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @mock.patch("ccline.client.ask_goose", side_effect=fake_ask_goose)
+    def test_find_coordinator(self, mock_ask):
+        resolver = Resolver()
+        coordinator = asyncio.run(
+            asyncio.wait_for(client.find_coordinator(resolver), timeout=1)
+        )
+        self.assertEqual(coordinator, "name2")
+        self.assertEqual(mock_ask.call_count, 2)
+        # Found in memory, then on disk after the process forgets it.
+        self.assertEqual(asyncio.run(client.find_coordinator(resolver)), "name2")
+        CoordinatorCache.memory_.clear()
+        self.assertEqual(asyncio.run(client.find_coordinator(resolver)), "name2")
+        self.assertEqual(mock_ask.call_count, 2)
+
+    @mock.patch("ccline.client.ask_goose", side_effect=fake_ask_goose)
+    def test_stale_coordinator(self, mock_ask):
+        resolver = Resolver()
+        CoordinatorCache().put(resolver, "name1")
+        used = []
+
+        async def command(coordinator, resolver):
+            used.append(coordinator)
+            if coordinator == "name1":
+                raise grpc.aio.AioRpcError(
+                    grpc.StatusCode.UNAVAILABLE,
+                    grpc.aio.Metadata(),
+                    grpc.aio.Metadata(),
+                )
+
+        async def run():
+            return await asyncio.wait_for(
+                client.run_on_coordinator(resolver, command), timeout=1
+            )
+
+        self.assertTrue(asyncio.run(run()))
+        self.assertEqual(used, ["name1", "name2"])
+        self.assertEqual(CoordinatorCache().get(resolver), "name2")
+
+    @mock.patch("ccline.ccline_pb2_grpc.CoordinatorStub")
+    @mock.patch("ccline.client.ask_goose", side_effect=fake_ask_goose)
+    def test_coordinator_client(self, mock_ask, mock_stub):
+        stale = grpc.aio.AioRpcError(
+            grpc.StatusCode.UNAVAILABLE, grpc.aio.Metadata(), grpc.aio.Metadata()
+        )
+        reply = ccline_pb2.StopAllCollectsReply(message="stopped")
+        mock_stub.return_value.StopAllCollects = mock.AsyncMock(
+            side_effect=[reply, stale, reply]
+        )
+        CoordinatorCache().put(Resolver(), "name1")
+
+        async def run():
+            coordinator_client = client.CoordinatorClient(Resolver())
+            request = ccline_pb2.StopAllCollectsRequest()
+            replies = [
+                await coordinator_client.call("StopAllCollects", request),
+                await coordinator_client.call("StopAllCollects", request),
+            ]
+            stats = coordinator_client.channel_pool_.stats()
+            await coordinator_client.close()
+            return coordinator_client.coordinator_, replies, stats
+
+        coordinator, replies, stats = asyncio.run(asyncio.wait_for(run(), timeout=1))
+        self.assertEqual([r.message for r in replies], ["stopped", "stopped"])
+        # The channel to the cached coordinator was reused until it failed.
+        self.assertEqual(stats["name1"].connects, 1)
+        self.assertEqual(stats["name1"].failures, 1)
+        self.assertEqual(coordinator, "name2")
+        self.assertEqual(CoordinatorCache().get(Resolver()), "name2")
+
+
+if __name__ == "__main__":
+    unittest.main()
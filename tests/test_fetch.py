@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import gin
+import grpc
+
+from ccline import ccline_pb2, ccline_pb2_grpc, fetch
+from ccline.fetch import Manifest, fetch_recording, receive_recording
+from ccline.resolver import Resolver
+from ccline.server import Node
+from ccline.transfer import CHUNK_SIZE
+
+
+class TestFetch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.node_dir = os.path.join(self.tmp_dir.name, "node")
+        self.jot_dir = os.path.join(self.tmp_dir.name, "jot")
+        os.makedirs(os.path.join(self.node_dir, "r_test"))
+        self.files = {
+            "frame-000000.jpg": b"a" * (CHUNK_SIZE * 2 + 10),
+            "frame-000001.jpg": b"b" * 100,
+        }
+        for name, data in self.files.items():
+            with open(os.path.join(self.node_dir, "r_test", name), "wb") as f:
+                f.write(data)
+        gin.clear_config()
+        gin.parse_config_files_and_bindings(
+            [os.path.join(os.getcwd(), "tests", "config", "test.gin")],
+            [f"CliRunner.base_collection_path = '{self.node_dir}'"],
+            skip_unknown=True,
+        )
+        self.node = Node("name1", "name1")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def fetch(self, stop_after_chunks=None):
+        """Fetches r_test from the node, optionally failing part way."""
+        directory = os.path.join(self.jot_dir, "name1")
+        request = ccline_pb2.FetchRecordingRequest(recording_id="r_test")
+        if os.path.isdir(directory):
+            request.have_bytes.update(Manifest(directory).have_bytes())
+
+        async def chunks():
+            sent = 0
+            async for chunk in self.node.FetchRecording(request, mock.MagicMock()):
+                if sent == stop_after_chunks:
+                    raise ConnectionError("Interrupted")
+                sent += 1
+                yield chunk
+
+        return asyncio.run(receive_recording(chunks(), directory))
+
+    def test_resumes_and_skips_received_files(self):
+        with self.assertRaises(ConnectionError):
+            self.fetch(stop_after_chunks=1)
+        directory = os.path.join(self.jot_dir, "name1")
+        self.assertEqual(
+            os.path.getsize(os.path.join(directory, "frame-000000.jpg.part")),
+            CHUNK_SIZE,
+        )
+        summary = self.fetch()
+        # Only the rest of the first file is sent again.
+        self.assertEqual(summary.files, 2)
+        self.assertEqual(summary.bytes, sum(map(len, self.files.values())) - CHUNK_SIZE)
+        manifest = Manifest(directory)
+        for name, data in self.files.items():
+            with open(os.path.join(directory, name), "rb") as f:
+                self.assertEqual(f.read(), data)
+            self.assertEqual(
+                manifest.files[name]["sha256"], hashlib.sha256(data).hexdigest()
+            )
+        summary = self.fetch()
+        self.assertEqual(summary.files, 0)
+        self.assertEqual(summary.bytes, 0)
+
+    def test_empty_files(self):
+        open(os.path.join(self.node_dir, "r_test", "frames.csv"), "wb").close()
+        summary = self.fetch()
+        self.assertEqual(summary.files, 3)
+        directory = os.path.join(self.jot_dir, "name1")
+        self.assertEqual(os.path.getsize(os.path.join(directory, "frames.csv")), 0)
+        self.assertEqual(
+            Manifest(directory).files["frames.csv"],
+            {"size": 0, "sha256": hashlib.sha256(b"").hexdigest()},
+        )
+        # Received already.
+        self.assertEqual(self.fetch().files, 0)
+
+    def test_damaged_resume_is_fetched_again(self):
+        with self.assertRaises(ConnectionError):
+            self.fetch(stop_after_chunks=1)
+        directory = os.path.join(self.jot_dir, "name1")
+        partial_path = os.path.join(directory, "frame-000000.jpg.part")
+        # Damaged without changing its size, so the resume can't tell.
+        with open(partial_path, "r+b") as f:
+            f.write(b"x")
+        summary = self.fetch()
+        self.assertEqual(summary.mismatched, ["frame-000000.jpg"])
+        self.assertEqual(summary.files, 1)
+        self.assertFalse(os.path.exists(os.path.join(directory, "frame-000000.jpg")))
+        self.assertNotIn("frame-000000.jpg", Manifest(directory).files)
+        summary = self.fetch()
+        self.assertEqual(summary.mismatched, [])
+        self.assertEqual(summary.files, 1)
+        with open(os.path.join(directory, "frame-000000.jpg"), "rb") as f:
+            self.assertEqual(f.read(), self.files["frame-000000.jpg"])
+
+    def test_node_that_never_matches_fails_alone(self):
+        file_sha256 = fetch.file_sha256
+
+        def check(path):
+            # Everything from "bad" arrives damaged.
+            if os.path.join("jot", "bad") in path:
+                return "0" * 64
+            return file_sha256(path)
+
+        async def run():
+            server = grpc.aio.server()
+            ccline_pb2_grpc.add_NodeServicer_to_server(self.node, server)
+            port = str(server.add_insecure_port("127.0.0.1:0"))
+            await server.start()
+            resolver = Resolver(
+                name_to_ip={"good": "127.0.0.1", "bad": "127.0.0.1"},
+                name_to_port={"good": port, "bad": port},
+            )
+            try:
+                with mock.patch("ccline.fetch.file_sha256", side_effect=check):
+                    return await fetch_recording(resolver, "r_test", self.jot_dir)
+            finally:
+                await server.stop(None)
+
+        good, bad = asyncio.run(run())
+        self.assertEqual(good.status, ccline_pb2.NodeResult.OK)
+        self.assertEqual(good.response.files, 2)
+        self.assertEqual(bad.status, ccline_pb2.NodeResult.ERROR)
+        self.assertIn("don't match", bad.message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from ccline.frame_index import FrameIndex, run_pattern
+
+
+class TestFrameIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_frame(self, index: int, size: int):
+        with open(os.path.join(self.directory, f"frame-{index:06d}.jpg"), "wb") as f:
+            f.write(b"x" * size)
+
+    def test_counts_incrementally(self):
+        frame_index = FrameIndex(self.directory)
+        self.assertEqual(frame_index.refresh(), 0)
+        self.assertIsNone(frame_index.latest_complete())
+        self.write_frame(0, 10)
+        self.write_frame(1, 20)
+        self.assertEqual(frame_index.refresh(), 2)
+        self.assertEqual(frame_index.frame_count, 2)
+        self.assertEqual(frame_index.bytes_written, 30)
+        self.assertGreater(frame_index.last_frame_time_ns, 0)
+        # The newest frame may still be being written.
+        self.assertEqual(
+            frame_index.latest_complete(),
+            os.path.join(self.directory, "frame-000000.jpg"),
+        )
+        # The newest frame grew.
+        self.write_frame(1, 25)
+        self.assertEqual(frame_index.refresh(), 0)
+        self.assertEqual(frame_index.bytes_written, 35)
+        self.write_frame(2, 5)
+        self.assertEqual(frame_index.refresh(), 1)
+        self.assertEqual(frame_index.frame_count, 3)
+        self.assertEqual(frame_index.bytes_written, 40)
+
+    def test_refresh_does_not_list_directory(self):
+        for i in range(1, 100):
+            self.write_frame(i, 1)
+        frame_index = FrameIndex(self.directory)
+        frame_index.refresh()
+        self.assertEqual(frame_index.frame_count, 99)
+        with mock.patch("os.listdir") as mock_listdir, mock.patch(
+            "os.scandir"
+        ) as mock_scandir:
+            self.write_frame(100, 1)
+            self.assertEqual(frame_index.refresh(), 1)
+            mock_listdir.assert_not_called()
+            mock_scandir.assert_not_called()
+        self.assertEqual(frame_index.frame_count, 100)
+
+    def test_rates(self):
+        frame_index = FrameIndex(self.directory)
+        with mock.patch("time.monotonic", return_value=100.0):
+            frame_index.refresh()
+        self.assertEqual(frame_index.rates(), (0.0, 0.0))
+        for i in range(4):
+            self.write_frame(i, 10)
+        with mock.patch("time.monotonic", return_value=102.0):
+            frame_index.refresh()
+        self.assertEqual(frame_index.rates(), (2.0, 20.0))
+
+    def test_follows_restarted_runs(self):
+        self.assertEqual(run_pattern("frame-%06d.jpg", 1), "frame-1%05d.jpg")
+        self.assertEqual(run_pattern("frame-%06d.jpg", 0), "frame-%06d.jpg")
+        frame_index = FrameIndex(self.directory)
+        completed = []
+        frame_index.on_complete = lambda path, stat: completed.append(path)
+        for i in range(3):
+            self.write_frame(i, 10)
+        self.assertEqual(frame_index.refresh(), 3)
+        # The collection command restarted, saving frames from 100000.
+        self.write_frame(100000, 10)
+        self.write_frame(100001, 10)
+        self.assertEqual(frame_index.refresh(), 2)
+        self.assertEqual(frame_index.frame_count, 5)
+        self.assertEqual(frame_index.bytes_written, 50)
+        self.assertEqual(frame_index.newest_index(), 100001)
+        self.assertEqual(frame_index.next_after(2), 100000)
+        self.assertEqual(frame_index.previous(100000), 2)
+        self.assertEqual(
+            completed, [frame_index.frame_path(i) for i in (0, 1, 2, 100000)]
+        )
+        self.write_frame(3, 10)
+        # Frames of the earlier run saved after the restart aren't counted.
+        self.assertEqual(frame_index.refresh(), 0)
+        self.assertEqual(frame_index.latest_complete(), frame_index.frame_path(100000))
+
+    def test_finish_after_newest_frame_removed(self):
+        frame_index = FrameIndex(self.directory)
+        completed = []
+        frame_index.on_complete = lambda path, stat: completed.append(path)
+        self.write_frame(0, 10)
+        self.write_frame(1, 10)
+        frame_index.refresh()
+        os.remove(frame_index.frame_path(1))
+        frame_index.finish()
+        self.assertEqual(completed, [frame_index.frame_path(0)])
+        self.write_frame(1, 10)
+        frame_index.finish()
+        self.assertEqual(completed, [frame_index.frame_path(i) for i in (0, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
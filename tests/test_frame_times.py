@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import unittest
+
+from ccline import ccline_pb2, frame_times
+from ccline.frame_index import FrameIndex
+from ccline.transfer import PartialFile
+
+
+class TestFrameTimes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_frame(self, index: int, time_ns: int):
+        path = os.path.join(self.directory, f"frame-{index:06d}.jpg")
+        with open(path, "wb") as f:
+            f.write(b"x" * 10)
+        os.utime(path, ns=(time_ns, time_ns))
+
+    def test_writes_completed_frames(self):
+        frame_index = FrameIndex(self.directory)
+        writer = frame_times.FrameTimesWriter(self.directory)
+        frame_index.on_complete = writer.add
+        self.write_frame(0, 1_000)
+        self.write_frame(1, 2_000)
+        frame_index.refresh()
+        self.write_frame(2, 3_000)
+        frame_index.refresh()
+        # The newest frame is only added once the collection has stopped.
+        frame_index.finish()
+        writer.close()
+        self.assertEqual(
+            list(frame_times.read_frame_times(writer.path)),
+            [
+                (1_000, "frame-000000.jpg"),
+                (2_000, "frame-000001.jpg"),
+                (3_000, "frame-000002.jpg"),
+            ],
+        )
+        self.assertEqual(frame_index.bytes_written, 30)
+
+    def test_skips_partial_lines(self):
+        path = os.path.join(self.directory, frame_times.SIDECAR_NAME)
+        with open(path, "w") as f:
+            f.write("frame,time_ns,bytes\nframe-000000.jpg,100,10\nframe-0000")
+        self.assertEqual(
+            list(frame_times.read_frame_times(path)), [(100, "frame-000000.jpg")]
+        )
+
+    def test_match_frames(self):
+        ms = 1_000_000
+        reference = [(i * 100 * ms, f"a{i}") for i in range(4)]
+        # Dropped its third frame and runs 10 ms behind.
+        behind = [(i * 100 * ms + 10 * ms, f"b{i}") for i in (0, 1, 3)]
+        # Too far from every reference frame.
+        adrift = [(50 * ms, "c0"), (250 * ms, "c1")]
+        matched = list(
+            frame_times.match_frames(
+                {"a": reference, "b": behind, "c": adrift}, "a", 20 * ms
+            )
+        )
+        self.assertEqual([t for t, _ in matched], [t for t, _ in reference])
+        self.assertEqual(
+            [frame_set for _, frame_set in matched],
+            [
+                {"a": "a0", "b": "b0", "c": None},
+                {"a": "a1", "b": "b1", "c": None},
+                {"a": "a2", "b": None, "c": None},
+                {"a": "a3", "b": "b3", "c": None},
+            ],
+        )
+
+    def test_partial_file_resumes_grown_file(self):
+        path = os.path.join(self.directory, frame_times.SIDECAR_NAME)
+        with open(path, "wb") as f:
+            f.write(b"header\n")
+        partial = PartialFile(path, resume=True)
+        partial.write(ccline_pb2.FileChunk(offset=7, data=b"line\n"))
+        partial.finish()
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"header\nline\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import grpc
+
+from ccline import ccline_pb2_grpc, fetch
+from ccline.frame_index import FrameIndex
+from ccline.offload import Offloader
+from ccline.sink import Sink
+
+
+class TestOffload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.node_dir = os.path.join(self.tmp_dir.name, "node")
+        self.sink_dir = os.path.join(self.tmp_dir.name, "sink")
+        os.makedirs(self.node_dir)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_frame(self, index: int):
+        path = os.path.join(self.node_dir, f"frame-{index:06d}.jpg")
+        with open(path, "wb") as f:
+            f.write(bytes([index]) * 1000)
+
+    async def offload(
+        self, sink_address: str, frames_during: int, missing: str = ""
+    ) -> Offloader:
+        offloader = Offloader("name1", sink_address=sink_address, poll_s=0.01)
+        if missing:
+            # As if the frame was deleted after it was found.
+            offloader.queue_.put_nowait(os.path.join(self.node_dir, missing))
+        offloader.start("r_test", FrameIndex(self.node_dir))
+        for i in range(frames_during):
+            self.write_frame(i)
+            await asyncio.sleep(0.02)
+        offloader.finish()
+        await asyncio.wait_for(offloader.wait(), 5)
+        return offloader
+
+    def test_offload_during_collection(self):
+        async def run():
+            server = grpc.aio.server()
+            ccline_pb2_grpc.add_SinkServicer_to_server(Sink(self.sink_dir), server)
+            port = server.add_insecure_port("127.0.0.1:0")
+            await server.start()
+            first = await self.offload(f"127.0.0.1:{port}", 5, "frame-999999.jpg")
+            # Everything is already on the sink so nothing is sent again.
+            second = await self.offload(f"127.0.0.1:{port}", 0)
+            await server.stop(None)
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first.uploaded_frames, 5)
+        self.assertEqual(first.uploaded_bytes, 5000)
+        self.assertEqual(second.uploaded_frames, 0)
+        received = os.path.join(self.sink_dir, "r_test", "name1")
+        for i in range(5):
+            with open(os.path.join(received, f"frame-{i:06d}.jpg"), "rb") as f:
+                self.assertEqual(f.read(), bytes([i]) * 1000)
+
+    def test_offload_every_sensor(self):
+        for i in range(3):
+            self.write_frame(i)
+            with open(os.path.join(self.node_dir, f"cam2-{i:06d}.jpg"), "wb") as f:
+                f.write(b"cam2")
+        sidecar = os.path.join(self.node_dir, "frames_Camera2.csv")
+        with open(sidecar, "w") as f:
+            f.write("frame,time_ns,bytes\n")
+
+        async def run():
+            server = grpc.aio.server()
+            ccline_pb2_grpc.add_SinkServicer_to_server(Sink(self.sink_dir), server)
+            port = server.add_insecure_port("127.0.0.1:0")
+            await server.start()
+            offloader = Offloader(
+                "name1", sink_address=f"127.0.0.1:{port}", poll_s=0.01
+            )
+            offloader.start("r_test", FrameIndex(self.node_dir))
+            offloader.add(FrameIndex(self.node_dir, "cam2-%06d.jpg"), sidecar)
+            offloader.finish()
+            await asyncio.wait_for(offloader.wait(), 5)
+            await server.stop(None)
+            return offloader
+
+        offloader = asyncio.run(run())
+        self.assertEqual(offloader.uploaded_frames, 7)
+        received = os.path.join(self.sink_dir, "r_test", "name1")
+        self.assertTrue(os.path.exists(os.path.join(received, "cam2-000002.jpg")))
+        self.assertTrue(os.path.exists(os.path.join(received, "frames_Camera2.csv")))
+
+    def test_damaged_upload_is_sent_again(self):
+        self.write_frame(0)
+        file_sha256 = fetch.file_sha256
+        # The first upload arrives damaged.
+        damaged = iter(["0" * 64])
+
+        def check(path):
+            return next(damaged, None) or file_sha256(path)
+
+        async def run():
+            server = grpc.aio.server()
+            ccline_pb2_grpc.add_SinkServicer_to_server(Sink(self.sink_dir), server)
+            port = server.add_insecure_port("127.0.0.1:0")
+            await server.start()
+            with mock.patch("ccline.fetch.file_sha256", side_effect=check):
+                offloader = await self.offload(f"127.0.0.1:{port}", 0)
+            await server.stop(None)
+            return offloader
+
+        offloader = asyncio.run(run())
+        self.assertEqual(offloader.uploaded_frames, 1)
+        received = os.path.join(self.sink_dir, "r_test", "name1", "frame-000000.jpg")
+        with open(received, "rb") as f:
+            self.assertEqual(f.read(), bytes([0]) * 1000)
+
+    def test_queue_is_bounded(self):
+        for i in range(10):
+            self.write_frame(i)
+
+        async def run():
+            # No sink is listening so nothing leaves the queue.
+            offloader = Offloader(
+                "name1", sink_address="127.0.0.1:1", queue_frames=3, poll_s=0.01
+            )
+            offloader.start("r_test", FrameIndex(self.node_dir))
+            await asyncio.sleep(0.2)
+            queued = offloader.queue_.qsize()
+            await offloader.cancel()
+            return queued
+
+        # One frame is taken by the uploader.
+        self.assertEqual(asyncio.run(run()), 3)
+
+    def test_upload_failure_stops_offload(self):
+        for i in range(10):
+            self.write_frame(i)
+
+        async def run():
+            offloader = Offloader(
+                "name1", sink_address="127.0.0.1:1", queue_frames=3, poll_s=0.01
+            )
+            with mock.patch.object(
+                offloader, "upload", side_effect=RuntimeError("broken")
+            ):
+                offloader.start("r_test", FrameIndex(self.node_dir))
+                # Doesn't wait forever for room in the queue.
+                await asyncio.wait_for(offloader.wait(), 5)
+
+        with self.assertRaisesRegex(RuntimeError, "broken"):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+from ccline import pipeline
+
+
+def reverse(job: pipeline.Job) -> None:
+    with open(job.source, "rb") as f:
+        data = f.read()
+    with open(pipeline.temporary_path(job.destination), "wb") as f:
+        f.write(data[::-1])
+
+
+def reverse_or_fail(job: pipeline.Job) -> None:
+    if job.source.endswith("frame-000003.jpg"):
+        with open(pipeline.temporary_path(job.destination), "wb") as f:
+            f.write(b"half")
+        raise ValueError(f"Can't read {job.source}")
+    reverse(job)
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jot = os.path.join(self.tmp_dir.name, "jot")
+        self.out = os.path.join(self.tmp_dir.name, "out")
+        for node in ["gamma1", "gamma2"]:
+            os.makedirs(os.path.join(self.jot, "r_test", node))
+            for i in range(20):
+                path = os.path.join(self.jot, "r_test", node, f"frame-{i:06d}.jpg")
+                with open(path, "wb") as f:
+                    f.write(f"{node} {i}".encode())
+        with open(os.path.join(self.jot, "r_test", "manifest.json"), "w") as f:
+            f.write("{}")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_processes_recording_once(self):
+        jobs = list(pipeline.find_jobs(self.jot, self.out))
+        self.assertEqual(len(jobs), 40)
+        self.assertEqual(
+            jobs[0].destination,
+            os.path.join(self.out, "r_test", "gamma1", "frame-000000.jpg"),
+        )
+        self.assertEqual(pipeline.run(jobs, reverse, processes=2, chunk_size=3), 40)
+        with open(jobs[-1].destination, "rb") as f:
+            self.assertEqual(f.read(), b"91 2ammag")
+        self.assertEqual(
+            [
+                n
+                for n in os.listdir(os.path.dirname(jobs[0].destination))
+                if "part" in n
+            ],
+            [],
+        )
+        # Everything is done already.
+        self.assertEqual(pipeline.run(jobs, reverse, processes=2), 0)
+        # Only a missing output is made again.
+        os.remove(jobs[5].destination)
+        self.assertEqual(pipeline.run(jobs, reverse, processes=2), 1)
+
+    def test_skips_destination_inside_source(self):
+        out = os.path.join(self.jot, "rotated")
+        jobs = list(pipeline.find_jobs(self.jot, out))
+        pipeline.run(jobs, reverse, processes=2)
+        self.assertEqual(len(list(pipeline.find_jobs(self.jot, out))), 40)
+
+    def test_failed_frames_dont_stop_the_run(self):
+        jobs = list(pipeline.find_jobs(self.jot, self.out))
+        self.assertEqual(
+            pipeline.run(jobs, reverse_or_fail, processes=2, chunk_size=3), 38
+        )
+        failed = [job for job in jobs if not pipeline.is_done(job)]
+        self.assertEqual(
+            [os.path.basename(job.source) for job in failed],
+            ["frame-000003.jpg", "frame-000003.jpg"],
+        )
+        # Neither a partial output nor a published one is left behind.
+        for job in failed:
+            self.assertEqual(
+                [n for n in os.listdir(os.path.dirname(job.destination)) if "03" in n],
+                [],
+            )
+        # Only the failures are tried again.
+        self.assertEqual(pipeline.run(jobs, reverse, processes=2), 2)
+
+    def test_progress_counts_failures(self):
+        progress = pipeline.Progress(3)
+        progress.update()
+        progress.update(failed=1)
+        self.assertEqual((progress.done, progress.failed), (2, 1))
+        self.assertIn("2/3 frames (1 failed)", progress.line(progress.start_s + 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
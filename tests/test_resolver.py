@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import socket
+import struct
+import threading
+import time
+import unittest
+from unittest import mock
+
+import gin
+
+from ccline import mdns
+from ccline.resolver import ProbeCache, Resolver
+
+
+def listening_port() -> tuple[socket.socket, str]:
+    """A port accepting connections, until the socket is closed."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    return server, str(server.getsockname()[1])
+
+
+def closed_port() -> str:
+    """A port nothing is listening on."""
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        return str(unused.getsockname()[1])
+
+
+def mdns_response(query: bytes, address: str) -> bytes:
+    """Answers a query for one name, giving the name with a pointer."""
+    header = struct.pack("!HHHHHH", 0, 0x8400, 1, 1, 0, 0)
+    question = query[12:]
+    answer = struct.pack("!HHHIH", 0xC00C, 1, 0x8001, 120, 4)
+    return header + question + answer + socket.inet_aton(address)
+
+
+class TestResolver(unittest.TestCase):
+
+    def setUp(self):
+        gin.clear_config()
+        ProbeCache.memory_.clear()
+
+    def test_probe_drops_unreachable_nodes(self):
+        server, port = listening_port()
+        with server:
+            resolver = Resolver(
+                name_to_ip={"localhost": "10.0.0.1", "b": "127.0.0.1", "c": ""},
+                name_to_port={"localhost": port, "b": closed_port(), "c": port},
+                probe=True,
+                probe_timeout_s=0.5,
+            )
+            # Looked up, refused and unknown.
+            self.assertEqual(resolver.name_to_ip, {"localhost": "127.0.0.1"})
+            # Other Resolvers use the cached results.
+            with mock.patch("asyncio.open_connection") as mock_connect:
+                again = Resolver(
+                    name_to_ip={"localhost": "10.0.0.1", "c": ""},
+                    name_to_port={"localhost": port, "c": port},
+                    probe=True,
+                )
+                mock_connect.assert_not_called()
+            self.assertEqual(again.name_to_ip, {"localhost": "127.0.0.1"})
+
+    def test_probe_keeps_nodes(self):
+        refused = closed_port()
+        name_to_ip = {"localhost": "10.0.0.1", "b": "127.0.0.1", "c": ""}
+        name_to_port = {"localhost": refused, "b": refused, "c": refused}
+        # A stale cache entry isn't used without the connect check.
+        ProbeCache().put_all({("b", refused): "10.9.9.9"})
+        with mock.patch("asyncio.open_connection") as mock_connect:
+            resolver = Resolver(
+                name_to_ip=name_to_ip,
+                name_to_port=name_to_port,
+                probe=True,
+                probe_timeout_s=0.5,
+                connect=False,
+            )
+            mock_connect.assert_not_called()
+        self.assertEqual(
+            resolver.name_to_ip, {"localhost": "127.0.0.1", "b": "127.0.0.1", "c": "c"}
+        )
+        self.assertEqual(ProbeCache().get("localhost", refused), None)
+        # Kept nodes stay at their configured address when they can't connect.
+        ProbeCache.memory_.clear()
+        resolver = Resolver(
+            name_to_ip=name_to_ip,
+            name_to_port=name_to_port,
+            probe=True,
+            probe_timeout_s=0.5,
+            keep=["localhost", "c"],
+        )
+        self.assertEqual(resolver.name_to_ip, {"localhost": "10.0.0.1", "c": "c"})
+
+    def test_probe_is_concurrent(self):
+        async def slow_lookup(hostname):
+            await asyncio.sleep(0.2)
+            return "127.0.0.1"
+
+        server, port = listening_port()
+        names = [f"node{i}" for i in range(5)]
+
+        async def run():
+            # Creating a Resolver inside an event loop also works.
+            return Resolver(
+                name_to_ip={n: "" for n in names},
+                name_to_port={n: port for n in names},
+                probe=True,
+            )
+
+        with server, mock.patch.object(Resolver, "lookup", side_effect=slow_lookup):
+            start_s = time.monotonic()
+            resolver = asyncio.run(run())
+        self.assertLess(time.monotonic() - start_s, 0.5)
+        self.assertEqual(list(resolver.all_nodes()), names)
+
+    def test_mdns(self):
+        query = mdns.build_query("Gamma1.local", 7)
+        self.assertEqual(struct.unpack("!H", query[:2])[0], 7)
+        self.assertEqual(mdns.read_name(query, 12), ("gamma1.local", 26))
+        response = mdns_response(query, "10.20.0.1")
+        self.assertEqual(mdns.parse_addresses(response), {"gamma1.local": "10.20.0.1"})
+        # Our own queries, and pointers that loop, are ignored.
+        self.assertEqual(mdns.parse_addresses(query), {})
+        with self.assertRaises(ValueError):
+            mdns.read_name(b"\xc0\x00", 0)
+
+    def test_mdns_resolve(self):
+        responder = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        responder.bind(("127.0.0.1", 0))
+        addresses = {"gamma1.local": "10.20.0.1", "gamma2.local": "10.20.0.2"}
+
+        def respond():
+            for _ in range(2):
+                query, source = responder.recvfrom(512)
+                name, _ = mdns.read_name(query, 12)
+                if name in addresses:
+                    responder.sendto(mdns_response(query, addresses[name]), source)
+
+        thread = threading.Thread(target=respond)
+        thread.start()
+        with responder:
+            found = asyncio.run(
+                mdns.resolve(
+                    ["gamma1.local", "gamma3.local"],
+                    timeout_s=0.3,
+                    address=responder.getsockname(),
+                )
+            )
+            thread.join()
+        self.assertEqual(found, {"gamma1.local": "10.20.0.1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from ccline import retention
+
+
+class TestRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def make_recording(self, name: str, mtime_s: int) -> str:
+        path = os.path.join(self.base, name)
+        os.makedirs(path)
+        with open(os.path.join(path, "frame-000000.jpg"), "wb") as f:
+            f.write(b"x")
+        os.utime(path, (mtime_s, mtime_s))
+        return path
+
+    def test_remaining_s(self):
+        self.assertEqual(retention.remaining_s(100, 10.0), 10.0)
+        self.assertEqual(retention.remaining_s(100, 0.0), float("inf"))
+        # Works before the first recording has made the directory.
+        missing = os.path.join(self.base, "not", "yet")
+        self.assertGreater(retention.free_bytes(missing), 0)
+
+    def test_evicts_oldest_first(self):
+        newest = self.make_recording("r_3", 3_000)
+        oldest = self.make_recording("r_1", 1_000)
+        middle = self.make_recording("r_2", 2_000)
+        current = self.make_recording("r_0", 0)
+
+        def free_bytes(path):
+            # Each recording deleted frees 10 bytes.
+            return 100 - 10 * len(os.listdir(self.base))
+
+        with mock.patch("ccline.retention.free_bytes", side_effect=free_bytes):
+            evicted = retention.evict(self.base, 80, exclude={"r_0"})
+        self.assertEqual(evicted, [oldest, middle])
+        self.assertTrue(os.path.exists(newest))
+        self.assertTrue(os.path.exists(current))
+
+
+if __name__ == "__main__":
+    unittest.main()
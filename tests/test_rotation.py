@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib.util
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from ccline import rotation
+
+HAS_CV2 = importlib.util.find_spec("cv2") is not None
+
+JFIF = b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+SCAN = b"\xff\xda\x00\x02image data\xff\xd9"
+
+
+def orientation(data: bytes) -> int:
+    for marker, start, length in rotation.segments(bytearray(data)):
+        if marker == rotation.APP1:
+            offset = rotation.find_orientation(
+                bytearray(data), start + 10, start + 2 + length
+            )
+            order = ">" if data[start + 10 : start + 12] == b"MM" else "<"
+            return struct.unpack_from(order + "H", data, offset)[0]
+    return 1
+
+
+class TestRotation(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_exif_adds_orientation(self):
+        data = b"\xff\xd8" + JFIF + SCAN
+        rotated = rotation.set_orientation(bytearray(data), "90")
+        self.assertEqual(orientation(rotated), 6)
+        # JFIF stays first and the image data is untouched.
+        self.assertEqual(rotated[2 : 2 + len(JFIF)], JFIF)
+        self.assertTrue(rotated.endswith(SCAN))
+        self.assertEqual(
+            orientation(rotation.set_orientation(bytearray(rotated), "180")), 8
+        )
+        self.assertEqual(
+            orientation(rotation.set_orientation(bytearray(rotated), "270")), 1
+        )
+
+    def test_exif_updates_little_endian_orientation(self):
+        tiff = (
+            b"II\x2a\x00"
+            + struct.pack("<I", 8)
+            + struct.pack("<H", 2)
+            + struct.pack("<HHII", 0x010F, 2, 4, 0)
+            + struct.pack("<HHIHH", rotation.ORIENTATION_TAG, 3, 1, 3, 0)
+            + struct.pack("<I", 0)
+        )
+        payload = rotation.EXIF_HEADER + tiff
+        app1 = struct.pack(">BBH", 0xFF, 0xE1, len(payload) + 2) + payload
+        source = os.path.join(self.tmp_dir.name, "in.jpg")
+        destination = os.path.join(self.tmp_dir.name, "out.jpg")
+        with open(source, "wb") as f:
+            f.write(b"\xff\xd8" + app1 + SCAN)
+        rotation.rotate_exif(source, destination, "90")
+        with open(destination, "rb") as f:
+            rotated = f.read()
+        self.assertEqual(len(rotated), os.path.getsize(source))
+        self.assertEqual(orientation(rotated), 8)
+
+    @unittest.skipUnless(HAS_CV2, "Needs OpenCV")
+    def test_methods_agree(self):
+        import cv2
+        import numpy as np
+
+        image = np.zeros((32, 48, 3), dtype=np.uint8)
+        image[:16, :16] = 255
+        source = os.path.join(self.tmp_dir.name, "in.jpg")
+        cv2.imwrite(source, image)
+        methods = ["opencv", "exif"]
+        if shutil.which("jpegtran"):
+            methods.append("jpegtran")
+        for angle in rotation.ANGLES:
+            for method in methods:
+                destination = os.path.join(self.tmp_dir.name, f"{method}{angle}.jpg")
+                rotation.METHODS[method](source, destination, angle)
+                rotated = cv2.imread(destination)
+                expected_shape = (32, 48, 3) if angle == "180" else (48, 32, 3)
+                self.assertEqual(rotated.shape, expected_shape, (method, angle))
+                # The white block ends up in the right corner.
+                corner = {"90": (0, -1), "180": (-1, -1), "270": (-1, 0)}[angle]
+                self.assertGreater(rotated[corner][0], 200, (method, angle))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+import gin
+
+from ccline.sampler import WarmSampler, create_sampler
+
+
+def read_config(gin_configs: list[str], gin_bindings: list[str]):
+    gin.clear_config()
+    gin.parse_config_files_and_bindings(
+        [os.path.join(os.getcwd(), "tests", "config", c) for c in gin_configs],
+        gin_bindings,
+        skip_unknown=True,
+    )
+
+
+class TestSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_warm_sampler(self):
+        # Counts the preview commands started.
+        preview_cmd = (
+            "echo started >> ../starts && sleep 0.1"
+            " && echo image > preview-0.jpg && ln -sf preview-0.jpg latest.jpg"
+            " && sleep 10"
+        )
+        read_config(
+            ["test.gin"],
+            [
+                f"CliRunner.base_collection_path = '{self.tmp_dir.name}'",
+                f"CliRunner.camera_preview_cmd = ['sh', '-c', '{preview_cmd}']",
+                "create_sampler.backend = 'warm'",
+            ],
+        )
+        sampler = create_sampler()
+        self.assertIsInstance(sampler, WarmSampler)
+        nocollection = os.path.join(self.tmp_dir.name, "nocollection")
+
+        async def run():
+            # Overlapping samples share one preview.
+            first, second = await asyncio.gather(sampler.sample(), sampler.sample())
+            process = sampler.process_
+            # The preview wraps around while the sample is being read.
+            with open(first) as f:
+                with open(os.path.join(nocollection, "preview", "preview-0.jpg"), "w"):
+                    pass
+                self.assertEqual(f.read(), "image\n")
+            third = await sampler.sample()
+            # The preview keeps running between samples.
+            self.assertIs(sampler.process_, process)
+            await sampler.pause()
+            return first, second, third, process
+
+        first, second, third, process = asyncio.run(run())
+        expected = os.path.join(
+            os.path.realpath(self.tmp_dir.name), "nocollection", "warm_sample.jpg"
+        )
+        self.assertEqual(os.path.realpath(first), expected)
+        self.assertEqual(second, first)
+        self.assertEqual(third, first)
+        self.assertIsNotNone(process.returncode)
+        with open(os.path.join(nocollection, "starts")) as f:
+            self.assertEqual(f.read(), "started\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,14 +15,21 @@
 
 import asyncio
 import os
+import tempfile
+import time
 import unittest
 from unittest import mock
 
 import gin
+import grpc
 from absl import logging
 
 from ccline import ccline_pb2
-from ccline.server import Node
+from ccline.channel_pool import ChannelPool
+from ccline.dispatch import dispatch
+from ccline.resolver import Resolver
+from ccline.server import Coordinator, Node
+from ccline.transfer import CHUNK_SIZE, write_chunks
 
 
 class TestServer(unittest.TestCase):
@@ -58,14 +65,412 @@ class TestServer(unittest.TestCase):
         mock_set_path.assert_called()
         mock_start_cmd.assert_called()
 
+    @mock.patch("ccline.cli_runner.CliRunner.can_arm", return_value=True)
+    @mock.patch("ccline.cli_runner.CliRunner.release_collection")
+    @mock.patch("ccline.cli_runner.CliRunner.run_start_collection_cmd")
+    def test_record_scheduled_start(self, mock_start_cmd, mock_release, _):
+        node1 = Node("test_node_1", "test_node_1")
+        request = ccline_pb2.RecordRequest()
+        request.start_sensor_ids.append(ccline_pb2.Camera1)
+        request.start_time_ns = time.time_ns() + 100_000_000
+        context = mock.MagicMock()
+
+        async def run():
+            reply = await node1.Record(request, context)
+            # The camera is started right away but not released yet.
+            mock_start_cmd.assert_called_with(armed=True, sensor="Camera1", run=0)
+            mock_release.assert_not_called()
+            await node1.scheduled_start_
+            return reply
+
+        reply = asyncio.run(run())
+        mock_release.assert_called_with(mock_start_cmd.return_value)
+        self.assertLessEqual(request.start_time_ns, time.time_ns())
+        self.assertLess(reply.node_time_ns, request.start_time_ns)
+
+    def test_stream_live_sample(self):
+        node1 = Node("test_node_1", "test_node_1")
+        request = ccline_pb2.LiveSampleRequest()
+        context = mock.MagicMock()
+        image = os.urandom(3 * CHUNK_SIZE + 10)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sample_path = os.path.join(tmp_dir, "live_sample.jpg")
+            with open(sample_path, "wb") as f:
+                f.write(image)
+            node1.capture_live_sample = mock.AsyncMock(return_value=sample_path)
+            chunks = node1.StreamLiveSample(request, context)
+            output_path = os.path.join(tmp_dir, "sample.jpg")
+            size = asyncio.run(write_chunks(chunks, output_path))
+            with open(output_path, "rb") as f:
+                self.assertEqual(f.read(), image)
+        self.assertEqual(size, len(image))
+
+    @mock.patch("ccline.cli_runner.CliRunner.run_start_collection_cmd")
+    def test_get_status(self, mock_start_cmd):
+        mock_start_cmd.return_value.returncode = None
+        node1 = Node("test_node_1", "test_node_1")
+        context = mock.MagicMock()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            request = ccline_pb2.RecordRequest(data_path="r_status")
+            request.start_sensor_ids.append(ccline_pb2.Camera1)
+            with mock.patch(
+                "ccline.cli_runner.CliRunner.get_full_collection_path",
+                return_value=tmp_dir,
+            ):
+                asyncio.run(node1.Record(request, context))
+            for i in range(3):
+                with open(os.path.join(tmp_dir, f"frame-{i:06d}.jpg"), "wb") as f:
+                    f.write(b"abcd")
+            status = asyncio.run(
+                node1.GetStatus(ccline_pb2.StatusRequest(), context)
+            )
+        self.assertEqual(status.node_id, "test_node_1")
+        self.assertEqual(status.recording_id, "r_status")
+        self.assertEqual(status.frame_count, 3)
+        self.assertEqual(status.bytes_written, 12)
+        self.assertEqual(status.state, ccline_pb2.NodeStatus.RECORDING)
+        self.assertFalse(status.stalled)
+        self.assertGreater(status.remaining_s, 0)
+
+    @mock.patch("ccline.cli_runner.CliRunner.stop_collection_cmd", return_value=False)
+    @mock.patch("ccline.cli_runner.CliRunner.run_start_collection_cmd")
+    def test_record_stop_reports_frames(self, mock_start_cmd, mock_stop_cmd):
+        async def run_until_stopped():
+            await asyncio.Event().wait()
+
+        mock_start_cmd.return_value.returncode = None
+        mock_start_cmd.return_value.wait = run_until_stopped
+        node1 = Node("test_node_1", "test_node_1")
+        context = mock.MagicMock()
+
+        async def run(tmp_dir):
+            request = ccline_pb2.RecordRequest(data_path="r_stop")
+            request.start_sensor_ids.append(ccline_pb2.Camera1)
+            with mock.patch(
+                "ccline.cli_runner.CliRunner.get_full_collection_path",
+                return_value=tmp_dir,
+            ):
+                await node1.Record(request, context)
+            self.assertEqual(node1.recording_state(), ccline_pb2.NodeStatus.RECORDING)
+            for i in range(3):
+                with open(os.path.join(tmp_dir, f"frame-{i:06d}.jpg"), "wb") as f:
+                    f.write(b"abcd")
+            reply = await node1.Record(stop_request, context)
+            with open(os.path.join(tmp_dir, "frames.csv")) as f:
+                frame_times = f.read()
+            # Stopping again while idle leaves the recording alone.
+            idle_reply = await node1.Record(stop_request, context)
+            with open(os.path.join(tmp_dir, "frames.csv")) as f:
+                self.assertEqual(f.read(), frame_times)
+            self.assertEqual(idle_reply.recording_id, "")
+            self.assertEqual(idle_reply.frame_count, 0)
+            return reply
+
+        stop_request = ccline_pb2.RecordRequest()
+        stop_request.stop_sensor_ids.append(ccline_pb2.Camera1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            reply = asyncio.run(run(tmp_dir))
+        # Even once the recording is gone.
+        asyncio.run(node1.Record(stop_request, context))
+        mock_stop_cmd.assert_called_with(mock_start_cmd.return_value)
+        self.assertEqual(reply.recording_id, "r_stop")
+        self.assertEqual(reply.frame_count, 3)
+        self.assertEqual(reply.last_frame, "frame-000002.jpg")
+        self.assertTrue(reply.killed)
+        self.assertEqual(node1.recording_state(), ccline_pb2.NodeStatus.IDLE)
+
+    @mock.patch("ccline.cli_runner.CliRunner.stop_collection_cmd", return_value=True)
+    @mock.patch("ccline.cli_runner.CliRunner.run_start_collection_cmd")
+    @mock.patch("ccline.cli_runner.CliRunner.sensor_cmd")
+    def test_record_tracks_every_sensor(self, mock_sensor_cmd, mock_start_cmd, _):
+        async def run_until_stopped():
+            await asyncio.Event().wait()
+
+        mock_sensor_cmd.side_effect = {
+            "Camera1": ["vid", "-o", "frame-%06d.jpg"],
+            "Camera2": ["vid", "--camera", "1", "-o", "cam2-%06d.jpg"],
+            # Not a frame pattern, so it isn't counted.
+            "Imu1": ["imu", "--log", "imu.csv"],
+        }.get
+        mock_start_cmd.return_value.returncode = None
+        mock_start_cmd.return_value.wait = run_until_stopped
+        node1 = Node("test_node_1", "test_node_1")
+        context = mock.MagicMock()
+
+        async def run(tmp_dir):
+            request = ccline_pb2.RecordRequest(data_path="r_sensors")
+            request.start_sensor_ids.extend(
+                [ccline_pb2.Camera1, ccline_pb2.Camera2, ccline_pb2.Imu1]
+            )
+            with mock.patch(
+                "ccline.cli_runner.CliRunner.get_full_collection_path",
+                return_value=tmp_dir,
+            ):
+                await node1.Record(request, context)
+            for name in ["frame-000000.jpg", "frame-000001.jpg", "cam2-000000.jpg"]:
+                with open(os.path.join(tmp_dir, name), "wb") as f:
+                    f.write(b"abcd")
+            status = await node1.GetStatus(ccline_pb2.StatusRequest(), context)
+            reply = await node1.Record(ccline_pb2.RecordRequest(), context)
+            with open(os.path.join(tmp_dir, "frames_Camera2.csv")) as f:
+                camera2_times = f.read()
+            return status, reply, camera2_times
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            status, reply, camera2_times = asyncio.run(run(tmp_dir))
+        self.assertEqual(len(status.sensors), 3)
+        self.assertEqual(status.frame_count, 3)
+        self.assertEqual(status.bytes_written, 12)
+        self.assertEqual(reply.recording_id, "r_sensors")
+        self.assertEqual(reply.frame_count, 3)
+        self.assertEqual(reply.last_frame, "frame-000001.jpg")
+        self.assertIn("cam2-000000.jpg", camera2_times)
+
     @mock.patch("ccline.cli_runner.CliRunner.run_shutdown_cmd")
     def test_shutdown(self, mock_start_cmd):
-        node1 = Node("test_node_1", "test_node_1")
-        request = ccline_pb2.ShutdownRequest()
+        mock_start_cmd.return_value.wait = mock.AsyncMock(return_value=0)
+        node1 = Node("test_node_1", "test_node_1", halt_s=15.0)
+        request = ccline_pb2.ShutdownRequest(delay_s=0.05)
         context = mock.MagicMock()
-        reply = asyncio.run(node1.Shutdown(request, context))
+
+        async def run():
+            reply = await node1.Shutdown(request, context)
+            # The shutdown command runs after the reply.
+            mock_start_cmd.assert_not_called()
+            await node1.shutdown_
+            return reply
+
+        reply = asyncio.run(run())
         mock_start_cmd.assert_called()
+        self.assertAlmostEqual(reply.power_off_s, 15.05)
+        self.assertEqual(reply.recording_id, "")
+
+    @mock.patch("ccline.ccline_pb2_grpc.NodeStub")
+    def test_shutdown_cluster_coordinator_last(self, mock_node):
+        delays = []
+
+        async def shutdown(request, timeout):
+            delays.append(request.delay_s)
+            if request.delay_s == 0 and len(delays) == 1 and fail_first:
+                raise grpc.aio.AioRpcError(
+                    grpc.StatusCode.UNAVAILABLE,
+                    grpc.aio.Metadata(),
+                    grpc.aio.Metadata(),
+                )
+            return ccline_pb2.ShutdownReply(
+                recording_id="r_test", frame_count=5, power_off_s=20.0
+            )
+
+        mock_node.return_value.Shutdown = shutdown
+        resolver = Resolver(
+            name_to_ip={"a": "127.0.0.1", "b": "127.0.0.1", "c": "127.0.0.1"},
+            name_to_port={"a": "1", "b": "2", "c": "3"},
+        )
+        coordinator = Coordinator(resolver, node_id="b", reply_grace_s=2.0)
+        context = mock.MagicMock()
+        fail_first = False
+        reply = asyncio.run(
+            coordinator.ShutdownCluster(ccline_pb2.ShutdownClusterRequest(), context)
+        )
+        self.assertEqual(reply.result, ccline_pb2.ShutdownClusterReply.OK)
+        self.assertEqual(delays, [0.0, 0.0, 2.0])
+        self.assertEqual([r.node_id for r in reply.node_results], ["a", "c", "b"])
+        self.assertGreater(reply.power_off_s, 19.0)
+        self.assertLessEqual(reply.power_off_s, 20.0)
+        # The coordinator stays up when a node doesn't acknowledge, unless forced.
+        delays.clear()
+        fail_first = True
+        reply = asyncio.run(
+            coordinator.ShutdownCluster(ccline_pb2.ShutdownClusterRequest(), context)
+        )
+        self.assertEqual(reply.result, ccline_pb2.ShutdownClusterReply.ERROR)
+        self.assertEqual(delays, [0.0, 0.0])
+        self.assertIn("Left b running", reply.message)
+        delays.clear()
+        reply = asyncio.run(
+            coordinator.ShutdownCluster(
+                ccline_pb2.ShutdownClusterRequest(force=True), context
+            )
+        )
+        self.assertEqual(delays, [0.0, 0.0, 2.0])
+        self.assertEqual(len(reply.node_results), 3)
+
+    @mock.patch("ccline.ccline_pb2_grpc.NodeStub")
+    def test_start_collecting(self, mock_node):
+        mock_node.return_value.Record = mock.AsyncMock(
+            return_value=ccline_pb2.RecordReply()
+        )
+        mock_node.return_value.GetStatus = mock.AsyncMock(
+            return_value=ccline_pb2.NodeStatus(node_id="name1", remaining_s=3600.0)
+        )
+        coordinator = Coordinator(Resolver())
+        request = ccline_pb2.StartCollectingRequest(recording_id="r_test")
+        context = mock.MagicMock()
+        reply = asyncio.run(coordinator.StartCollecting(request, context))
+        self.assertEqual(reply.result, ccline_pb2.StartCollectingReply.OK)
+        self.assertEqual(len(reply.node_results), 1)
+        self.assertEqual(reply.node_results[0].node_id, "name1")
+        self.assertEqual(reply.node_results[0].status, ccline_pb2.NodeResult.OK)
+        record_request = mock_node.return_value.Record.call_args.args[0]
+        self.assertEqual(record_request.data_path, "r_test")
+
+    @mock.patch("ccline.ccline_pb2_grpc.NodeStub")
+    def test_start_collecting_checks_disk_space(self, mock_node):
+        mock_node.return_value.Record = mock.AsyncMock(
+            return_value=ccline_pb2.RecordReply()
+        )
+        mock_node.return_value.GetStatus = mock.AsyncMock(
+            return_value=ccline_pb2.NodeStatus(node_id="name1", remaining_s=60.0)
+        )
+        coordinator = Coordinator(Resolver(), min_remaining_s=600.0)
+        request = ccline_pb2.StartCollectingRequest(recording_id="r_test")
+        context = mock.MagicMock()
+        reply = asyncio.run(coordinator.StartCollecting(request, context))
+        self.assertEqual(reply.result, ccline_pb2.StartCollectingReply.ERROR)
+        self.assertIn("name1 (1 min)", reply.message)
+        mock_node.return_value.Record.assert_not_called()
+        # Starts anyway when forced or when the node makes room.
+        request.force = True
+        reply = asyncio.run(coordinator.StartCollecting(request, context))
+        self.assertEqual(reply.result, ccline_pb2.StartCollectingReply.OK)
+        self.assertIn("Low disk space", reply.message)
+        mock_node.return_value.GetStatus.return_value.evicts_recordings = True
+        request.force = False
+        reply = asyncio.run(coordinator.StartCollecting(request, context))
+        self.assertEqual(reply.result, ccline_pb2.StartCollectingReply.OK)
+        self.assertIn("deleting old recordings", reply.message)
+
+    @mock.patch("ccline.ccline_pb2_grpc.NodeStub")
+    def test_catalogue(self, mock_node):
+        mock_node.return_value.Record = mock.AsyncMock(
+            return_value=ccline_pb2.RecordReply()
+        )
+        mock_node.return_value.GetStatus = mock.AsyncMock(
+            return_value=ccline_pb2.NodeStatus(node_id="name1", remaining_s=3600.0)
+        )
+        coordinator = Coordinator(Resolver())
+        context = mock.MagicMock()
+
+        async def run():
+            await coordinator.StartCollecting(
+                ccline_pb2.StartCollectingRequest(
+                    recording_id="r_test", recording_tag=["lab"]
+                ),
+                context,
+            )
+            mock_node.return_value.Record.return_value = ccline_pb2.RecordReply(
+                recording_id="r_test", frame_count=12, bytes_written=3400
+            )
+            await coordinator.StopAllCollects(
+                ccline_pb2.StopAllCollectsRequest(), context
+            )
+            return await coordinator.ListRecordings(
+                ccline_pb2.ListRecordingsRequest(tags=["lab"]), context
+            )
+
+        (recording,) = asyncio.run(run()).recordings
+        self.assertEqual(recording.recording_id, "r_test")
+        self.assertEqual(list(recording.tags), ["lab"])
+        self.assertGreater(recording.stop_time_ns, 0)
+        self.assertEqual(recording.nodes[0].node_id, "name1")
+        self.assertEqual(recording.frame_count, 12)
+        self.assertEqual(recording.bytes_written, 3400)
+
+    @mock.patch("ccline.ccline_pb2_grpc.NodeStub")
+    def test_channels_are_reused(self, mock_node):
+        mock_node.return_value.Record = mock.AsyncMock(
+            return_value=ccline_pb2.RecordReply()
+        )
+        channel_pool = ChannelPool(Resolver())
+        coordinator = Coordinator(channel_pool.resolver, channel_pool)
+        request = ccline_pb2.StopAllCollectsRequest()
+        context = mock.MagicMock()
+
+        async def run():
+            await coordinator.StopAllCollects(request, context)
+            await coordinator.StopAllCollects(request, context)
+            channel_pool.report_failure("name1", grpc.StatusCode.UNAVAILABLE)
+            await coordinator.StopAllCollects(request, context)
+            stats = channel_pool.stats()
+            await channel_pool.close()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["name1"].connects, 2)
+        self.assertEqual(stats["name1"].reconnects, 1)
+        self.assertEqual(stats["name1"].failures, 1)
+
+    @mock.patch("ccline.ccline_pb2_grpc.NodeStub")
+    def test_get_array_status(self, mock_node):
+        mock_node.return_value.GetStatus = mock.AsyncMock(
+            return_value=ccline_pb2.NodeStatus(
+                node_id="name1", state=ccline_pb2.NodeStatus.RECORDING, frame_count=7
+            )
+        )
+        coordinator = Coordinator(Resolver())
+        context = mock.MagicMock()
+        reply = asyncio.run(
+            coordinator.GetArrayStatus(ccline_pb2.ArrayStatusRequest(), context)
+        )
+        self.assertEqual(len(reply.node_statuses), 1)
+        self.assertEqual(reply.node_statuses[0].frame_count, 7)
+        self.assertEqual(reply.node_results[0].status, ccline_pb2.NodeResult.OK)
+        self.assertEqual(reply.channels[0].node_id, "name1")
+        self.assertEqual(reply.channels[0].connects, 1)
+
+    @mock.patch("ccline.ccline_pb2_grpc.NodeStub")
+    def test_sample_all(self, mock_node):
+        async def stream_live_sample(request, timeout):
+            for i in range(3):
+                yield ccline_pb2.FileChunk(offset=i, data=b"x")
+
+        mock_node.return_value.StreamLiveSample = stream_live_sample
+        resolver = Resolver(
+            name_to_ip={"a": "127.0.0.1", "b": "127.0.0.1"},
+            name_to_port={"a": "1", "b": "2"},
+        )
+        coordinator = Coordinator(resolver)
+        request = ccline_pb2.SampleAllRequest()
+        context = mock.MagicMock()
+
+        async def run():
+            return [m async for m in coordinator.SampleAll(request, context)]
+
+        messages = asyncio.run(run())
+        for node in ["a", "b"]:
+            from_node = [m for m in messages if m.node_id == node]
+            self.assertEqual(len(from_node), 4)
+            self.assertEqual([m.chunk.offset for m in from_node[:3]], [0, 1, 2])
+            self.assertEqual(from_node[3].node_result.status, ccline_pb2.NodeResult.OK)
+
+    def test_dispatch_is_concurrent(self):
+        async def call(node):
+            await asyncio.sleep(0.2 if node == "slow" else 0.1)
+            return node
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            outcomes = await dispatch(["a", "b", "c", "slow"], call, timeout=0.15)
+            return outcomes, loop.time() - start
+
+        outcomes, elapsed = asyncio.run(run())
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual([o.node_id for o in outcomes], ["a", "b", "c", "slow"])
+        self.assertEqual([o.response for o in outcomes[:3]], ["a", "b", "c"])
+        self.assertEqual(outcomes[3].status, ccline_pb2.NodeResult.TIMEOUT)
+
+
+    def test_dispatch_reports_other_errors(self):
+        async def call(node):
+            if node == "b":
+                raise OSError("No space left on device")
+            return node
 
+        outcomes = asyncio.run(dispatch(["a", "b", "c"], call, timeout=1))
+        self.assertEqual([o.ok for o in outcomes], [True, False, True])
+        self.assertEqual(outcomes[1].status, ccline_pb2.NodeResult.ERROR)
+        self.assertEqual(outcomes[1].message, "No space left on device")
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import unittest
+
+from ccline.supervisor import Supervisor
+
+
+async def stop_process(process: asyncio.subprocess.Process) -> bool:
+    process.terminate()
+    await process.wait()
+    return True
+
+
+class TestSupervisor(unittest.TestCase):
+
+    def test_sensors_start_and_stop_independently(self):
+        supervisor = Supervisor()
+        runs = []
+
+        async def spawn(run: int, armed: bool):
+            runs.append((run, armed))
+            return await asyncio.create_subprocess_exec("sleep", "10")
+
+        async def run():
+            await supervisor.start("Camera1", spawn, armed=True)
+            await supervisor.start("Imu1", spawn)
+            # Already collecting.
+            await supervisor.start("Camera1", spawn)
+            self.assertEqual(supervisor.sensors(), ["Camera1", "Imu1"])
+            camera = supervisor.process("Camera1")
+            stopped = await supervisor.stop(["Camera1", "Camera2"], stop_process)
+            self.assertEqual(stopped, {"Camera1": True})
+            self.assertIsNotNone(camera.returncode)
+            self.assertEqual(supervisor.sensors(), ["Imu1"])
+            self.assertTrue(supervisor.alive())
+            await supervisor.stop(["Imu1"], stop_process)
+            self.assertFalse(supervisor.alive())
+
+        asyncio.run(run())
+        self.assertEqual(runs, [(0, True), (0, False)])
+
+    def test_restarts_with_backoff(self):
+        supervisor = Supervisor(restart_delay_s=0.05, restart_delay_max_s=0.1)
+        started = []
+
+        async def spawn(run: int, armed: bool):
+            started.append(asyncio.get_running_loop().time())
+            if run < 3:
+                # Crashes straight away.
+                return await asyncio.create_subprocess_exec("false")
+            return await asyncio.create_subprocess_exec("sleep", "10")
+
+        async def run():
+            await supervisor.start("Camera1", spawn)
+            while not supervisor.alive() or len(started) < 4:
+                await asyncio.sleep(0.01)
+            await supervisor.stop(["Camera1"], stop_process)
+
+        asyncio.run(run())
+        self.assertEqual(supervisor.restarts["Camera1"], 3)
+        delays = [b - a for a, b in zip(started, started[1:])]
+        self.assertGreaterEqual(delays[0], 0.05)
+        self.assertGreaterEqual(delays[1], 0.1)
+        self.assertLess(delays[2], 0.2)
+
+    def test_stops_while_waiting_to_restart(self):
+        supervisor = Supervisor(restart_delay_s=10.0)
+
+        async def spawn(run: int, armed: bool):
+            return await asyncio.create_subprocess_exec("false")
+
+        async def run():
+            await supervisor.start("Imu1", spawn)
+            await asyncio.sleep(0.1)
+            self.assertFalse(supervisor.alive())
+            return await supervisor.stop(["Imu1"], stop_process)
+
+        self.assertEqual(asyncio.run(run()), {"Imu1": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
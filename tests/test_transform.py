@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import concurrent.futures
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from ccline import pipeline, transform
+from ccline.resolver import Resolver
+from ccline.transform import Transform, Transformer
+
+HAS_CV2 = importlib.util.find_spec("cv2") is not None
+
+
+def fake_apply(job: pipeline.Job, profile: Transform) -> None:
+    with open(job.destination, "w") as f:
+        f.write(str(profile.to_config()))
+
+
+class TestTransform(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.recording = os.path.join(self.tmp_dir.name, "r_test")
+        os.makedirs(os.path.join(self.recording, "gamma1"))
+        self.frame = os.path.join(self.recording, "gamma1", "frame-000000.jpg")
+        with open(self.frame, "wb") as f:
+            f.write(b"frame")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_profiles_from_resolver(self):
+        resolver = Resolver(
+            name_to_ip={"gamma1": "127.0.0.1"},
+            name_to_transform={"gamma1": {"rotate": 90, "crop": [0, 8, 64, 32]}},
+        )
+        profile = resolver.transforms()["gamma1"]
+        self.assertEqual(profile, Transform(rotate="90", crop=(0, 8, 64, 32)))
+        self.assertEqual(profile.to_config(), {"rotate": "90", "crop": [0, 8, 64, 32]})
+        with self.assertRaises(ValueError):
+            Transform.from_config({"rotate": "45"})
+        with self.assertRaises(ValueError):
+            Transform.from_config({"mirror": True})
+
+    @mock.patch("ccline.transform.apply", side_effect=fake_apply)
+    def test_transforms_each_frame_once(self, mock_apply):
+        def transform_all(profile: Transform) -> int:
+            async def run():
+                transformer = Transformer(
+                    {"gamma1": profile}, concurrent.futures.ThreadPoolExecutor()
+                )
+                transformer.submit(self.recording, "gamma1", self.frame)
+                transformer.submit(self.recording, "gamma1", self.frame)
+                # No profile for this node.
+                transformer.submit(self.recording, "gamma2", self.frame)
+                await transformer.wait()
+                transformer.close()
+                return transformer.transformed
+
+            return asyncio.run(run())
+
+        self.assertEqual(transform_all(Transform(rotate="90")), 1)
+        output = os.path.join(
+            f"{self.recording}.transformed", "gamma1", "frame-000000.jpg"
+        )
+        self.assertTrue(os.path.exists(output))
+        # Nothing but the nodes in the recording.
+        self.assertEqual(os.listdir(self.recording), ["gamma1"])
+        # Already done by an earlier run.
+        self.assertEqual(transform_all(Transform(rotate="90")), 0)
+        # The profile changed.
+        self.assertEqual(transform_all(Transform(rotate="180")), 1)
+        self.assertEqual(mock_apply.call_count, 2)
+
+    @unittest.skipUnless(HAS_CV2, "Needs OpenCV")
+    def test_apply(self):
+        import cv2
+        import numpy as np
+
+        cv2.imwrite(self.frame, np.zeros((48, 64, 3), dtype=np.uint8))
+        output = os.path.join(self.tmp_dir.name, "out.jpg")
+        transform.apply(
+            pipeline.Job(self.frame, output),
+            Transform(rotate="90", flip="horizontal", crop=(0, 8, 64, 32)),
+        )
+        self.assertEqual(cv2.imread(output).shape, (64, 32, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
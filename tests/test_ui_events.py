@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import threading
+import time
+import unittest
+
+from ccline.ui_events import (
+    DONE,
+    FAILED,
+    IDLE_CPU_BUDGET,
+    RUNNING,
+    ActionRunner,
+    PolledStat,
+    UiLoop,
+    poll_buttons,
+)
+
+
+class FakeSwitch:
+
+    def __init__(self, presses: int = 0):
+        self.presses_ = presses
+        self.rose = False
+
+    def update(self):
+        self.rose = self.presses_ > 0
+        self.presses_ -= 1
+
+
+class TestUiEvents(unittest.TestCase):
+
+    def test_handles_inputs_between_refreshes(self):
+        events = []
+        loop = UiLoop(events.append, lambda: events.append("refresh"), 0.05)
+        for name in ["up", "a"]:
+            loop.put(name)
+        threading.Timer(0.12, loop.stop).start()
+        loop.run()
+        # Refreshes straight away, then handles the inputs without waiting.
+        self.assertEqual(events[:3], ["refresh", "up", "a"])
+        self.assertIn(events.count("refresh"), [3, 4])
+
+    def test_refresh_soon(self):
+        refreshes = []
+        loop = UiLoop(lambda name: None, lambda: refreshes.append(1), 10.0)
+        threading.Timer(0.05, loop.refresh_soon).start()
+        threading.Timer(0.1, loop.stop).start()
+        loop.run()
+        self.assertEqual(len(refreshes), 2)
+
+    def test_poll_buttons(self):
+        switches = {"a": FakeSwitch(presses=2), "b": FakeSwitch()}
+        pressed = []
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        poll_buttons(switches, pressed.append, stop, interval_s=0.01)
+        self.assertEqual(pressed, ["a", "a"])
+
+    def test_idle_cpu_within_budget(self):
+        loop = UiLoop(lambda name: None, lambda: None, 0.2)
+        switches = {str(i): FakeSwitch() for i in range(7)}
+        poller = threading.Thread(
+            target=poll_buttons, args=[switches, loop.put, loop.stopped]
+        )
+        start_cpu_s = time.process_time()
+        start_s = time.monotonic()
+        poller.start()
+        threading.Timer(1.0, loop.stop).start()
+        loop.run()
+        poller.join()
+        cpu = (time.process_time() - start_cpu_s) / (time.monotonic() - start_s)
+        self.assertLess(cpu, IDLE_CPU_BUDGET)
+        self.assertEqual(loop.late_refreshes, 0)
+
+    def test_action_runner(self):
+        changes = []
+        runner = ActionRunner(on_change=lambda: changes.append(1))
+        release = threading.Event()
+
+        async def slow():
+            await asyncio.to_thread(release.wait)
+            return "started"
+
+        async def fail():
+            raise RuntimeError("No coordinator found")
+
+        try:
+            self.assertIsNone(runner.status("start"))
+            self.assertTrue(runner.submit("start", slow))
+            # Already running.
+            self.assertFalse(runner.submit("start", slow))
+            self.assertEqual(runner.status("start").state, RUNNING)
+            release.set()
+            runner.submit("stop", fail)
+            deadline_s = time.monotonic() + 1.0
+            while RUNNING in (
+                runner.status("start").state,
+                runner.status("stop").state,
+            ):
+                self.assertLess(time.monotonic(), deadline_s)
+                # Runs on the same loop as the actions.
+                runner.run(asyncio.sleep(0.01), timeout=1)
+            self.assertEqual(runner.status("start").state, DONE)
+            self.assertEqual(runner.status("start").message, "started")
+            self.assertEqual(runner.status("stop").state, FAILED)
+            self.assertEqual(runner.status("stop").message, "No coordinator found")
+        finally:
+            release.set()
+            runner.close()
+        self.assertEqual(len(changes), 4)
+
+    def test_polled_stat(self):
+        changes = threading.Semaphore(0)
+        runner = ActionRunner(on_change=changes.release)
+        replies = iter([3, RuntimeError("Unavailable"), 5])
+
+        async def request():
+            reply = next(replies)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+
+        stat = PolledStat(runner, request, interval_s=0.05)
+        try:
+            # Doesn't wait for the reply.
+            self.assertIsNone(stat.get())
+            self.assertTrue(changes.acquire(timeout=1))
+            self.assertEqual(stat.get(), 3)
+            # Not due yet.
+            self.assertFalse(changes.acquire(timeout=0.02))
+            time.sleep(0.05)
+            stat.get()
+            self.assertTrue(changes.acquire(timeout=1))
+            # Keeps the last reply when a request fails.
+            self.assertEqual(stat.value, 3)
+            self.assertEqual(stat.error, "Unavailable")
+            time.sleep(0.05)
+            stat.get()
+            self.assertTrue(changes.acquire(timeout=1))
+            self.assertEqual(stat.get(), 5)
+            self.assertEqual(stat.error, "")
+        finally:
+            runner.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
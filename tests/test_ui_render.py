@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import importlib.util
+import unittest
+from unittest import mock
+
+HAS_PIL = importlib.util.find_spec("PIL") is not None
+
+if HAS_PIL:
+    from PIL import Image, ImageFont
+
+    from ccline.ui_render import OledRenderer, dirty_window, to_pages
+
+
+class FakeI2cDevice:
+
+    def __init__(self):
+        self.writes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+
+
+class FakeSsd1306:
+    width = 128
+    height = 64
+
+    def __init__(self):
+        self.i2c_device = FakeI2cDevice()
+        self.commands = []
+
+    def write_cmd(self, command):
+        self.commands.append(command)
+
+
+@unittest.skipUnless(HAS_PIL, "Needs Pillow")
+class TestUiRender(unittest.TestCase):
+
+    def test_to_pages(self):
+        image = Image.new("1", (128, 64))
+        image.putpixel((0, 0), 1)
+        image.putpixel((3, 10), 1)
+        image.putpixel((127, 63), 1)
+        frame = to_pages(image)
+        self.assertEqual(len(frame), 1024)
+        self.assertEqual(frame[0], 0b1)
+        self.assertEqual(frame[128 + 3], 0b100)
+        self.assertEqual(frame[7 * 128 + 127], 0b10000000)
+        self.assertEqual(sum(1 for b in frame if b), 3)
+
+    def test_dirty_window(self):
+        old = bytes(1024)
+        self.assertEqual(dirty_window(None, old, 128), (0, 7, 0, 127))
+        self.assertIsNone(dirty_window(old, old, 128))
+        new = bytearray(old)
+        new[2 * 128 + 40] = 1
+        new[4 * 128 + 10] = 1
+        self.assertEqual(dirty_window(old, bytes(new), 128), (2, 4, 10, 40))
+
+    def test_sends_only_changes(self):
+        display = FakeSsd1306()
+        renderer = OledRenderer(display, ImageFont.load_default())
+        self.assertTrue(renderer.render(["start", "frames: 10"]))
+        self.assertEqual(display.commands, [0x21, 0, 127, 0x22, 0, 7])
+        self.assertEqual(len(display.i2c_device.writes[0]), 1025)
+        # Nothing changed, nothing is drawn or sent.
+        self.assertFalse(renderer.render(["start", "frames: 10"]))
+        self.assertEqual(len(display.i2c_device.writes), 1)
+        display.commands.clear()
+        self.assertTrue(renderer.render(["start", "frames: 11"]))
+        col_start, col_end, page_start, page_end = (
+            display.commands[1],
+            display.commands[2],
+            display.commands[4],
+            display.commands[5],
+        )
+        # Only the pages of the second row, around the last digit.
+        self.assertGreaterEqual(page_start, 3)
+        self.assertGreater(col_start, 20)
+        data = display.i2c_device.writes[-1]
+        self.assertEqual(
+            len(data) - 1, (page_end - page_start + 1) * (col_end - col_start + 1)
+        )
+        self.assertLess(len(data), 100)
+        # Row images are reused when a text comes back.
+        self.assertTrue(renderer.render(["start", "frames: 10"]))
+        self.assertEqual(len(renderer.row_images_), 3)
+
+    def test_whole_frame_without_i2c(self):
+        display = mock.MagicMock(width=64, height=32)
+        renderer = OledRenderer(display, ImageFont.load_default())
+        renderer.render(["stop"])
+        display.show.assert_called_once()
+        self.assertEqual(renderer.bytes_sent, 256)
+
+
+if __name__ == "__main__":
+    unittest.main()